@@ -0,0 +1,207 @@
+import asyncio
+import time
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+
+import aiosqlite
+
+from astrbot.api import logger
+
+
+class ActivityTracker:
+    """
+    本地群友活跃统计：每个 (群, 用户) 的最后发言时间、累计消息数、按天分桶的消息数
+    - 每条消息只在内存累加增量（O(1)），定时或积累到一定量后批量写入 SQLite
+    - 与配置共用一个数据库文件（随备份一起保存），但使用独立连接
+    """
+
+    # 定时落盘间隔（秒）
+    FLUSH_INTERVAL = 30
+    # 内存中待写入的 (群, 用户) 数超过此值时提前落盘
+    FLUSH_SIZE = 5000
+    # 按天分桶的保留天数
+    KEEP_DAYS = 90
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._conn: aiosqlite.Connection | None = None
+        # {(group_id, user_id): [最后发言时间, 新增消息数]}
+        self._pending: dict[tuple[str, int], list[int]] = {}
+        # {(group_id, user_id, 天序号): 新增消息数}
+        self._pending_days: dict[tuple[str, int, int], int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._loop_task: asyncio.Task | None = None
+
+    async def init(self):
+        self._conn = await aiosqlite.connect(str(self.db_path))
+        await self._conn.execute("PRAGMA journal_mode=WAL;")
+        await self._conn.execute("PRAGMA busy_timeout=5000;")
+        await self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS activity (
+                group_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                last_ts INTEGER NOT NULL,
+                msg_count INTEGER NOT NULL,
+                PRIMARY KEY (group_id, user_id)
+            ) WITHOUT ROWID;
+        """)
+        await self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS activity_daily (
+                group_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                msg_count INTEGER NOT NULL,
+                PRIMARY KEY (group_id, user_id, day)
+            ) WITHOUT ROWID;
+        """)
+        await self._conn.commit()
+        self._loop_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+        if self._conn:
+            await self.flush()
+            await self._conn.close()
+            self._conn = None
+
+    # ---------------------------- 记录 ----------------------------
+
+    @staticmethod
+    def _day(ts: int) -> int:
+        return (ts - time.timezone) // 86400
+
+    def record(self, group_id: str, user_id: int, ts: int | None = None):
+        """记录一条群消息"""
+        ts = int(ts or time.time())
+        key = (group_id, user_id)
+        if (entry := self._pending.get(key)) is not None:
+            entry[0] = ts
+            entry[1] += 1
+        else:
+            self._pending[key] = [ts, 1]
+        day_key = (group_id, user_id, self._day(ts))
+        self._pending_days[day_key] = self._pending_days.get(day_key, 0) + 1
+        if len(self._pending) >= self.FLUSH_SIZE and not self._flush_task:
+            self._flush_task = asyncio.create_task(self.flush())
+            self._flush_task.add_done_callback(self._on_flush_done)
+
+    def _on_flush_done(self, task: asyncio.Task):
+        self._flush_task = None
+        if not task.cancelled() and task.exception():
+            logger.error(f"活跃统计落盘失败：{task.exception()}")
+
+    async def _flush_loop(self):
+        last_prune = 0.0
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            try:
+                await self.flush()
+                if time.time() - last_prune > 86400:
+                    last_prune = time.time()
+                    await self._prune()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"活跃统计落盘失败：{e}")
+
+    async def flush(self):
+        """把内存增量批量写入数据库"""
+        async with self._flush_lock:
+            if not self._conn or not (self._pending or self._pending_days):
+                return
+            pending, self._pending = self._pending, {}
+            pending_days, self._pending_days = self._pending_days, {}
+            try:
+                await self._conn.executemany(
+                    """
+                    INSERT INTO activity (group_id, user_id, last_ts, msg_count)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (group_id, user_id) DO UPDATE SET
+                        last_ts = MAX(last_ts, excluded.last_ts),
+                        msg_count = msg_count + excluded.msg_count;
+                    """,
+                    [(g, u, ts, n) for (g, u), (ts, n) in pending.items()],
+                )
+                await self._conn.executemany(
+                    """
+                    INSERT INTO activity_daily (group_id, user_id, day, msg_count)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (group_id, user_id, day) DO UPDATE SET
+                        msg_count = msg_count + excluded.msg_count;
+                    """,
+                    [(g, u, d, n) for (g, u, d), n in pending_days.items()],
+                )
+                await self._conn.commit()
+            except Exception:
+                await self._conn.rollback()
+                # 写入失败则把增量并回内存，下次再试
+                for key, (ts, n) in pending.items():
+                    entry = self._pending.setdefault(key, [ts, 0])
+                    entry[0] = max(entry[0], ts)
+                    entry[1] += n
+                for key, n in pending_days.items():
+                    self._pending_days[key] = self._pending_days.get(key, 0) + n
+                raise
+
+    async def _prune(self):
+        async with self._flush_lock:
+            if self._conn:
+                cutoff = self._day(int(time.time())) - self.KEEP_DAYS
+                await self._conn.execute(
+                    "DELETE FROM activity_daily WHERE day < ?;", (cutoff,)
+                )
+                await self._conn.commit()
+
+    # ---------------------------- 查询 ----------------------------
+
+    async def group_stats(
+        self, group_id: str, days: int
+    ) -> dict[int, tuple[int, int, int]]:
+        """{user_id: (最后发言时间, 累计消息数, 近 days 天消息数)}"""
+        return await self._stats(group_id, days)
+
+    async def user_stats(
+        self, group_id: str, user_ids: Iterable[int], days: int
+    ) -> dict[int, tuple[int, int, int]]:
+        """同 group_stats，但只查给定的用户（如当前页），开销与群大小无关"""
+        uids = list(dict.fromkeys(user_ids))
+        if not uids:
+            return {}
+        return await self._stats(group_id, days, uids)
+
+    async def _stats(
+        self, group_id: str, days: int, user_ids: list[int] | None = None
+    ) -> dict[int, tuple[int, int, int]]:
+        await self.flush()
+        if not self._conn:
+            return {}
+        since = self._day(int(time.time())) - days + 1
+        where, params = "a.group_id = ?", [since, group_id]
+        if user_ids is not None:
+            where += f" AND a.user_id IN ({','.join('?' * len(user_ids))})"
+            params.extend(user_ids)
+        async with self._conn.execute(
+            f"""
+            SELECT a.user_id, a.last_ts, a.msg_count, COALESCE(SUM(d.msg_count), 0)
+            FROM activity a
+            LEFT JOIN activity_daily d
+                ON d.group_id = a.group_id AND d.user_id = a.user_id AND d.day >= ?
+            WHERE {where}
+            GROUP BY a.user_id;
+            """,
+            params,
+        ) as cur:
+            return {row[0]: (row[1], row[2], row[3]) async for row in cur}
+
+    async def aligned(
+        self, group_id: str, user_ids: Iterable[int], days: int
+    ) -> tuple[array, array]:
+        """按 user_ids 顺序返回 (本地最后发言时间, 近 days 天消息数) 两列，无记录为 0"""
+        stats = await self.group_stats(group_id, days)
+        empty = (0, 0, 0)
+        rows = [stats.get(uid, empty) for uid in user_ids]
+        return array("q", (r[0] for r in rows)), array("q", (r[2] for r in rows))
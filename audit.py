@@ -0,0 +1,270 @@
+import asyncio
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import NamedTuple
+
+import aiosqlite
+
+from astrbot.api import logger
+
+# 当前操作的 (群号, 操作者, 目标)，由命令入口设置，写接口回调据此补全审计记录
+_context: ContextVar[tuple[str, int, int] | None] = ContextVar(
+    "qqadmin_audit_context", default=None
+)
+
+
+def current_group() -> str:
+    """当前审计上下文的群号，不在上下文中时为空串"""
+    ctx = _context.get()
+    return ctx[0] if ctx else ""
+
+
+@contextmanager
+def audit_context(
+    group_id: str | int, actor_id: str | int = 0, target_id: str | int = 0
+) -> Iterator[None]:
+    """在此范围内发出的写接口调用记为 actor_id 所为（未设置时视为 bot 自动执行）"""
+    token = _context.set((str(group_id), int(actor_id or 0), int(target_id or 0)))
+    try:
+        yield
+    finally:
+        try:
+            _context.reset(token)
+        except ValueError:
+            # 异步生成器跨任务恢复时上下文已不同，交给原上下文自然丢弃
+            pass
+
+
+# 需要审计的写接口 -> 中文名
+AUDIT_ACTIONS: dict[str, str] = {
+    "set_group_ban": "禁言",
+    "set_group_kick": "踢出",
+    "set_group_whole_ban": "全体禁言",
+    "delete_msg": "撤回",
+    "set_group_add_request": "处理进群申请",
+    "set_group_card": "改名片",
+    "set_group_special_title": "改头衔",
+    "set_group_admin": "设置管理员",
+    "set_essence_msg": "设精",
+    "delete_essence_msg": "移精",
+    "set_group_name": "改群名",
+    "set_group_portrait": "改群头像",
+    "_send_group_notice": "发群公告",
+    "config": "改配置",
+}
+
+
+class AuditEntry(NamedTuple):
+    ts: int
+    group_id: str
+    actor_id: int
+    target_id: int
+    action: str
+    detail: str
+
+    @property
+    def label(self) -> str:
+        return AUDIT_ACTIONS.get(self.action, self.action)
+
+
+class AuditLog:
+    """
+    只追加的群管操作审计表
+    - record 只在内存排队（O(1)），按固定间隔一次事务批量写入
+    - 按群、目标、操作者、时间建索引，供查询与流式导出
+    - 与配置共用一个数据库文件（随备份一起保存），但使用独立连接
+    """
+
+    # 定时落盘间隔（秒）
+    FLUSH_INTERVAL = 5
+    # 队列超过此条数时提前落盘
+    FLUSH_SIZE = 1000
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._conn: aiosqlite.Connection | None = None
+        self._pending: list[AuditEntry] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._loop_task: asyncio.Task | None = None
+
+    async def init(self):
+        self._conn = await aiosqlite.connect(str(self.db_path))
+        await self._conn.execute("PRAGMA journal_mode=WAL;")
+        await self._conn.execute("PRAGMA busy_timeout=5000;")
+        await self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts INTEGER NOT NULL,
+                group_id TEXT NOT NULL,
+                actor_id INTEGER NOT NULL,
+                target_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                detail TEXT NOT NULL
+            );
+        """)
+        for column in ("group_id", "target_id", "actor_id"):
+            await self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_audit_{column} ON audit ({column}, ts);"
+            )
+        await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit (ts);")
+        await self._conn.commit()
+        self._loop_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+        if self._conn:
+            await self.flush()
+            await self._conn.close()
+            self._conn = None
+
+    # ---------------------------- 记录 ----------------------------
+
+    def record(
+        self,
+        group_id: str | int,
+        action: str,
+        actor_id: str | int = 0,
+        target_id: str | int = 0,
+        detail: str = "",
+    ):
+        """记录一条操作"""
+        self._pending.append(
+            AuditEntry(
+                int(time.time()),
+                str(group_id),
+                int(actor_id or 0),
+                int(target_id or 0),
+                action,
+                detail,
+            )
+        )
+        if len(self._pending) >= self.FLUSH_SIZE and not self._flush_task:
+            self._flush_task = asyncio.create_task(self.flush())
+            self._flush_task.add_done_callback(self._on_flush_done)
+
+    def on_write(self, client, action: str, params: dict):
+        """写接口成功回调：补全群号/操作者后入队"""
+        if action not in AUDIT_ACTIONS:
+            return
+        ctx = _context.get()
+        group_id = params.get("group_id") or (ctx[0] if ctx else "")
+        if not group_id:
+            return
+        actor_id = ctx[1] if ctx else 0
+        target_id = params.get("user_id") or (ctx[2] if ctx else 0)
+        detail = {k: v for k, v in params.items() if k not in ("group_id", "user_id")}
+        self.record(
+            group_id,
+            action,
+            actor_id,
+            target_id,
+            json.dumps(detail, ensure_ascii=False) if detail else "",
+        )
+
+    def on_config_change(self, gid: str, changed: frozenset[str]):
+        """群配置变更回调；只记录命令触发的变更（多进程同步重放的不重复记录）"""
+        if ctx := _context.get():
+            self.record(gid, "config", ctx[1], 0, ",".join(sorted(changed)))
+
+    def _on_flush_done(self, task: asyncio.Task):
+        self._flush_task = None
+        if not task.cancelled() and task.exception():
+            logger.error(f"审计记录落盘失败：{task.exception()}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"审计记录落盘失败：{e}")
+
+    async def flush(self):
+        """把队列中的记录一次事务写入"""
+        async with self._flush_lock:
+            if not self._conn or not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            try:
+                await self._conn.executemany(
+                    """
+                    INSERT INTO audit (ts, group_id, actor_id, target_id, action, detail)
+                    VALUES (?, ?, ?, ?, ?, ?);
+                    """,
+                    pending,
+                )
+                await self._conn.commit()
+            except Exception:
+                await self._conn.rollback()
+                # 写入失败则放回队首，下次再试
+                self._pending[:0] = pending
+                raise
+
+    # ---------------------------- 查询 ----------------------------
+
+    @staticmethod
+    def _where(
+        group_id: str | int | None, target_id: int | None, actor_id: int | None
+    ) -> tuple[str, list]:
+        clauses, args = [], []
+        for column, value in (
+            ("group_id", None if group_id is None else str(group_id)),
+            ("target_id", target_id),
+            ("actor_id", actor_id),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), args
+
+    async def recent(
+        self,
+        group_id: str | int | None = None,
+        target_id: int | None = None,
+        actor_id: int | None = None,
+        limit: int = 20,
+    ) -> list[AuditEntry]:
+        """按条件查询最近的记录，新的在前"""
+        await self.flush()
+        if not self._conn:
+            return []
+        where, args = self._where(group_id, target_id, actor_id)
+        async with self._conn.execute(
+            f"""
+            SELECT ts, group_id, actor_id, target_id, action, detail FROM audit
+            {where} ORDER BY ts DESC, id DESC LIMIT ?;
+            """,
+            (*args, limit),
+        ) as cur:
+            return [AuditEntry(*row) async for row in cur]
+
+    async def export(self, path: Path, group_id: str | int | None = None) -> int:
+        """逐行流式导出到 JSONL 文件（按时间正序），返回导出条数"""
+        await self.flush()
+        if not self._conn:
+            raise RuntimeError("请先 init()")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        where, args = self._where(group_id, None, None)
+        count = 0
+        with path.open("w", encoding="utf-8") as f:
+            async with self._conn.execute(
+                f"""
+                SELECT ts, group_id, actor_id, target_id, action, detail FROM audit
+                {where} ORDER BY id;
+                """,
+                args,
+            ) as cur:
+                async for row in cur:
+                    f.write(json.dumps(AuditEntry(*row)._asdict(), ensure_ascii=False))
+                    f.write("\n")
+                    count += 1
+        return count
@@ -0,0 +1,222 @@
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Optional
+
+from astrbot import logger
+
+from .executor import TRANSIENT_ERRORS
+
+
+class CircuitOpenError(Exception):
+    """动作在该群已熔断，未实际调用接口"""
+
+
+# 写接口 -> bot 至少需要的群角色
+REQUIRED_ROLE: dict[str, str] = {
+    "set_group_ban": "admin",
+    "set_group_kick": "admin",
+    "set_group_whole_ban": "admin",
+    "set_group_card": "admin",
+    "set_group_name": "admin",
+    "set_group_portrait": "admin",
+    "_send_group_notice": "admin",
+    "set_group_admin": "owner",
+    "set_group_special_title": "owner",
+}
+# 失败原因指向目标本身（不在群、是管理员/群主等），与 bot 权限无关，不计入熔断
+TARGET_HINTS = (
+    "不存在",
+    "不在群",
+    "已退群",
+    "找不到",
+    "not found",
+    "not in group",
+    "not a member",
+    "no such",
+    "不能禁言管理员",
+    "不能踢出管理员",
+    "不能对管理员",
+    "不能对群主",
+    "cannot ban admin",
+    "cannot kick admin",
+)
+# 失败原因指向 bot 自身权限不足，计入熔断
+PERMISSION_HINTS = (
+    "权限不足",
+    "无权限",
+    "没有权限",
+    "不是管理员",
+    "不是群主",
+    "not admin",
+    "not owner",
+    "no permission",
+    "permission denied",
+    "insufficient permission",
+)
+ROLE_RANK = {"member": 0, "admin": 1, "owner": 2}
+ROLE_NAME = {"member": "群员", "admin": "管理员", "owner": "群主"}
+
+
+@dataclass
+class Circuit:
+    failures: int = 0
+    # 熔断到期时间（monotonic），0 表示闭合
+    open_until: float = 0.0
+    backoff: float = 0.0
+    reason: str = ""
+    # 已放行一次探测、尚未返回
+    probing: bool = False
+    # 探测成功过：不再凭缓存角色拦截
+    verified: bool = False
+
+
+class CircuitBreaker:
+    """
+    按 (群, 动作) 熔断注定失败的写接口调用
+    - 权限类失败连续若干次，或缓存中 bot 的角色不够，即熔断一段时间，期间直接抛 CircuitOpenError
+    - 针对具体目标的失败（对方是管理员、已退群等）不计入，否则一个坏目标会拖垮整群的同类操作
+    - 网络错误、超时与群无关，由调用方重试，不计入
+    - 到期后放行一次探测：成功则闭合，失败则退避时间翻倍
+    - bot 在该群的角色变化或离群时清空该群状态
+    """
+
+    _instance: Optional["CircuitBreaker"] = None
+
+    # 连续失败多少次熔断
+    FAILURE_THRESHOLD = 3
+    # 退避时间（秒），每次重新熔断翻倍
+    BASE_BACKOFF = 60.0
+    MAX_BACKOFF = 3600.0
+    # 探测期间其余调用仍被拦截，探测未返回则此时长后再放行下一次
+    PROBE_WINDOW = 30.0
+
+    def __init__(self):
+        self._circuits: dict[tuple[str, str], Circuit] = {}
+        # (group_id, user_id) -> 成员资料，只查缓存、不触发请求
+        self.member_lookup: Callable[[str, int], dict | None] | None = None
+        self.stats = {"skipped": 0, "opened": 0}
+
+    @classmethod
+    def get_instance(cls) -> "CircuitBreaker":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def configure(self, member_lookup: Callable[[str, int], dict | None]):
+        self.member_lookup = member_lookup
+
+    def _open(self, key: tuple[str, str], circuit: Circuit, reason: str):
+        circuit.backoff = min(max(circuit.backoff * 2, self.BASE_BACKOFF), self.MAX_BACKOFF)
+        circuit.open_until = time.monotonic() + circuit.backoff
+        circuit.reason = reason
+        circuit.probing = False
+        self.stats["opened"] += 1
+        logger.warning(
+            f"群{key[0]}的{key[1]}已熔断{int(circuit.backoff)}秒：{reason}"
+        )
+
+    def _role_blocked(self, gid: str, self_id: int, action: str) -> str | None:
+        need = REQUIRED_ROLE.get(action)
+        if not need or not self.member_lookup or not self_id:
+            return None
+        member = self.member_lookup(gid, self_id)
+        role = member.get("role") if member else None
+        if role in ROLE_RANK and ROLE_RANK[role] < ROLE_RANK[need]:
+            return f"bot是{ROLE_NAME[role]}，需要{ROLE_NAME[need]}"
+        return None
+
+    def before(self, self_id: int, action: str, params: dict):
+        """调用前检查，已熔断则抛 CircuitOpenError"""
+        if not params.get("group_id"):
+            return
+        key = (str(params["group_id"]), action)
+        circuit = self._circuits.get(key)
+        now = time.monotonic()
+        if circuit and circuit.open_until:
+            if now < circuit.open_until:
+                self.stats["skipped"] += 1
+                raise CircuitOpenError(f"群{key[0]}的{action}已熔断：{circuit.reason}")
+            # 半开：放行这一次探测
+            circuit.open_until = now + self.PROBE_WINDOW
+            circuit.probing = True
+            return
+        if circuit and circuit.verified:
+            return
+        if reason := self._role_blocked(key[0], self_id, action):
+            circuit = self._circuits.setdefault(key, Circuit())
+            self._open(key, circuit, reason)
+            self.stats["skipped"] += 1
+            raise CircuitOpenError(f"群{key[0]}的{action}已熔断：{reason}")
+
+    def on_success(self, action: str, params: dict):
+        key = (str(params.get("group_id") or ""), action)
+        if key in self._circuits:
+            self._circuits[key] = Circuit(verified=True)
+
+    @staticmethod
+    def _message(error: Exception) -> str:
+        result = getattr(error, "result", None) or {}
+        return str(result.get("wording") or result.get("message") or error)
+
+    def counts(self, gid: str, params: dict, error: Exception) -> bool:
+        """该失败是否说明这个动作在本群注定失败（bot 无权限）"""
+        if isinstance(error, TRANSIENT_ERRORS):
+            return False
+        # 目标是管理员/群主：换个目标就能成功
+        if (uid := params.get("user_id")) and self.member_lookup:
+            member = self.member_lookup(gid, int(uid))
+            if member and member.get("role") in ("admin", "owner"):
+                return False
+        message = self._message(error).lower()
+        if any(hint in message for hint in TARGET_HINTS):
+            return False
+        # 无法判断的失败按目标问题处理，宁可多试也不误熔断
+        return any(hint in message for hint in PERMISSION_HINTS)
+
+    def on_failure(self, action: str, params: dict, error: Exception):
+        """接口调用失败；只有权限类失败计入"""
+        if not params.get("group_id"):
+            return
+        gid = str(params["group_id"])
+        key = (gid, action)
+        if not self.counts(gid, params, error):
+            # 探测得到的不是权限问题：结束探测，不让其余调用等到探测窗口过去
+            if (circuit := self._circuits.get(key)) and circuit.probing:
+                circuit.open_until = 0.0
+                circuit.failures = 0
+                circuit.probing = False
+            return
+        circuit = self._circuits.setdefault(key, Circuit())
+        circuit.failures += 1
+        message = self._message(error)
+        # 探测失败立即重新熔断
+        if circuit.open_until or circuit.failures >= self.FAILURE_THRESHOLD:
+            circuit.verified = False
+            self._open(key, circuit, f"连续失败{circuit.failures}次（{message}）")
+
+    def reset(self, group_id: str | int):
+        gid = str(group_id)
+        for key in [k for k in self._circuits if k[0] == gid]:
+            del self._circuits[key]
+
+    def on_notice(self, raw: dict):
+        """bot 的角色变化或离群：该群重新判断"""
+        uid = int(raw.get("user_id") or 0)
+        if not uid or uid != int(raw.get("self_id") or 0):
+            return
+        if raw.get("notice_type") in ("group_admin", "group_decrease"):
+            self.reset(raw.get("group_id") or "")
+
+    def format_stats(self) -> str:
+        now = time.monotonic()
+        opened = [
+            f"  群{gid} {action}：剩余{int(c.open_until - now)}秒，{c.reason}"
+            for (gid, action), c in self._circuits.items()
+            if c.open_until > now
+        ]
+        head = (
+            f"熔断：当前{len(opened)}项，累计熔断{self.stats['opened']}次，"
+            f"拦截调用{self.stats['skipped']}次"
+        )
+        return "\n".join([head, *opened])
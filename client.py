@@ -0,0 +1,214 @@
+import asyncio
+import time
+import weakref
+from collections.abc import Callable
+from functools import partial
+from typing import Any, Optional
+
+from aiocqhttp import CQHttp
+from aiocqhttp.exceptions import ActionFailed
+
+from astrbot import logger
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from .audit import current_group
+from .breaker import CircuitBreaker
+from .executor import TRANSIENT_ERRORS
+from .scheduler import ActionScheduler
+
+
+class ReadCoalescer:
+    """
+    OneBot 读接口合并层
+    - 参数完全相同的并发读请求合并为一次（single-flight）
+    - 可按接口设置短 TTL 复用结果；调用方不要原地修改返回值
+    - 写接口直接透传；写成功后由 BotClient 失效同群的读缓存，
+      失效前已发出的读请求结果不再缓存，也不再被新请求合并
+    - 实际请求统一交给 ActionScheduler 限速、排队
+    """
+
+    _instance: Optional["ReadCoalescer"] = None
+
+    # 读接口 -> 结果缓存秒数（0 表示只合并进行中的请求，不缓存结果）
+    READ_ACTIONS: dict[str, float] = {
+        "get_login_info": 300.0,
+        "get_group_list": 30.0,
+        "get_group_info": 30.0,
+        "get_stranger_info": 60.0,
+        "get_group_member_info": 5.0,
+        "get_group_member_list": 0.0,
+        "get_group_root_files": 5.0,
+        "get_group_files_by_folder": 5.0,
+        "get_essence_msg_list": 0.0,
+        "get_group_msg_history": 0.0,
+        "_get_group_notice": 10.0,
+    }
+    # 缓存条目超过此数时清理过期项
+    CACHE_PRUNE_SIZE = 10000
+
+    def __init__(self):
+        # key: (bot id, action, group_id, 参数)
+        self._cache: dict[tuple, tuple[float, Any]] = {}
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        # (bot id, group_id) -> 失效次数，读请求完成时比对，变了说明结果可能早于写入
+        self._generations: dict[tuple[int, str], int] = {}
+        self.stats = {"calls": 0, "hits": 0, "merged": 0, "bypass": 0}
+
+    @classmethod
+    def get_instance(cls) -> "ReadCoalescer":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def _key(bot: CQHttp, action: str, params: dict) -> tuple:
+        # no_cache 只影响是否读 TTL 缓存，不进 key，以便与同参数的进行中请求合并
+        frozen = tuple(
+            sorted((k, repr(v)) for k, v in params.items() if k != "no_cache")
+        )
+        return (id(bot), action, str(params.get("group_id", "")), frozen)
+
+    async def call(
+        self, bot: CQHttp, action: str, params: dict, group_id: str | int | None = None
+    ) -> Any:
+        """group_id：写接口按群限速用的群号（参数里没有群号时由调用方补上）"""
+        ttl = self.READ_ACTIONS.get(action)
+        if ttl is None:
+            self.stats["bypass"] += 1
+            return await ActionScheduler.get_instance().submit(
+                bot, action, params, group_id
+            )
+
+        key = self._key(bot, action, params)
+        # no_cache 的请求不读 TTL 缓存，但仍与进行中的请求合并
+        if ttl > 0 and not params.get("no_cache"):
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self.stats["hits"] += 1
+                return cached[1]
+            if cached:
+                del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["calls"] += 1
+            task = asyncio.create_task(
+                ActionScheduler.get_instance().submit(bot, action, params)
+            )
+            self._inflight[key] = task
+            generation = self._generations.get((key[0], key[2]), 0)
+            task.add_done_callback(partial(self._on_done, key, ttl, generation))
+        else:
+            self.stats["merged"] += 1
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: tuple, ttl: float, generation: int, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if self._generations.get((key[0], key[2]), 0) != generation:
+            # 请求发出后同群有写入，结果可能是写入前的数据
+            return
+        if ttl > 0 and not task.cancelled() and task.exception() is None:
+            if len(self._cache) >= self.CACHE_PRUNE_SIZE:
+                self.prune()
+            self._cache[key] = (time.monotonic() + ttl, task.result())
+
+    def invalidate(self, bot: CQHttp, group_id: str | int):
+        """
+        失效某群的读缓存
+        进行中的读请求照常返回给已在等待的调用方，但结果不再缓存、也不再被合并
+        """
+        bot_id, gid = id(bot), str(group_id)
+        self._generations[(bot_id, gid)] = self._generations.get((bot_id, gid), 0) + 1
+        for key in [k for k in self._cache if k[0] == bot_id and k[2] == gid]:
+            del self._cache[key]
+        for key in [k for k in self._inflight if k[0] == bot_id and k[2] == gid]:
+            del self._inflight[key]
+
+    def prune(self):
+        now = time.monotonic()
+        self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+
+    def format_stats(self) -> str:
+        self.prune()
+        s = self.stats
+        return (
+            f"读接口合并：实际请求{s['calls']}次，缓存命中{s['hits']}次，"
+            f"合并{s['merged']}次，写接口透传{s['bypass']}次，缓存条目{len(self._cache)}"
+        )
+
+
+class BotClient:
+    """
+    event.bot 的包装，用法与 CQHttp 相同（client.get_group_root_files(...)）
+    读接口经 ReadCoalescer 合并，所有请求经 ActionScheduler 按优先级限速发出
+    写接口先过 CircuitBreaker，注定失败的调用直接抛 CircuitOpenError
+    """
+
+    def __init__(self, bot: CQHttp, self_id: int = 0):
+        self.bot = bot
+        self.self_id = self_id
+
+    async def call_action(self, action: str, **params) -> Any:
+        if action in ReadCoalescer.READ_ACTIONS:
+            return await ReadCoalescer.get_instance().call(self.bot, action, params)
+        breaker = CircuitBreaker.get_instance()
+        breaker.before(self.self_id, action, params)
+        # delete_msg、设精华等参数里没有群号，取命令所在群，同样经按群令牌桶限速
+        group_key = params.get("group_id") or current_group()
+        try:
+            result = await ReadCoalescer.get_instance().call(
+                self.bot, action, params, group_key
+            )
+        except (ActionFailed, *TRANSIENT_ERRORS) as e:
+            breaker.on_failure(action, params, e)
+            raise
+        breaker.on_success(action, params)
+        if group_id := params.get("group_id"):
+            ReadCoalescer.get_instance().invalidate(self.bot, group_id)
+        for listener in _write_listeners:
+            try:
+                listener(self, action, params)
+            except Exception as e:
+                logger.error(f"写接口监听器出错：{e}", exc_info=True)
+        return result
+
+    def __getattr__(self, action: str):
+        if action.startswith("__"):
+            raise AttributeError(action)
+        return partial(self.call_action, action)
+
+
+_clients: "weakref.WeakKeyDictionary[CQHttp, BotClient]" = weakref.WeakKeyDictionary()
+
+# 写接口成功后的回调 (client, action, params)，须为同步轻量函数
+_write_listeners: list[Callable[[BotClient, str, dict], None]] = []
+
+
+def on_write(listener: Callable[[BotClient, str, dict], None]) -> Callable[[], None]:
+    """注册写接口成功回调（如禁言登记、审计），返回取消注册的函数"""
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+    def unsubscribe():
+        if listener in _write_listeners:
+            _write_listeners.remove(listener)
+
+    return unsubscribe
+
+
+def get_bot_client(bot: CQHttp, self_id: int = 0) -> BotClient:
+    """获取 bot 的包装客户端（无事件上下文时使用，如定时任务）"""
+    client = _clients.get(bot)
+    if client is None:
+        client = _clients[bot] = BotClient(bot, self_id)
+    elif self_id and not client.self_id:
+        client.self_id = self_id
+    return client
+
+
+def get_client(event: AiocqhttpMessageEvent) -> BotClient:
+    """获取事件所属 bot 的包装客户端"""
+    return get_bot_client(event.bot, int(event.get_self_id() or 0))
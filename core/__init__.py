@@ -1,19 +1,25 @@
+from .audit_handle import AuditHandle
+from .backup_handle import BackupHandle
 from .banpro_handel import BanproHandle
 from .curfew_handle import CurfewHandle
 from .file_handle import FileHandle
 from .join_handle import JoinHandle
 from .llm_handle import LLMHandle
 from .member_handle import MemberHandle
+from .mute_handle import MuteHandle
 from .normal_handle import NormalHandle
 from .notice_handle import NoticeHandle
 
 __all__ = [
+    "AuditHandle",
+    "BackupHandle",
     "CurfewHandle",
     "BanproHandle",
     "FileHandle",
     "JoinHandle",
     "LLMHandle",
     "MemberHandle",
+    "MuteHandle",
     "NormalHandle",
     "NoticeHandle",
 ]
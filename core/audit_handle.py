@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from ..audit import AuditEntry
+from ..outbox import Outbox
+from ..roster import RosterStore
+from ..utils import get_ats
+
+if TYPE_CHECKING:
+    from ..main import QQAdminPlugin
+
+
+class AuditHandle:
+    # 审计记录默认/最多展示条数
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    def __init__(self, plugin: QQAdminPlugin):
+        self.plugin = plugin
+
+    @staticmethod
+    def _name(group_id: str, user_id: int) -> str:
+        """只查名单缓存，不为展示发请求"""
+        member = RosterStore.get_instance().member(group_id, user_id) or {}
+        name = member.get("card") or member.get("nickname")
+        return f"{name}({user_id})" if name else str(user_id)
+
+    def _format(self, entry: AuditEntry, with_group: bool = False) -> str:
+        line = f"{datetime.fromtimestamp(entry.ts):%m-%d %H:%M} "
+        if with_group:
+            line += f"[群{entry.group_id}] "
+        line += self._name(entry.group_id, entry.actor_id) if entry.actor_id else "bot自动"
+        line += f" {entry.label}"
+        if entry.target_id:
+            line += f" {self._name(entry.group_id, entry.target_id)}"
+        if entry.detail:
+            line += f"：{entry.detail}"
+        return line
+
+    def _parse(self, event: AiocqhttpMessageEvent) -> tuple[int | None, bool, int]:
+        """解析 [操作者] <@群友|QQ> <条数>，返回 (QQ, 是否按操作者查, 条数)"""
+        at_ids = get_ats(event)
+        user = int(at_ids[0]) if at_ids else None
+        by_actor = False
+        limit = self.DEFAULT_LIMIT
+        for arg in event.message_str.split()[1:]:
+            if arg == "操作者":
+                by_actor = True
+            elif not arg.isdigit():
+                continue
+            # QQ 号至少 5 位，较短的数字视为条数
+            elif len(arg) >= 5 and user is None:
+                user = int(arg)
+            else:
+                limit = min(int(arg), self.MAX_LIMIT)
+        return user, by_actor, limit
+
+    async def _send(
+        self, event: AiocqhttpMessageEvent, entries: list[AuditEntry], with_group: bool
+    ):
+        if not entries:
+            await event.send(event.plain_result("暂无审计记录"))
+            return
+        async with Outbox(event) as out:
+            for entry in entries:
+                out.add(self._format(entry, with_group))
+
+    async def query(self, event: AiocqhttpMessageEvent):
+        """
+        审计记录 [操作者] <@群友|QQ> <条数>：本群最近的操作
+        指定群友时只看针对他的，加“操作者”则看他执行的
+        """
+        user, by_actor, limit = self._parse(event)
+        entries = await self.plugin.audit.recent(
+            event.get_group_id(),
+            target_id=None if by_actor else user,
+            actor_id=user if by_actor else None,
+            limit=limit,
+        )
+        await self._send(event, entries, with_group=False)
+
+    async def query_user(self, event: AiocqhttpMessageEvent):
+        """跨群审计 [操作者] <@群友|QQ> <条数>：某人在所有群被执行（或执行）的操作"""
+        user, by_actor, limit = self._parse(event)
+        if user is None:
+            await event.send(event.plain_result("请@群友或输入QQ号"))
+            return
+        entries = await self.plugin.audit.recent(
+            target_id=None if by_actor else user,
+            actor_id=user if by_actor else None,
+            limit=limit,
+        )
+        await self._send(event, entries, with_group=True)
+
+    async def export(self, event: AiocqhttpMessageEvent, scope: str = ""):
+        """审计导出 <全部>：流式导出本群（或所有群）的审计记录到数据目录（JSONL）"""
+        group_id = None if scope == "全部" else event.get_group_id()
+        path = (
+            self.plugin.plugin_data_dir
+            / f"qqadmin_audit_{group_id or 'all'}_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+        )
+        count = await self.plugin.audit.export(path, group_id)
+        await event.send(event.plain_result(f"已导出{count}条审计记录：{path}"))
@@ -0,0 +1,138 @@
+import asyncio
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from astrbot.api import logger
+from astrbot.core.config.astrbot_config import AstrBotConfig
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+
+class BackupHandle:
+    """插件数据在线备份：SQLite 备份 API 分步拷贝 + 快照轮转 + 可选 VACUUM INTO 压缩"""
+
+    # 每步拷贝的页数，步间让出写锁
+    PAGES_PER_STEP = 64
+    STEP_SLEEP = 0.005
+
+    def __init__(self, config: AstrBotConfig, data_dir: Path, db_path: Path):
+        self.conf = config["backup"]
+        self.data_dir = data_dir
+        self.db_path = db_path
+        self.backup_dir = data_dir / "backups"
+        # 随快照一起复制的 JSON 数据文件
+        self.extra_files: list[Path] = [
+            data_dir / "curfew_data.json",
+            data_dir / "mute_data.json",
+        ]
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def start(self):
+        """按配置的间隔定时备份"""
+        if self.conf["interval_hours"] > 0 and not self._task:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        interval = self.conf["interval_hours"] * 3600
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.backup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"定时备份失败：{e}", exc_info=True)
+
+    # ----------------------------------------------------------------
+
+    def _copy_db(self, dst: Path):
+        """备份 API 分步拷贝（在线程中执行，不阻塞事件循环，也不占用主连接）"""
+        src = sqlite3.connect(str(self.db_path))
+        dest = sqlite3.connect(str(dst))
+        try:
+            src.backup(dest, pages=self.PAGES_PER_STEP, sleep=self.STEP_SLEEP)
+        finally:
+            dest.close()
+            src.close()
+
+    @staticmethod
+    def _vacuum_into(src: Path, dst: Path):
+        """从快照（而非线上库）压缩出一份紧凑副本"""
+        conn = sqlite3.connect(str(src))
+        try:
+            conn.execute("VACUUM INTO ?", (str(dst),))
+        finally:
+            conn.close()
+
+    def _new_snapshot_dir(self) -> Path:
+        """按时间命名的快照目录；同一秒内多次备份（手动与定时撞上）时追加序号"""
+        name = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        target, n = self.backup_dir / name, 0
+        while True:
+            try:
+                target.mkdir()
+                return target
+            except FileExistsError:
+                n += 1
+                target = self.backup_dir / f"{name}_{n}"
+
+    def _rotate(self):
+        """只保留最近 keep 份快照"""
+        keep = max(1, self.conf["keep"])
+        snapshots = sorted(p for p in self.backup_dir.iterdir() if p.is_dir())
+        for old in snapshots[:-keep]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    async def backup(self) -> tuple[Path, float, int]:
+        """执行一次备份，返回 (快照目录, 耗时秒, 字节数)"""
+        async with self._lock:
+            start = time.perf_counter()
+            target = self._new_snapshot_dir()
+
+            if self.db_path.exists():
+                raw = target / self.db_path.name
+                await asyncio.to_thread(self._copy_db, raw)
+                if self.conf["vacuum"]:
+                    compact = target / f"{self.db_path.stem}.compact.db"
+                    await asyncio.to_thread(self._vacuum_into, raw, compact)
+                    raw.unlink()
+                    compact.rename(raw)
+
+            # JSON 文件在事件循环里同步写入，这里同样在循环里读，保证读到完整内容
+            for path in self.extra_files:
+                if path.exists():
+                    data = path.read_bytes()
+                    await asyncio.to_thread((target / path.name).write_bytes, data)
+
+            await asyncio.to_thread(self._rotate)
+            elapsed = time.perf_counter() - start
+            size = sum(f.stat().st_size for f in target.iterdir() if f.is_file())
+            logger.info(
+                f"群管数据备份完成：{target.name}，耗时{elapsed:.2f}秒，大小{size / 1024:.1f}KB"
+            )
+            return target, elapsed, size
+
+    async def backup_data(self, event: AiocqhttpMessageEvent):
+        """手动备份"""
+        try:
+            target, elapsed, size = await self.backup()
+        except Exception as e:
+            logger.error(f"备份失败：{e}", exc_info=True)
+            await event.send(event.plain_result(f"备份失败：{e}"))
+            return
+        await event.send(
+            event.plain_result(
+                f"备份完成：{target.name}\n耗时：{elapsed:.2f}秒\n大小：{size / 1024:.1f}KB"
+            )
+        )
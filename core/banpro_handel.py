@@ -11,6 +11,9 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..audit import audit_context
+from ..breaker import CircuitOpenError
+from ..client import get_client
 from ..data import QQAdminDB
 from ..utils import get_ats, get_nickname, parse_bool
 
@@ -19,9 +22,11 @@ class BanproHandle:
     def __init__(self, config: AstrBotConfig, db: QQAdminDB, ban_lexicon_path: Path):
         self.conf = config
         self.db = db
-        self.builtin_ban_words = json.loads(
-            ban_lexicon_path.read_text(encoding="utf-8")
-        )["words"]
+        self.builtin_ban_words: tuple[str, ...] = tuple(
+            str(w).lower()
+            for w in json.loads(ban_lexicon_path.read_text(encoding="utf-8"))["words"]
+            if str(w)
+        )
         self.spamming_count = 5
         self.spamming_interval = 0.5
         self.msg_timestamps: dict[str, dict[str, deque[float]]] = defaultdict(
@@ -113,44 +118,50 @@ class BanproHandle:
 
     async def on_ban_words(self, event: AiocqhttpMessageEvent):
         """检测禁词并撤回消息、禁言用户"""
-        gid = event.get_group_id()
+        cfg = await self.db.group(event.get_group_id())
 
         # 检测自定义的违禁词
-        if ban_words:= await self.db.get(gid, "custom_ban_words", []):
-            if await self.check_ban_words(event, ban_words):
+        if cfg.ban_words_lower:
+            if await self.check_ban_words(event, cfg.ban_words_lower, cfg.word_ban_time):
                 return
 
         # 检测内置违禁词
-        if await self.db.get(gid, "builtin_ban", False):
-            if await self.check_ban_words(event, self.builtin_ban_words):
+        if cfg.builtin_ban:
+            if await self.check_ban_words(
+                event, self.builtin_ban_words, cfg.word_ban_time
+            ):
                 return
 
     async def check_ban_words(
-        self, event: AiocqhttpMessageEvent, ban_words: list[str]
+        self, event: AiocqhttpMessageEvent, ban_words: tuple[str, ...], ban_time: int
     ) -> bool:
-        """检测违禁词并撤回消息"""
-        gid = event.get_group_id()
+        """检测违禁词并撤回消息（ban_words 需已转小写）"""
         msg = event.message_str.lower()
         for word in ban_words:
             if word in msg:
-                # 撤回消息
-                try:
-                    message_id = event.message_obj.message_id
-                    await event.bot.delete_msg(message_id=int(message_id))
-                except Exception:
-                    pass
-                # 禁言发送者
-                ban_time = await self.db.get(gid, "word_ban_time", 0)
-                if ban_time > 0:
+                # delete_msg 不带群号，按 bot 自动处置记入本群审计
+                with audit_context(event.get_group_id(), 0, event.get_sender_id()):
+                    # 撤回消息
                     try:
-                        await event.bot.set_group_ban(
-                            group_id=int(event.get_group_id()),
-                            user_id=int(event.get_sender_id()),
-                            duration=ban_time,
-                        )
+                        message_id = event.message_obj.message_id
+                        await get_client(event).delete_msg(message_id=int(message_id))
                     except Exception:
-                        logger.error(f"bot在群{event.get_group_id()}权限不足，禁言失败")
                         pass
+                    # 禁言发送者
+                    if ban_time and ban_time > 0:
+                        try:
+                            await get_client(event).set_group_ban(
+                                group_id=int(event.get_group_id()),
+                                user_id=int(event.get_sender_id()),
+                                duration=ban_time,
+                            )
+                        except CircuitOpenError:
+                            pass
+                        except Exception:
+                            logger.error(
+                                f"bot在群{event.get_group_id()}权限不足，禁言失败"
+                            )
+                            pass
                 return True
         return False
 
@@ -175,7 +186,7 @@ class BanproHandle:
         """刷屏禁言"""
         group_id = event.get_group_id()
         sender_id = event.get_sender_id()
-        ban_time = await self.db.get(group_id, "spamming_ban_time", 0)
+        ban_time = (await self.db.group(group_id)).spamming_ban_time or 0
         if (
             sender_id == event.get_self_id()
             or ban_time <= 0
@@ -200,15 +211,18 @@ class BanproHandle:
                 self.last_banned_time[group_id][sender_id] = now
 
                 try:
-                    await event.bot.set_group_ban(
-                        group_id=int(group_id),
-                        user_id=int(sender_id),
-                        duration=ban_time,
-                    )
+                    with audit_context(group_id, 0, sender_id):
+                        await get_client(event).set_group_ban(
+                            group_id=int(group_id),
+                            user_id=int(sender_id),
+                            duration=ban_time,
+                        )
                     nickname = await get_nickname(event, sender_id)
                     await event.send(
                         event.plain_result(f"检测到{nickname}刷屏，已禁言")
                     )
+                except CircuitOpenError:
+                    pass
                 except Exception:
                     logger.error(f"bot在群{group_id}权限不足，禁言失败")
                 timestamps.clear()
@@ -261,7 +275,7 @@ class BanproHandle:
             # 到期按多数票决定（平票视为否决）
             if agree_count > disagree_count:
                 try:
-                    await event.bot.set_group_ban(
+                    await get_client(event).set_group_ban(
                         group_id=int(group_id),
                         user_id=int(record["target"]),
                         duration=record["ban_time"],
@@ -269,6 +283,8 @@ class BanproHandle:
                     await event.send(
                         event.plain_result(f"投票时间到！已禁言{nickname2}")
                     )
+                except CircuitOpenError:
+                    pass
                 except Exception:
                     logger.error(f"bot在群{group_id}权限不足，禁言失败")
             else:
@@ -307,12 +323,14 @@ class BanproHandle:
         # 提前达成赞同阈值 → 立即禁言
         if agree_count >= threshold:
             try:
-                await event.bot.set_group_ban(
+                await get_client(event).set_group_ban(
                     group_id=int(group_id),
                     user_id=int(target_id),
                     duration=record["ban_time"],
                 )
                 await event.send(event.plain_result(f"投票通过！已禁言{nickname}"))
+            except CircuitOpenError:
+                pass
             except Exception:
                 logger.error(f"bot在群{group_id}权限不足，禁言失败")
             finally:
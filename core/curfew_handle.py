@@ -20,6 +20,8 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_platform_adapter import (
 )
 from astrbot.core.star.context import Context
 
+from ..client import get_bot_client
+
 
 class CurfewStore:
     """负责宵禁任务数据的统一持久化"""
@@ -81,12 +83,13 @@ class GroupCurfew:
             if self.whole_ban_status:
                 return
             self.whole_ban_status = True
+        client = get_bot_client(self.bot)
         try:
-            await self.bot.send_group_msg(
+            await client.send_group_msg(
                 group_id=int(self.group_id),
                 message=f"【{self._start_time_str}】本群宵禁开始！",
             )
-            await self.bot.set_group_whole_ban(group_id=int(self.group_id), enable=True)
+            await client.set_group_whole_ban(group_id=int(self.group_id), enable=True)
             logger.info(f"群 {self.group_id} 已开启全体禁言")
         except Exception as e:
             logger.error(f"群 {self.group_id} 宵禁开启失败: {e}", exc_info=True)
@@ -102,12 +105,13 @@ class GroupCurfew:
             if not self.whole_ban_status:
                 return
             self.whole_ban_status = False
+        client = get_bot_client(self.bot)
         try:
-            await self.bot.send_group_msg(
+            await client.send_group_msg(
                 group_id=int(self.group_id),
                 message=f"【{self._end_time_str}】本群宵禁结束！",
             )
-            await self.bot.set_group_whole_ban(
+            await client.set_group_whole_ban(
                 group_id=int(self.group_id), enable=False
             )
             logger.info(f"群 {self.group_id} 已解除全体禁言")
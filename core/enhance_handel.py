@@ -9,6 +9,7 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..client import get_client
 from ..utils import get_ats, get_nickname
 
 
@@ -37,13 +38,13 @@ class EnhanceHandle:
                 # 撤回消息
                 try:
                     message_id = event.message_obj.message_id
-                    await event.bot.delete_msg(message_id=int(message_id))
+                    await get_client(event).delete_msg(message_id=int(message_id))
                 except Exception:
                     pass
                 # 禁言发送者
                 if self.conf["forbidden"]["ban_time"] > 0:
                     try:
-                        await event.bot.set_group_ban(
+                        await get_client(event).set_group_ban(
                             group_id=int(event.get_group_id()),
                             user_id=int(event.get_sender_id()),
                             duration=self.conf["forbidden"]["ban_time"],
@@ -88,7 +89,7 @@ class EnhanceHandle:
                 self.last_banned_time[group_id][sender_id] = now
 
                 try:
-                    await event.bot.set_group_ban(
+                    await get_client(event).set_group_ban(
                         group_id=int(group_id),
                         user_id=int(sender_id),
                         duration=self.conf["spamming"]["ban_time"],
@@ -148,7 +149,7 @@ class EnhanceHandle:
             # 到期按多数票决定（平票视为否决）
             if agree_count > disagree_count:
                 try:
-                    await event.bot.set_group_ban(
+                    await get_client(event).set_group_ban(
                         group_id=int(group_id),
                         user_id=int(record["target"]),
                         duration=record["ban_time"],
@@ -193,7 +194,7 @@ class EnhanceHandle:
         # 提前达成赞同阈值 → 立即禁言
         if agree_count >= threshold:
             try:
-                await event.bot.set_group_ban(
+                await get_client(event).set_group_ban(
                     group_id=int(group_id),
                     user_id=int(target_id),
                     duration=record["ban_time"],
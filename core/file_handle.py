@@ -9,6 +9,7 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..client import get_client
 from ..utils import download_file
 
 
@@ -29,7 +30,7 @@ class FileHandle:
         - "数字/数字" -> 用缓存解析 (folder序号/文件序号)
         """
         path = path.strip()
-        response = await event.bot.get_group_root_files(group_id=int(event.get_group_id()))
+        response = await get_client(event).get_group_root_files(group_id=int(event.get_group_id()))
         _, mapping = self._get_folder_info(response, "")
 
         def resolve_index(
@@ -57,7 +58,7 @@ class FileHandle:
             if right.isdigit() and folder_name:
                 target_folder = await self._get_folder(event, folder_name)
                 if target_folder:
-                    folder_files = await event.bot.get_group_files_by_folder(
+                    folder_files = await get_client(event).get_group_files_by_folder(
                         group_id=int(event.get_group_id()),
                         folder_id=target_folder["folder_id"],
                     )
@@ -86,7 +87,7 @@ class FileHandle:
         self, event: AiocqhttpMessageEvent, folder_name: str
     ) -> dict | None:
         """从根目录下找到指定文件夹, 返回文件夹数据"""
-        response = await event.bot.get_group_root_files(
+        response = await get_client(event).get_group_root_files(
             group_id=int(event.get_group_id())
         )
         return next(
@@ -154,7 +155,7 @@ class FileHandle:
         target_folder = await self._get_folder(event, folder_name=folder_name)
         if not target_folder:
             return None, None
-        response = await event.bot.get_group_files_by_folder(
+        response = await get_client(event).get_group_files_by_folder(
             group_id=int(event.get_group_id()), folder_id=target_folder["folder_id"]
         )
         file = next((f for f in response["files"] if f["file_name"] == file_name), None)
@@ -181,7 +182,7 @@ class FileHandle:
         确保群文件夹存在，如果不存在则创建，返回目标文件夹数据
         """
         group_id = int(event.get_group_id())
-        client = event.bot
+        client = get_client(event)
 
         target_folder = await self._get_folder(event, folder_name)
         if target_folder:
@@ -207,7 +208,7 @@ class FileHandle:
             return
 
         group_id = int(event.get_group_id())
-        client = event.bot
+        client = get_client(event)
 
         # 拼接本地缓存路径
         file_path = await self._save_temp_file(event, file_name)
@@ -249,13 +250,13 @@ class FileHandle:
                     await event.send(event.plain_result(f"{path} 不存在"))
                     return
             else:
-                response = await event.bot.get_group_root_files(group_id=group_id)
+                response = await get_client(event).get_group_root_files(group_id=group_id)
                 file = next(
                     (f for f in response["files"] if file_name == f["file_name"]),
                     None,
                 )
             if file:
-                await event.bot.delete_group_file(
+                await get_client(event).delete_group_file(
                     group_id=group_id, file_id=file["file_id"]
                 )
                 await event.send(event.plain_result(f"已删除群文件：📄{file_name}"))
@@ -263,7 +264,7 @@ class FileHandle:
         # 删除文件夹
         elif folder_name and not file_name:
             if target_folder := await self._get_folder(event, folder_name):
-                await event.bot.delete_group_folder(
+                await get_client(event).delete_group_folder(
                     group_id=group_id, folder_id=target_folder["folder_id"]
                 )
                 await event.send(
@@ -275,7 +276,7 @@ class FileHandle:
     async def view_group_file(self, event: AiocqhttpMessageEvent, path):
         """查看群文件/目录，path 可以是 文件夹名、文件名 或 文件夹名/文件名"""
         group_id = int(event.get_group_id())
-        client = event.bot
+        client = get_client(event)
         if not path:
             # 查看根目录
             response = await client.get_group_root_files(group_id=group_id)
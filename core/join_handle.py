@@ -1,11 +1,11 @@
-from aiocqhttp import CQHttp
-
 from astrbot.api import logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..audit import audit_context
+from ..client import BotClient, get_client
 from ..data import QQAdminDB
 from ..utils import get_nickname, get_reply_message_str, parse_bool
 
@@ -17,7 +17,7 @@ class JoinHandle:
         self.db = db
         self._fail: dict[str, int] = {}
 
-    async def _send_admin(self, client: CQHttp, message: str):
+    async def _send_admin(self, client: BotClient, message: str):
         for admin_id in self.admin_ids:
             if admin_id.isdigit():
                 try:
@@ -199,13 +199,14 @@ class JoinHandle:
         user_level: int | None = None,
     ) -> tuple[bool | None, str]:
         """判断是否让该用户入群，返回原因"""
+        cfg = await self.db.group(gid)
+
         # 1.黑名单用户
-        block_ids = await self.db.get(gid, "block_ids", [])
-        if uid in block_ids:
+        if uid.isdigit() and int(uid) in cfg.block_id_set:
             return False, "黑名单用户"
 
         # 2.QQ等级过低
-        min_level = await self.db.get(gid, "join_min_level")
+        min_level = cfg.join_min_level or 0
         if min_level > 0 and user_level is not None and user_level < min_level:
             return False, f"QQ等级过低({user_level}<{min_level})"
 
@@ -217,20 +218,18 @@ class JoinHandle:
 
             lower_comment = comment.lower()
             # 3.命中进群黑词
-            rkws = await self.db.get(gid, "join_reject_words", [])
-            if any(rk.lower() in lower_comment for rk in rkws):
-                if await self.db.get(gid, "reject_word_block", False):
+            if any(rk in lower_comment for rk in cfg.reject_words_lower):
+                if cfg.reject_word_block:
                     await self.db.add(gid, "block_ids", uid)
                     return False, "命中进群黑词，已拉黑"
                 return False, "命中进群黑词"
 
             # 4.命中进群白词
-            akws = await self.db.get(gid, "join_accept_words", [])
-            if akws and any(ak.lower() in lower_comment for ak in akws):
+            if any(ak in lower_comment for ak in cfg.accept_words_lower):
                 return True, "命中进群白词"
 
         # 5.最大失败次数（考虑到只是防爆破，存内存里足矣，重启清零）
-        max_fail = await self.db.get(gid, "join_max_time", 3)
+        max_fail = cfg.join_max_time if cfg.join_max_time is not None else 3
         if max_fail > 0:
             key = f"{gid}_{uid}"
             self._fail[key] = self._fail.get(key, 0) + 1
@@ -239,7 +238,7 @@ class JoinHandle:
                 return False, f"进群尝试次数已达上限({max_fail}次)，已拉黑"
 
         # 6.未命中白词时, 自动驳回
-        if await self.db.get(gid, "join_no_match_reject"):
+        if cfg.join_no_match_reject:
             return False, "未命中进群关键词"
 
         # 7.未命中进群关键词, 人工审核
@@ -254,7 +253,7 @@ class JoinHandle:
             return
 
         gid: str = str(raw.get("group_id", ""))
-        client = event.bot
+        client = get_client(event)
         uid: str = str(raw.get("user_id", ""))
 
         # 进群申请事件
@@ -264,7 +263,7 @@ class JoinHandle:
             and raw.get("sub_type") == "add"
         ):
             # 进群审核总开关
-            if not await self.db.get(gid, "join_switch"):
+            if not (await self.db.group(gid)).join_switch:
                 return
             comment = raw.get("comment")
             flag = raw.get("flag", "")
@@ -284,12 +283,13 @@ class JoinHandle:
             # 自动审核
             if approve is not None:
                 try:
-                    await client.set_group_add_request(
-                        flag=flag,
-                        sub_type="add",
-                        approve=approve,
-                        reason="" if approve else reason,
-                    )
+                    with audit_context(gid, 0, uid):
+                        await client.set_group_add_request(
+                            flag=flag,
+                            sub_type="add",
+                            approve=approve,
+                            reason="" if approve else reason,
+                        )
                     approve_msg = f"自动{'批准' if approve else '驳回'}：{reason}"
                 except Exception as e:
                     logger.warning(f"set_group_add_request failed: {e}")
@@ -318,11 +318,12 @@ class JoinHandle:
             and raw.get("notice_type") == "group_decrease"
             and raw.get("sub_type") == "leave"
         ):
-            if await self.db.get(gid, "leave_notify", False):
+            cfg = await self.db.group(gid)
+            if cfg.leave_notify:
                 nickname = await get_nickname(event, uid)
                 msg = f"{nickname}({uid}) 主动退群了"
                 # 退群拉黑
-                if await self.db.get(gid, "leave_block", False):
+                if cfg.leave_block:
                     await self.db.add(gid, "block_ids", uid)
                     msg += "，已拉黑"
                 await event.send(event.plain_result(msg))
@@ -333,14 +334,14 @@ class JoinHandle:
             raw.get("notice_type") == "group_increase"
             and uid != event.get_self_id()
         ):
+            cfg = await self.db.group(gid)
             # 进群欢迎
-            join_welcome = await self.db.get(gid, "join_welcome")
-            if join_welcome:
+            if join_welcome := cfg.join_welcome:
                 nickname = await get_nickname(event, uid)
                 welcome = join_welcome.format(nickname=nickname)
                 await event.send(event.plain_result(welcome))
             # 进群禁言
-            join_ban_time = await self.db.get(gid, "join_ban_time")
+            join_ban_time = cfg.join_ban_time or 0
             if join_ban_time > 0:
                 try:
                     await client.set_group_ban(
@@ -361,11 +362,14 @@ class JoinHandle:
         lines = text.split("\n")
         if "【进群申请】" in text and len(lines) >= 4:
             nickname = lines[1].split("：")[1]  # 第2行冒号后文本为nickname
+            uid = lines[2].split("：")[-1]  # 第3行冒号后文本为QQ
             flag = lines[3].split("：")[1]  # 第4行冒号后文本为flag
             try:
-                await event.bot.set_group_add_request(
-                    flag=flag, sub_type="add", approve=approve, reason=extra
-                )
+                target = int(uid) if uid.isdigit() else 0
+                with audit_context(event.get_group_id(), event.get_sender_id(), target):
+                    await get_client(event).set_group_add_request(
+                        flag=flag, sub_type="add", approve=approve, reason=extra
+                    )
                 if approve:
                     reply = f"已同意{nickname}进群"
                 else:
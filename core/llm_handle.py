@@ -9,10 +9,15 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..client import get_client
+from ..msg_ring import MessageRingStore
 from ..utils import get_ats, get_nickname
 
 
 class LLMHandle:
+    # 每轮抽取的消息条数（<抽取消息轮数> × 此数 = 检索的消息窗口）
+    HISTORY_PAGE_SIZE = 200
+
     def __init__(self, context: Context, config: AstrBotConfig):
         self.context = context
         self.conf = config
@@ -37,27 +42,52 @@ class LLMHandle:
     async def get_msg_contexts(
         self, event: AiocqhttpMessageEvent, target_id: str, query_rounds: int
     ) -> str:
-        """持续获取群聊历史消息直到达到要求，返回拼接后的聊天记录文本"""
+        """
+        取最近 query_rounds × HISTORY_PAGE_SIZE 条群消息中目标用户的发言，按时间顺序拼接
+        本地缓冲覆盖整个窗口时不调历史接口，否则从缓冲最旧处向前翻历史补足
+        """
         group_id = event.get_group_id()
+        window = query_rounds * self.HISTORY_PAGE_SIZE
+        ring = MessageRingStore.get_instance().get(group_id)
+        ring_lines: list[str] = []
+        seen: set[int] = set()
         message_seq = 0
-        all_lines: list[str] = []
-
-        for _ in range(query_rounds):
+        if ring:
+            seen.update(ring.recalled_ids())
+            for m in ring.latest(limit=window):
+                seen.add(m.message_id)
+                message_seq = m.message_seq
+                if m.sender_id == int(target_id) and m.text:
+                    ring_lines.append(m.text)
+            if len(ring) >= window:
+                return "\n".join(reversed(ring_lines))
+
+        remaining = window - (len(ring) if ring else 0)
+        history_lines: list[str] = []
+        for _ in range(-(-remaining // self.HISTORY_PAGE_SIZE)):
             payloads = {
                 "group_id": group_id,
                 "message_seq": message_seq,
-                "count": 200,
+                "count": self.HISTORY_PAGE_SIZE,
                 "reverseOrder": True,
             }
-            result: dict = await event.bot.api.call_action(
+            result: dict = await get_client(event).call_action(
                 "get_group_msg_history", **payloads
             )
-            round_messages = result["messages"]
-            message_seq = round_messages[0]["message_id"]
-
-            all_lines.extend(self._build_user_context(round_messages, target_id))
-
-        return "\n".join(all_lines)
+            round_messages = result.get("messages") or []
+            if not round_messages:
+                break
+            fresh = [m for m in round_messages if m["message_id"] not in seen]
+            seen.update(m["message_id"] for m in fresh)
+            # 越往后翻越旧，拼在前面
+            history_lines[:0] = self._build_user_context(fresh, target_id)
+            oldest = round_messages[0]
+            next_seq = oldest.get("message_seq") or oldest["message_id"]
+            if next_seq == message_seq:
+                break
+            message_seq = next_seq
+
+        return "\n".join(history_lines + ring_lines[::-1])
 
     async def get_llm_respond(
         self, system_prompt: str, chat_history: str
@@ -145,7 +175,7 @@ class LLMHandle:
         await self._ai_set_name(
             event,
             "昵称",
-            lambda gid, uid, name: event.bot.set_group_card(
+            lambda gid, uid, name: get_client(event).set_group_card(
                 group_id=gid, user_id=uid, card=name
             ),
         )
@@ -155,7 +185,7 @@ class LLMHandle:
         await self._ai_set_name(
             event,
             "头衔",
-            lambda gid, uid, name: event.bot.set_group_special_title(
+            lambda gid, uid, name: get_client(event).set_group_special_title(
                 group_id=gid, user_id=uid, special_title=name
             ),
         )
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+import re
+from array import array
 from datetime import datetime
 from typing import TYPE_CHECKING
 
@@ -10,85 +13,259 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 )
 from astrbot.core.utils.session_waiter import SessionController, session_waiter
 
-from ..utils import format_time, get_nickname
+from ..audit import audit_context
+from ..client import get_client
+from ..executor import BatchExecutor, BatchResult
+from ..mute_registry import MuteRegistry
+from ..roster import RosterStore
+from ..utils import format_time, get_ats
 
 if TYPE_CHECKING:
     from ..main import QQAdminPlugin
 
 
 class MemberHandle:
+    # 群友信息每页人数
+    PAGE_SIZE = 100
+    # 群友信息展示的消息数统计天数
+    ACTIVITY_DAYS = 30
+
     def __init__(self, plugin: QQAdminPlugin):
         self.plugin = plugin
+        self.executor = BatchExecutor(**plugin.conf["kick_executor"])
+        self._tasks: set[asyncio.Task] = set()
 
-    async def get_group_member_list(self, event: AiocqhttpMessageEvent):
-        """查看群友信息，人数太多时可能会处理失败"""
-        await event.send(event.plain_result("获取中..."))
+    async def stop(self):
+        """取消进行中的批量任务（各任务会发出已完成部分的汇总）"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _spawn(self, coro):
+        """后台执行批量任务，不占用会话"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(
+        self,
+        event: AiocqhttpMessageEvent,
+        label: str,
+        user_ids: list[int],
+        names: dict[int, str],
+        act,
+    ):
+        """对本群成员批量执行 act：有界并发 + 限速 + 重试，定期汇报进度"""
+        group_id = event.get_group_id()
+
+        async def report(result: BatchResult):
+            await event.send(event.plain_result(result.progress(label)))
+
+        await event.send(event.plain_result(f"开始{label} {len(user_ids)} 位群友..."))
+        # 后台任务不在命令入口的审计范围内，按确认者重新设置
+        with audit_context(group_id, event.get_sender_id()):
+            result = await self.executor.run(group_id, user_ids, act, report)
+        for user_id, reason in result.failed:
+            logger.error(f"{label} {names.get(user_id)}({user_id}) 失败：{reason}")
+        await event.send(
+            event.plain_result(
+                result.summary(label, lambda uid: f"{names.get(uid) or uid}({uid})")
+            )
+        )
+
+    def _kick_action(self, event: AiocqhttpMessageEvent, block: bool = False):
+        client = get_client(event)
+        group_id = event.get_group_id()
+
+        async def kick(user_id: int):
+            await client.set_group_kick(
+                group_id=int(group_id), user_id=user_id, reject_add_request=block
+            )
+            RosterStore.get_instance().discard(group_id, user_id)
+
+        return kick
+
+    def _ban_action(self, event: AiocqhttpMessageEvent, duration: int):
+        client = get_client(event)
         group_id = event.get_group_id()
-        members_data = await event.bot.get_group_member_list(group_id=int(group_id))
+
+        async def ban(user_id: int):
+            await MuteRegistry.get_instance().ban(client, group_id, user_id, duration)
+
+        return ban
+
+    # 角色排序：数字越小权限越高
+    ROLE_RANK = {"owner": 0, "admin": 1, "member": 2}
+    ROLE_NAME = {"owner": "群主", "admin": "管理员", "member": "成员"}
+
+    async def _locate(self, event: AiocqhttpMessageEvent, user_id: int):
+        """加载全部群名单后查跨群索引"""
+        roster = RosterStore.get_instance()
+        await roster.load_all(event)
+        return roster.groups_of(user_id)
+
+    async def find_user_groups(self, event: AiocqhttpMessageEvent, user_id: int):
+        """查询某 QQ 在 bot 所在各群的身份"""
+        found = await self._locate(event, user_id)
+        if not found:
+            await event.send(event.plain_result(f"{user_id} 不在 bot 所在的任何群"))
+            return
+        lines = [f"{user_id} 所在的 {len(found)} 个群："]
+        for gid, member in found:
+            name = member.get("card") or member.get("nickname") or ""
+            role = self.ROLE_NAME.get(member.get("role", ""), "成员")
+            lines.append(f"{gid}｜{role}｜{name}")
+        await event.send(event.plain_result("\n".join(lines)))
+
+    async def punish_everywhere(
+        self, event: AiocqhttpMessageEvent, user_id: int, ban_time: int | None
+    ):
+        """在所有 bot 有权限的群里踢出（ban_time 为 None）或禁言该 QQ"""
+        if ban_time is not None and (not isinstance(ban_time, int) or ban_time <= 0):
+            await event.send(event.plain_result("禁言时长须为正整数（秒）"))
+            return
+        roster = RosterStore.get_instance()
+        self_id = event.get_self_id()
+        found = await self._locate(event, user_id)
+        targets, skipped = [], []
+        for gid, member in found:
+            bot = roster.member(gid, self_id) or {}
+            bot_rank = self.ROLE_RANK.get(bot.get("role", ""), 2)
+            if bot_rank < self.ROLE_RANK.get(member.get("role", ""), 2):
+                targets.append(gid)
+            else:
+                skipped.append(gid)
+        if not targets:
+            await event.send(
+                event.plain_result(f"{user_id} 所在的群里 bot 均无权处理（{len(found)}个群）")
+            )
+            return
+
+        action = "跨群踢出" if ban_time is None else "跨群禁言"
+        client = get_client(event)
+
+        async def punish(gid: str):
+            # 跨群命令不经过 perm_required，逐群记录操作者
+            with audit_context(gid, event.get_sender_id(), user_id):
+                if ban_time is None:
+                    await client.set_group_kick(
+                        group_id=int(gid),
+                        user_id=int(user_id),
+                        reject_add_request=False,
+                    )
+                    roster.discard(gid, user_id)
+                else:
+                    # 超过 30 天的由禁言登记表到期续禁
+                    await MuteRegistry.get_instance().ban(
+                        client, gid, user_id, ban_time
+                    )
+
+        async def report(result: BatchResult):
+            await event.send(event.plain_result(result.progress(action)))
+
+        result = await self.executor.run("*", targets, punish, report)
+        msg = result.summary(f"{action}{user_id}", lambda gid: f"群{gid}")
+        if skipped:
+            msg += f"\n跳过{len(skipped)}个无权限的群：{'、'.join(skipped)}"
+        await event.send(event.plain_result(msg))
+
+    async def get_group_member_list(self, event: AiocqhttpMessageEvent, page: int = 1):
+        """查看群友信息（分页），按进群时间排序，只渲染请求的那一页"""
+        await event.send(event.plain_result("获取中..."))
+        cols = await RosterStore.get_instance().columns(event)
+        rows = cols.sorted_rows("join_time")
+        total = max(1, -(-len(rows) // self.PAGE_SIZE))
+        page = min(max(1, page), total)
+        start = (page - 1) * self.PAGE_SIZE
+        page_rows = rows[start : start + self.PAGE_SIZE]
+        # 只查本页成员的活跃统计
+        stats = await self.plugin.activity.user_stats(
+            event.get_group_id(),
+            (cols.user_id[i] for i in page_rows),
+            self.ACTIVITY_DAYS,
+        )
         info_list = [
             (
-                f"{format_time(member['join_time'])}："
-                f"【{member['level']}】"
-                f"{member['user_id']}-"
-                f"{member['nickname']}"
+                f"{format_time(cols.join_time[i])}："
+                f"【{cols.level[i]}】"
+                f"{cols.user_id[i]}-"
+                f"{cols.row(i).get('nickname', '')}"
+                f"（{stats.get(cols.user_id[i], (0, 0, 0))[2]}条）"
             )
-            for member in members_data
+            for i in page_rows
         ]
-        info_list.sort(key=lambda x: datetime.strptime(x.split("：")[0], "%Y-%m-%d"))
-        info_str = "进群时间：【等级】QQ-昵称\n\n"
+        info_str = (
+            f"共{len(rows)}人，第{page}/{total}页\n"
+            f"进群时间：【等级】QQ-昵称（近{self.ACTIVITY_DAYS}天消息数）\n\n"
+        )
         info_str += "\n\n".join(info_list)
+        if page < total:
+            info_str += f"\n\n发送“群友信息 {page + 1}”查看下一页"
         # TODO 做张好看的图片来展示
-        url = await self.plugin.text_to_image(info_str)
+        url = await self.plugin.render(info_str)
         await event.send(event.image_result(url))
 
-
     async def clear_group_member(
         self,
         event: AiocqhttpMessageEvent,
         inactive_days: int = 30,
         under_level: int = 10,
+        max_msgs: int | None = None,
     ):
-        """/清理群友 未发言天数 群等级"""
+        """/清理群友 未发言天数 群等级 [消息数]"""
         group_id = event.get_group_id()
         sender_id = event.get_sender_id()
 
         try:
-            members_data = await event.bot.get_group_member_list(group_id=int(group_id))
+            # 活跃统计只挂在副本上，其他处理类读到的缓存列视图不受影响
+            cols = (await RosterStore.get_instance().columns(event)).view()
         except Exception as e:
             await event.send(event.plain_result(f"获取群成员信息失败：{e}"))
             return
 
-        threshold_ts = int(datetime.now().timestamp()) - inactive_days * 86400
-        clear_ids: list[int] = []
-        info_lines: list[str] = []
-
-        for member in members_data:  # type: ignore
-            last_sent = member.get("last_sent_time", 0)
-            level = int(member.get("level", 0))
-            user_id = member.get("user_id", "")
-            nickname = member.get("nickname", "（无昵称）")
-
-            if last_sent < threshold_ts and level < under_level:
-                clear_ids.append(user_id)
-                last_active_str = format_time(last_sent)
-                info_lines.append(
-                    f"- **{last_active_str}**｜**{level}**级｜`{user_id}` - {nickname}"
-                )
+        # 接口的 last_sent_time 不一定可靠，与本地统计取较新者
+        local_last, recent_msgs = await self.plugin.activity.aligned(
+            group_id, cols.user_id, inactive_days
+        )
+        cols.attach("last_active", array("q", map(max, cols.last_sent_time, local_last)))
+        cols.attach("recent_msgs", recent_msgs)
 
-        if not clear_ids:
+        # 指定消息数时按“近 N 天消息数少于 max_msgs”筛选，否则按“近 N 天无发言”
+        threshold_ts = int(datetime.now().timestamp()) - inactive_days * 86400
+        if max_msgs is None:
+            matched = cols.where_below(last_active=threshold_ts, level=under_level)
+        else:
+            matched = cols.where_below(recent_msgs=max_msgs, level=under_level)
+        # 列上筛选并按发言时间排序，只对展示的那部分成员格式化
+        rows = cols.order_by(matched, "last_active")
+        if not rows:
             await event.send(event.plain_result("无符合条件的群友"))
             return
 
-        # 按发言时间排序
-        info_lines.sort(key=lambda x: datetime.strptime(x.split("**")[1], "%Y-%m-%d"))
+        clear_ids: list[int] = [cols.user_id[i] for i in rows]
+        names = {
+            cols.user_id[i]: cols.row(i).get("card") or cols.row(i).get("nickname") or ""
+            for i in rows
+        }
+        last_active, msgs = cols.column("last_active"), cols.column("recent_msgs")
+        info_lines = [
+            f"- **{format_time(last_active[i])}**｜**{cols.level[i]}**级｜"
+            f"{msgs[i]}条｜"
+            f"`{cols.user_id[i]}` - {cols.row(i).get('nickname', '（无昵称）')}"
+            for i in rows[: self.PAGE_SIZE]
+        ]
+        if len(rows) > self.PAGE_SIZE:
+            info_lines.append(f"- ……等共 {len(rows)} 人")
 
         info_str = (
-            f"### 共 **{len(clear_ids)}** 位群友 **{inactive_days}** 天内无发言，群等级低于 **{under_level}** 级\n\n"
+            f"### 共 **{len(clear_ids)}** 位群友 **{inactive_days}** 天内"
+            + ("无发言" if max_msgs is None else f"发言少于 **{max_msgs}** 条")
+            + f"，群等级低于 **{under_level}** 级\n\n"
             + "\n".join(info_lines)
             + "\n\n### 请发送 **确认清理** 或 **取消清理** 来处理这些群友！"
         )
 
-        url = await self.plugin.text_to_image(info_str)
+        url = await self.plugin.render(info_str)
         await event.send(event.image_result(url))
 
         await event.send(event.chain_result([At(qq=cid) for cid in clear_ids]))
@@ -106,22 +283,11 @@ class MemberHandle:
                 return
 
             if event.message_str == "确认清理":
-                msg_list = []
-                for clear_id in clear_ids:
-                    try:
-                        target_name = await get_nickname(event, user_id=clear_id)
-                        await event.bot.set_group_kick(
-                            group_id=int(group_id),
-                            user_id=int(clear_id),
-                            reject_add_request=False,
-                        )
-                        msg_list.append(f"✅ 已将 {target_name}({clear_id}) 踢出本群")
-                    except Exception as e:
-                        msg_list.append(f"❌ 踢出 {target_name}({clear_id}) 失败")
-                        logger.error(f"踢出 {target_name}({clear_id}) 失败：{e}")
-
-                if msg_list:
-                    await event.send(event.plain_result("\n".join(msg_list)))
+                self._spawn(
+                    self._run_batch(
+                        event, "清理群友", clear_ids, names, self._kick_action(event)
+                    )
+                )
                 controller.stop()
 
         try:
@@ -132,3 +298,112 @@ class MemberHandle:
             logger.error("清理群友任务出错: " + str(e))
         finally:
             event.stop_event()
+
+    # ---------------------------- 批量处置 ----------------------------
+
+    BULK_LABELS = {"ban": "批量禁言", "unban": "批量解禁", "kick": "批量踢出", "block": "批量拉黑"}
+    # 预览最多列出的人数
+    BULK_PREVIEW = 30
+
+    def _match_targets(
+        self, event: AiocqhttpMessageEvent, args: list[str], members: list[dict]
+    ) -> tuple[list[int], int, str | None]:
+        """
+        解析 QQ 列表（空格/逗号分隔）、@ 和 /正则/（匹配群名片或昵称）
+        返回 (可处置的 user_id, 跳过人数, 错误信息)
+        """
+        by_id = {int(m["user_id"]): m for m in members}
+        ids = {int(t) for t in get_ats(event)}
+        for tok in args:
+            if len(tok) > 2 and tok.startswith("/") and tok.endswith("/"):
+                try:
+                    pattern = re.compile(tok[1:-1])
+                except re.error as e:
+                    return [], 0, f"正则有误：{e}"
+                ids.update(
+                    uid
+                    for uid, m in by_id.items()
+                    if pattern.search(m.get("card") or "")
+                    or pattern.search(m.get("nickname") or "")
+                )
+            else:
+                ids.update(int(x) for x in re.split(r"[,，]", tok) if x.isdigit())
+
+        self_id = int(event.get_self_id())
+        bot_rank = self.ROLE_RANK.get((by_id.get(self_id) or {}).get("role", ""), 2)
+        targets = [
+            uid
+            for uid in sorted(ids)
+            if uid in by_id
+            and uid != self_id
+            and self.ROLE_RANK.get(by_id[uid].get("role", ""), 2) > bot_rank
+        ]
+        return targets, len(ids) - len(targets), None
+
+    async def bulk_moderate(self, event: AiocqhttpMessageEvent, action: str):
+        """批量禁言/解禁/踢出/拉黑：先预览命中名单，确认后批量执行"""
+        label = self.BULK_LABELS[action]
+        group_id = event.get_group_id()
+        sender_id = event.get_sender_id()
+        args = event.message_str.split()[1:]
+
+        duration = 0
+        if action == "ban":
+            if not args or not args[0].isdigit():
+                await event.send(event.plain_result("用法：批量禁言 <秒数> <QQ列表 | /正则/>"))
+                return
+            # 超过 30 天的由禁言登记表到期续禁，与“禁言”一致
+            duration = int(args.pop(0))
+
+        members = await RosterStore.get_instance().members(event)
+        targets, skipped, error = self._match_targets(event, args, members)
+        if error:
+            await event.send(event.plain_result(error))
+            return
+        if not targets:
+            await event.send(
+                event.plain_result(f"没有可{label[2:]}的群友（跳过{skipped}人：不在群内或无权处置）")
+            )
+            return
+
+        by_id = {int(m["user_id"]): m for m in members}
+        names = {
+            uid: by_id[uid].get("card") or by_id[uid].get("nickname") or ""
+            for uid in targets
+        }
+        lines = [f"{label}预览：共{len(targets)}人" + (f"，跳过{skipped}人" if skipped else "")]
+        lines += [f"- {names[uid]}({uid})" for uid in targets[: self.BULK_PREVIEW]]
+        if len(targets) > self.BULK_PREVIEW:
+            lines.append(f"……等{len(targets)}人")
+        lines.append("请发送“确认执行”或“取消执行”")
+        await event.send(event.plain_result("\n".join(lines)))
+
+        match action:
+            case "ban":
+                act = self._ban_action(event, duration)
+            case "unban":
+                act = self._ban_action(event, 0)
+            case _:
+                act = self._kick_action(event, block=action == "block")
+
+        @session_waiter(timeout=60)  # type: ignore
+        async def confirm_waiter(
+            controller: SessionController, event: AiocqhttpMessageEvent
+        ):
+            if group_id != event.get_group_id() or sender_id != event.get_sender_id():
+                return
+            if event.message_str == "取消执行":
+                await event.send(event.plain_result(f"{label}已取消"))
+                controller.stop()
+            elif event.message_str == "确认执行":
+                self._spawn(self._run_batch(event, label, targets, names, act))
+                controller.stop()
+
+        try:
+            await confirm_waiter(event)
+        except TimeoutError as _:
+            await event.send(event.plain_result("等待超时！"))
+        except Exception as e:
+            logger.error(f"{label}任务出错: {e}")
+        finally:
+            event.stop_event()
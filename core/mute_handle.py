@@ -0,0 +1,73 @@
+import time
+
+from astrbot.api import logger
+from astrbot.core.config.astrbot_config import AstrBotConfig
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from ..client import get_client
+from ..executor import BatchExecutor, BatchResult
+from ..mute_registry import MuteRegistry
+from ..utils import get_nickname
+
+
+def _fmt_remaining(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 86400:
+        return f"{seconds // 86400}天{seconds % 86400 // 3600}小时"
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+    return f"{seconds // 60}分{seconds % 60}秒"
+
+
+class MuteHandle:
+    """禁言列表与批量解禁，数据来自 MuteRegistry"""
+
+    # 禁言列表最多展示人数
+    LIST_LIMIT = 50
+
+    def __init__(self, config: AstrBotConfig):
+        self.registry = MuteRegistry.get_instance()
+        self.executor = BatchExecutor(**config["kick_executor"])
+
+    async def mute_list(self, event: AiocqhttpMessageEvent):
+        """查看本群当前禁言"""
+        muted = self.registry.muted(event.get_group_id())
+        if not muted:
+            await event.send(event.plain_result("本群当前无人被禁言"))
+            return
+        now = time.time()
+        lines = [f"本群禁言中（{len(muted)}人）："]
+        for uid, until, final in muted[: self.LIST_LIMIT]:
+            name = await get_nickname(event, uid)
+            line = f"{name}({uid})：剩余{_fmt_remaining(final - now)}"
+            if final - until > 1:
+                line += "（长禁言，到期自动续禁）"
+            lines.append(line)
+        if len(muted) > self.LIST_LIMIT:
+            lines.append(f"……等{len(muted)}人")
+        await event.send(event.plain_result("\n".join(lines)))
+
+    async def unmute_all(self, event: AiocqhttpMessageEvent):
+        """解除本群登记在册的全部禁言"""
+        group_id = event.get_group_id()
+        user_ids = [uid for uid, _, _ in self.registry.muted(group_id)]
+        if not user_ids:
+            await event.send(event.plain_result("本群当前无人被禁言"))
+            return
+        client = get_client(event)
+
+        async def unmute(user_id: int):
+            # 成功后由写接口回调从登记表移除
+            await client.set_group_ban(
+                group_id=int(group_id), user_id=user_id, duration=0
+            )
+
+        async def report(result: BatchResult):
+            await event.send(event.plain_result(result.progress("全部解禁")))
+
+        result = await self.executor.run(group_id, user_ids, unmute, report)
+        for user_id, reason in result.failed:
+            logger.error(f"解禁 {user_id} 失败：{reason}")
+        await event.send(event.plain_result(result.summary("全部解禁")))
@@ -1,39 +1,61 @@
 
 import asyncio
 import random
+import time
+from collections import deque
 
+from astrbot import logger
 from astrbot.core import AstrBotConfig
 from astrbot.core.message.components import At, Plain, Reply
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
-from ..utils import BAN_ME_QUOTES, extract_image_url, get_ats, get_nickname
+from ..client import get_client
+from ..msg_ring import MessageRingStore
+from ..mute_registry import MAX_BAN_TIME, MuteRegistry
+from ..outbox import Outbox
+from ..utils import (
+    BAN_ME_QUOTES,
+    extract_image_url,
+    format_time,
+    get_ats,
+    get_nickname,
+    nickname_cache,
+)
 
 
 class NormalHandle:
+    # 撤回 @某人 N：单次最多撤回条数、历史翻页大小/页数上限、最远回溯秒数、并发撤回数
+    RECALL_MAX = 100
+    RECALL_PAGE_SIZE = 100
+    RECALL_MAX_PAGES = 20
+    RECALL_MAX_AGE = 2 * 86400
+    RECALL_CONCURRENCY = 5
+    # 群精华：每页条数、单条内容最长字数、缓存秒数（兜底他人在客户端设精/移精）
+    ESSENCE_PAGE_SIZE = 10
+    ESSENCE_TEXT_LEN = 80
+    ESSENCE_TTL = 600
+
     def __init__(self, config: AstrBotConfig):
         self.conf = config
+        # 群号 -> (拉取时间, 按设精时间倒序的精华列表)
+        self._essence_cache: dict[str, tuple[float, list[dict]]] = {}
 
     async def set_group_ban(self, event: AiocqhttpMessageEvent, ban_time=None):
         """禁言 60 @user"""
-        max_ban_time = 2592000  # 一个月的秒数（30天）
         if not ban_time or not isinstance(ban_time, int):
             # 如果没有指定禁言时间或不是整数，则随机生成
             random_ban_time_range = list(map(int, self.conf["random_ban_time"].split("~")))
             # 确保随机范围的最大值不超过一个月
-            random_ban_time_range[1] = min(random_ban_time_range[1], max_ban_time)
+            random_ban_time_range[1] = min(random_ban_time_range[1], MAX_BAN_TIME)
             ban_time = random.randint(*random_ban_time_range)
-        else:
-            # 如果指定了禁言时间，确保不超过一个月
-            ban_time = min(ban_time, max_ban_time)
 
         for tid in get_ats(event):
             try:
-                await event.bot.set_group_ban(
-                    group_id=int(event.get_group_id()),
-                    user_id=int(tid),
-                    duration=ban_time,
+                # 超过一个月的部分由禁言登记表到期续禁
+                await MuteRegistry.get_instance().ban(
+                    get_client(event), event.get_group_id(), tid, ban_time
                 )
             except:  # noqa: E722
                 pass
@@ -48,7 +70,7 @@ class NormalHandle:
                 *map(int, self.conf["random_ban_time"].split("~"))
             )
         try:
-            await event.bot.set_group_ban(
+            await get_client(event).set_group_ban(
                 group_id=int(event.get_group_id()),
                 user_id=int(event.get_sender_id()),
                 duration=ban_time,
@@ -61,21 +83,21 @@ class NormalHandle:
     async def cancel_group_ban(self, event: AiocqhttpMessageEvent):
         """解禁@user"""
         for tid in get_ats(event):
-            await event.bot.set_group_ban(
+            await get_client(event).set_group_ban(
                 group_id=int(event.get_group_id()), user_id=int(tid), duration=0
             )
         event.stop_event()
 
     async def set_group_whole_ban(self, event: AiocqhttpMessageEvent):
         """全员禁言"""
-        await event.bot.set_group_whole_ban(
+        await get_client(event).set_group_whole_ban(
             group_id=int(event.get_group_id()), enable=True
         )
         await event.send(event.plain_result("已开启全体禁言"))
 
     async def cancel_group_whole_ban(self, event: AiocqhttpMessageEvent):
         """关闭全员禁言"""
-        await event.bot.set_group_whole_ban(
+        await get_client(event).set_group_whole_ban(
             group_id=int(event.get_group_id()), enable=False
         )
         await event.send(event.plain_result("已关闭全员禁言"))
@@ -86,15 +108,17 @@ class NormalHandle:
         """改名 xxx @user"""
         target_card = str(target_card) if target_card else ""
         tids = get_ats(event) or [event.get_sender_id()]
-        for tid in tids:
-            target_name = await get_nickname(event, user_id=tid)
-            msg = f"已修改{target_name}的群昵称为【{target_card}】" if target_card else f"已清除{target_name}的群昵称"
-            await event.send(event.plain_result(msg))
-            await event.bot.set_group_card(
-                group_id=int(event.get_group_id()),
-                user_id=int(tid),
-                card=str(target_card),
-            )
+        async with Outbox(event) as out:
+            for tid in tids:
+                target_name = await get_nickname(event, user_id=tid)
+                msg = f"已修改{target_name}的群昵称为【{target_card}】" if target_card else f"已清除{target_name}的群昵称"
+                await get_client(event).set_group_card(
+                    group_id=int(event.get_group_id()),
+                    user_id=int(tid),
+                    card=str(target_card),
+                )
+                nickname_cache.discard(event.get_group_id(), tid)
+                out.add(msg)
 
     async def set_group_card_me(
         self, event: AiocqhttpMessageEvent, target_card: str | int | None = None
@@ -103,11 +127,12 @@ class NormalHandle:
         target_card = str(target_card) if target_card else ""
         msg = f"已修改你的群昵称为【{target_card}】" if target_card else "已清除你的群昵称"
         await event.send(event.plain_result(msg))
-        await event.bot.set_group_card(
+        await get_client(event).set_group_card(
             group_id=int(event.get_group_id()),
             user_id=int(event.get_sender_id()),
             card=str(target_card),
         )
+        nickname_cache.discard(event.get_group_id(), event.get_sender_id())
 
     async def set_group_special_title(
         self, event: AiocqhttpMessageEvent, new_title: str | int | None = None
@@ -115,16 +140,17 @@ class NormalHandle:
         """头衔 xxx @user"""
         new_title = str(new_title) if new_title else ""
         tids = get_ats(event) or [event.get_sender_id()]
-        for tid in tids:
-            target_name = await get_nickname(event, user_id=tid)
-            msg = f"已修改{target_name}的头衔为【{new_title}】" if new_title else f"已清除{target_name}的头衔"
-            await event.send(event.plain_result(msg))
-            await event.bot.set_group_special_title(
-                group_id=int(event.get_group_id()),
-                user_id=int(tid),
-                special_title=new_title,
-                duration=-1,
-            )
+        async with Outbox(event) as out:
+            for tid in tids:
+                target_name = await get_nickname(event, user_id=tid)
+                msg = f"已修改{target_name}的头衔为【{new_title}】" if new_title else f"已清除{target_name}的头衔"
+                await get_client(event).set_group_special_title(
+                    group_id=int(event.get_group_id()),
+                    user_id=int(tid),
+                    special_title=new_title,
+                    duration=-1,
+                )
+                out.add(msg)
 
 
     async def set_group_special_title_me(
@@ -134,7 +160,7 @@ class NormalHandle:
         new_title = str(new_title) if new_title else ""
         msg = f"已将你的头衔改为【{new_title}】" if new_title else "已清除你的头衔"
         await event.send(event.plain_result(msg))
-        await event.bot.set_group_special_title(
+        await get_client(event).set_group_special_title(
             group_id=int(event.get_group_id()),
             user_id=int(event.get_sender_id()),
             special_title=new_title,
@@ -143,49 +169,52 @@ class NormalHandle:
 
     async def set_group_kick(self, event: AiocqhttpMessageEvent):
         """踢了@user"""
-        for tid in get_ats(event):
-            target_name = await get_nickname(event, user_id=tid)
-            await event.bot.set_group_kick(
-                group_id=int(event.get_group_id()),
-                user_id=int(tid),
-                reject_add_request=False,
-            )
-            await event.send(event.plain_result(f"已将【{tid}-{target_name}】踢出本群"))
+        async with Outbox(event) as out:
+            for tid in get_ats(event):
+                target_name = await get_nickname(event, user_id=tid)
+                await get_client(event).set_group_kick(
+                    group_id=int(event.get_group_id()),
+                    user_id=int(tid),
+                    reject_add_request=False,
+                )
+                out.add(f"已将【{tid}-{target_name}】踢出本群")
 
     async def set_group_block(self, event: AiocqhttpMessageEvent):
         """拉黑 @user"""
-        for tid in get_ats(event):
-            target_name = await get_nickname(event, user_id=tid)
-            await event.bot.set_group_kick(
-                group_id=int(event.get_group_id()),
-                user_id=int(tid),
-                reject_add_request=True,
-            )
-            await event.send(event.plain_result(f"已将【{tid}-{target_name}】踢出本群并拉黑!"))
+        async with Outbox(event) as out:
+            for tid in get_ats(event):
+                target_name = await get_nickname(event, user_id=tid)
+                await get_client(event).set_group_kick(
+                    group_id=int(event.get_group_id()),
+                    user_id=int(tid),
+                    reject_add_request=True,
+                )
+                out.add(f"已将【{tid}-{target_name}】踢出本群并拉黑!")
 
     async def set_group_admin(self, event: AiocqhttpMessageEvent):
         """设置管理员@user"""
-        for tid in get_ats(event):
-            await event.bot.set_group_admin(
-                group_id=int(event.get_group_id()), user_id=int(tid), enable=True
-            )
-            chain = [At(qq=tid), Plain(text="你已被设为管理员")]
-            await event.send(event.chain_result(chain))
+        async with Outbox(event) as out:
+            for tid in get_ats(event):
+                await get_client(event).set_group_admin(
+                    group_id=int(event.get_group_id()), user_id=int(tid), enable=True
+                )
+                out.add_chain([At(qq=tid), Plain(text="你已被设为管理员")])
 
     async def cancel_group_admin(self, event: AiocqhttpMessageEvent):
         """取消管理员@user"""
-        for tid in get_ats(event):
-            await event.bot.set_group_admin(
-                group_id=int(event.get_group_id()), user_id=int(tid), enable=False
-            )
-            chain = [At(qq=tid), Plain(text="你的管理员身份已被取消")]
-            await event.send(event.chain_result(chain))
+        async with Outbox(event) as out:
+            for tid in get_ats(event):
+                await get_client(event).set_group_admin(
+                    group_id=int(event.get_group_id()), user_id=int(tid), enable=False
+                )
+                out.add_chain([At(qq=tid), Plain(text="你的管理员身份已被取消")])
 
     async def set_essence_msg(self, event: AiocqhttpMessageEvent):
         """将引用消息添加到群精华"""
         first_seg = event.get_messages()[0]
         if isinstance(first_seg, Reply):
-            await event.bot.set_essence_msg(message_id=int(first_seg.id))
+            await get_client(event).set_essence_msg(message_id=int(first_seg.id))
+            self._essence_cache.pop(event.get_group_id(), None)
             await event.send(event.plain_result("已设为精华消息"))
             event.stop_event()
 
@@ -193,18 +222,78 @@ class NormalHandle:
         """将引用消息移出群精华"""
         first_seg = event.get_messages()[0]
         if isinstance(first_seg, Reply):
-            await event.bot.delete_essence_msg(message_id=int(first_seg.id))
+            await get_client(event).delete_essence_msg(message_id=int(first_seg.id))
+            self._essence_cache.pop(event.get_group_id(), None)
             await event.send(event.plain_result("已移除精华消息"))
             event.stop_event()
 
-    async def get_essence_msg_list(self, event: AiocqhttpMessageEvent):
-        """查看群精华"""
-        essence_data = await event.bot.get_essence_msg_list(
-            group_id=int(event.get_group_id())
+    def on_notice(self, raw: dict):
+        """精华变动通知：使该群的精华缓存失效"""
+        if raw.get("notice_type") == "essence":
+            self._essence_cache.pop(str(raw.get("group_id")), None)
+
+    async def _essence_list(self, event: AiocqhttpMessageEvent) -> list[dict]:
+        """整群精华列表，缓存到设精/移精或过期为止"""
+        group_id = event.get_group_id()
+        cached = self._essence_cache.get(group_id)
+        if cached and time.time() - cached[0] < self.ESSENCE_TTL:
+            return cached[1]
+        data = await get_client(event).get_essence_msg_list(group_id=int(group_id))
+        essences = sorted(
+            data or [], key=lambda x: x.get("operator_time") or 0, reverse=True
         )
-        await event.send(event.plain_result(f"{essence_data}"))
+        self._essence_cache[group_id] = (time.time(), essences)
+        return essences
+
+    def _essence_text(self, essence: dict) -> str:
+        """精华消息内容转为单行文本（部分协议端不返回内容）"""
+        parts = []
+        for seg in essence.get("content") or []:
+            data = seg.get("data") or {}
+            match seg.get("type"):
+                case "text":
+                    parts.append(data.get("text", ""))
+                case "image":
+                    parts.append("[图片]")
+                case "face":
+                    parts.append("[表情]")
+                case "at":
+                    parts.append(f"@{data.get('qq', '')}")
+                case other:
+                    parts.append(f"[{other}]")
+        text = " ".join("".join(parts).split())
+        if len(text) > self.ESSENCE_TEXT_LEN:
+            text = text[: self.ESSENCE_TEXT_LEN] + "…"
+        return text or f"[消息{essence.get('message_id', '')}]"
+
+    async def get_essence_msg_list(self, event: AiocqhttpMessageEvent, page: int = 1):
+        """查看群精华（分页），按设精时间倒序，只格式化请求的那一页"""
+        try:
+            essences = await self._essence_list(event)
+        except Exception as e:
+            await event.send(event.plain_result(f"获取群精华失败：{e}"))
+            return
+        if not essences:
+            await event.send(event.plain_result("本群暂无精华消息"))
+            return
+        total = -(-len(essences) // self.ESSENCE_PAGE_SIZE)
+        page = min(max(1, page), total)
+        start = (page - 1) * self.ESSENCE_PAGE_SIZE
+        lines = [f"群精华共{len(essences)}条，第{page}/{total}页"]
+        for n, essence in enumerate(
+            essences[start : start + self.ESSENCE_PAGE_SIZE], start + 1
+        ):
+            op_time = essence.get("operator_time")
+            lines.append(
+                f"\n{n}. {essence.get('sender_nick') or essence.get('sender_id')}："
+                f"{self._essence_text(essence)}\n"
+                f"   —— {essence.get('operator_nick') or essence.get('operator_id')}"
+                + (f" 设于{format_time(op_time)}" if op_time else "")
+            )
+        if page < total:
+            lines.append(f"\n发送“查看群精华 {page + 1}”查看下一页")
+        await event.send(event.plain_result("\n".join(lines)))
         event.stop_event()
-        # TODO 做张好看的图片来展示
 
     async def set_group_portrait(self, event: AiocqhttpMessageEvent):
         """(引用图片)设置群头像"""
@@ -212,7 +301,7 @@ class NormalHandle:
         if not image_url:
             await event.send(event.plain_result("未获取到新头像"))
             return
-        await event.bot.set_group_portrait(
+        await get_client(event).set_group_portrait(
             group_id=int(event.get_group_id()),
             file=image_url,
         )
@@ -226,14 +315,123 @@ class NormalHandle:
         if not group_name:
             await event.send(event.plain_result("未输入新群名"))
             return
-        await event.bot.set_group_name(
+        await get_client(event).set_group_name(
             group_id=int(event.get_group_id()), group_name=str(group_name)
         )
         await event.send(event.plain_result(f"本群群名更新为：{group_name}"))
 
+    async def _delete_user_msgs(
+        self, event: AiocqhttpMessageEvent, senders: set[int], count: int
+    ) -> tuple[int, int]:
+        """
+        从新到旧查找 senders 的消息并撤回，直到撤回 count 条或达到翻页/时间上限
+        先查本地消息缓冲，再从缓冲最旧处向前翻历史；翻页与撤回并行进行
+        返回 (撤回条数, 检索消息数)
+        """
+        client = get_client(event)
+        group_id = event.get_group_id()
+        ring_store = MessageRingStore.get_instance()
+        # 待撤回的候选（从新到旧）；撤回失败时由后面的候选补上，不丢弃多出来的
+        pending: deque[int] = deque()
+        cond = asyncio.Condition()
+        deleted = inflight = scanned = 0
+        produced = False
+
+        def need_more() -> bool:
+            """候选加进行中的撤回不足以凑够 count 条"""
+            return deleted < count and deleted + inflight + len(pending) < count
+
+        async def offer(message_id: int):
+            async with cond:
+                pending.append(message_id)
+                cond.notify_all()
+
+        async def produce():
+            nonlocal scanned
+            seen: set[int] = set()
+            seq = 0
+            if ring := ring_store.get(group_id):
+                # 已撤回的消息不再从历史里重试
+                seen.update(ring.recalled_ids())
+                for m in ring.latest():
+                    seen.add(m.message_id)
+                    seq = m.message_seq
+                    scanned += 1
+                    if m.sender_id in senders:
+                        await offer(m.message_id)
+            cutoff = time.time() - self.RECALL_MAX_AGE
+            for _ in range(self.RECALL_MAX_PAGES):
+                # 候选够用时先等撤回结果，有失败再继续翻页
+                async with cond:
+                    await cond.wait_for(lambda: deleted >= count or need_more())
+                    if deleted >= count:
+                        return
+                result: dict = await client.call_action(
+                    "get_group_msg_history",
+                    group_id=int(group_id),
+                    message_seq=seq,
+                    count=self.RECALL_PAGE_SIZE,
+                    reverseOrder=True,
+                )
+                messages = result.get("messages") or []
+                if not messages:
+                    break
+                for msg in reversed(messages):
+                    if msg["message_id"] in seen:
+                        continue
+                    seen.add(msg["message_id"])
+                    scanned += 1
+                    if msg.get("time", cutoff) < cutoff:
+                        return
+                    if msg["sender"]["user_id"] in senders:
+                        await offer(msg["message_id"])
+                # 翻页用最旧一条的 message_seq（部分协议端与 message_id 不同）
+                oldest = messages[0]
+                next_seq = oldest.get("message_seq") or oldest["message_id"]
+                if next_seq == seq:
+                    break
+                seq = next_seq
+
+        async def consume():
+            nonlocal deleted, inflight
+            while True:
+                async with cond:
+                    # 有候选且进行中的撤回不会超额时才取；候选取完且不再翻页时退出
+                    await cond.wait_for(
+                        lambda: deleted >= count
+                        or (pending and deleted + inflight < count)
+                        or (produced and not pending)
+                    )
+                    if deleted >= count or not pending:
+                        return
+                    message_id = pending.popleft()
+                    inflight += 1
+                try:
+                    await client.delete_msg(message_id=message_id)
+                    ring_store.forget(group_id, message_id)
+                    deleted += 1
+                except Exception:
+                    pass
+                finally:
+                    async with cond:
+                        inflight -= 1
+                        cond.notify_all()
+
+        workers = [asyncio.create_task(consume()) for _ in range(self.RECALL_CONCURRENCY)]
+        try:
+            await produce()
+        except Exception as e:
+            logger.warning(f"群{group_id}翻取历史消息失败：{e}")
+        finally:
+            async with cond:
+                produced = True
+                cond.notify_all()
+            await asyncio.gather(*workers)
+        return deleted, scanned
+
     async def delete_msg(self, event: AiocqhttpMessageEvent):
-        """(引用消息)撤回 | 撤回 @某人(默认bot) 数量(默认10)"""
-        client = event.bot
+        """(引用消息)撤回 | 撤回 @某人(默认bot) 条数(默认10)"""
+        client = get_client(event)
         chain = event.get_messages()
         first_seg = chain[0]
         if isinstance(first_seg, Reply):
@@ -248,36 +446,10 @@ class NormalHandle:
             target_ids = {str(uid) for uid in target_ids}
 
             end_arg = event.message_str.split()[-1]
-            count = int(end_arg) if end_arg.isdigit() else 10
-
-            payloads = {
-                "group_id": int(event.get_group_id()),
-                "message_seq": 0,
-                "count": count,
-                "reverseOrder": True,
-            }
-            result: dict = await client.api.call_action(
-                "get_group_msg_history", **payloads
-            )
+            count = min(int(end_arg), self.RECALL_MAX) if end_arg.isdigit() else 10
 
-            messages = list(reversed(result.get("messages", [])))
-            delete_count = 0
-            sem = asyncio.Semaphore(10)
-
-            # 撤回消息
-            async def try_delete(message: dict):
-                nonlocal delete_count
-                if str(message["sender"]["user_id"]) not in target_ids:
-                    return
-                async with sem:
-                    try:
-                        await client.delete_msg(message_id=message["message_id"])
-                        delete_count += 1
-                    except Exception:
-                        pass
-
-            # 并发撤回
-            tasks = [try_delete(msg) for msg in messages]
-            await asyncio.gather(*tasks)
-
-            await event.send(event.plain_result(f"已从{count}条消息中撤回{delete_count}条"))
+            senders = {int(uid) for uid in target_ids}
+            deleted, scanned = await self._delete_user_msgs(event, senders, count)
+            await event.send(
+                event.plain_result(f"已撤回{deleted}条（共检索{scanned}条消息）")
+            )
@@ -11,6 +11,7 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..client import get_client
 from ..utils import download_file, extract_image_url
 
 if TYPE_CHECKING:
@@ -38,14 +39,14 @@ class NoticeHandle:
             if not image_path:
                 await event.send(event.plain_result("图片获取失败"))
                 return
-        await event.bot._send_group_notice(
+        await get_client(event)._send_group_notice(
             group_id=int(event.get_group_id()), content=content, image=image_path
         )
         event.stop_event()
 
     async def get_group_notice(self, event: AiocqhttpMessageEvent):
         """查看群公告"""
-        notices = await event.bot._get_group_notice(group_id=int(event.get_group_id()))
+        notices = await get_client(event)._get_group_notice(group_id=int(event.get_group_id()))
 
         formatted_messages = []
         for notice in notices:
@@ -62,6 +63,6 @@ class NoticeHandle:
             formatted_messages.append(formatted_message)
 
         notices_str = "\n\n\n".join(formatted_messages)
-        url = await self.plugin.text_to_image(notices_str)
+        url = await self.plugin.render(notices_str)
         await event.send(event.image_result(url))
         # TODO 做张好看的图片来展示
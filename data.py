@@ -1,5 +1,8 @@
 import asyncio
 import json
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
 
 import aiosqlite
@@ -10,30 +13,115 @@ from astrbot.core.config.astrbot_config import AstrBotConfig
 from .utils import parse_bool
 
 
+# ====================== 字段中英文映射 ======================
+FIELD_MAP = {
+    "join_switch": "进群审核",
+    "join_min_level": "进群等级门槛",
+    "join_max_time": "进群尝试次数",
+    "join_accept_words": "进群白词",
+    "join_reject_words": "进群黑词",
+    "join_no_match_reject": "未中白词拒绝",
+    "reject_word_block": "命中黑词拉黑",
+    "block_ids": "进群黑名单",
+    "join_welcome": "进群欢迎词",
+    "join_ban_time": "进群禁言时长",
+    "leave_notify": "主动退群通知",
+    "leave_block": "主动退群拉黑",
+    "builtin_ban": "启用内置禁词",
+    "custom_ban_words": "自定义违禁词",
+    "word_ban_time": "禁词禁言时长",
+    "spamming_ban_time": "刷屏禁言时长",
+}
+
+
+def _lower_words(value) -> tuple[str, ...]:
+    """关键词列表 -> 去空的小写元组"""
+    return tuple(str(w).lower() for w in value or () if str(w))
+
+
+def _int_ids(value) -> frozenset[int]:
+    """QQ号列表 -> int 集合，非数字项忽略"""
+    return frozenset(int(i) for i in value or () if str(i).isdigit())
+
+
+def _detached(value):
+    """列表/字典值深拷贝后再交给调用方，避免原地修改波及缓存与默认原型"""
+    if isinstance(value, (list, dict)):
+        return json.loads(json.dumps(value))
+    return value
+
+
+# 派生属性：源字段 -> (属性名, 计算函数)，源字段写入时同步重算
+_DERIVED = {
+    "join_accept_words": ("accept_words_lower", _lower_words),
+    "join_reject_words": ("reject_words_lower", _lower_words),
+    "custom_ban_words": ("ban_words_lower", _lower_words),
+    "block_ids": ("block_id_set", _int_ids),
+}
+
+
+class GroupConfig:
+    """
+    单群配置对象
+    - 字段由 FIELD_MAP 生成为 __slots__，热路径直接读属性
+    - 派生属性（小写关键词元组、黑名单 int 集合）在写入时预计算
+    - copy() 只复制引用，字段值与原型共享；写入一律整体替换，不原地修改（写时复制）
+    - 因此 QQAdminDB.get()/all() 对外返回列表、字典的副本，不暴露共享值
+    """
+
+    FIELDS: tuple[str, ...] = tuple(FIELD_MAP)
+
+    __slots__ = (*FIELDS, *(name for name, _ in _DERIVED.values()), "extra")
+
+    def __init__(self, data: dict | None = None):
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        for name, func in _DERIVED.values():
+            setattr(self, name, func(None))
+        # FIELD_MAP 以外的动态字段
+        self.extra: dict = {}
+        if data:
+            self.update(data)
+
+    def get(self, field: str, default=None):
+        if field in FIELD_MAP:
+            value = getattr(self, field)
+        else:
+            value = self.extra.get(field)
+        return default if value is None else value
+
+    def set(self, field: str, value):
+        if field in FIELD_MAP:
+            setattr(self, field, value)
+            if field in _DERIVED:
+                name, func = _DERIVED[field]
+                setattr(self, name, func(value))
+        else:
+            self.extra[field] = value
+
+    def update(self, data: dict):
+        for k, v in data.items():
+            self.set(k, v)
+
+    def copy(self) -> "GroupConfig":
+        new = GroupConfig.__new__(GroupConfig)
+        for name in self.__slots__:
+            setattr(new, name, getattr(self, name))
+        new.extra = dict(self.extra)
+        return new
+
+    def to_dict(self) -> dict:
+        data = {f: getattr(self, f) for f in self.FIELDS if getattr(self, f) is not None}
+        data.update(self.extra)
+        return data
+
+
 class QQAdminDB:
     """
     群管插件数据库（极简 API + 动态字段 + 自动补齐）
     """
 
-    # ====================== 字段中英文映射 ======================
-    FIELD_MAP = {
-        "join_switch": "进群审核",
-        "join_min_level": "进群等级门槛",
-        "join_max_time": "进群尝试次数",
-        "join_accept_words": "进群白词",
-        "join_reject_words": "进群黑词",
-        "join_no_match_reject": "未中白词拒绝",
-        "reject_word_block": "命中黑词拉黑",
-        "block_ids": "进群黑名单",
-        "join_welcome": "进群欢迎词",
-        "join_ban_time": "进群禁言时长",
-        "leave_notify": "主动退群通知",
-        "leave_block": "主动退群拉黑",
-        "builtin_ban": "启用内置禁词",
-        "custom_ban_words": "自定义违禁词",
-        "word_ban_time": "禁词禁言时长",
-        "spamming_ban_time": "刷屏禁言时长",
-    }
+    FIELD_MAP = FIELD_MAP
 
     REVERSE_FIELD_MAP = {v: k for k, v in FIELD_MAP.items()}
 
@@ -44,11 +132,30 @@ class QQAdminDB:
 
         # 默认字段（动态配置核心）
         self.default_cfg: dict = config["default"]
+        # 默认配置原型，新群/重置时浅拷贝
+        self._default = GroupConfig(json.loads(json.dumps(self.default_cfg)))
 
         self._conn = None
-        self._cache = {}
+        self._cache: dict[str, GroupConfig] = {}
         self._initialized = False
         self._init_lock = asyncio.Lock()
+        # 每群写锁：读取-复制-修改-提交-替换 整段串行，避免并发写从同一旧快照出发互相覆盖
+        self._group_locks: dict[str, asyncio.Lock] = {}
+        # 连接级写锁：各群的写事务共用一个连接，同一时刻只能有一个事务
+        self._write_lock = asyncio.Lock()
+
+        # 变更通知：每群单调递增的版本号 + 提交后回调 (gid, 变动字段)
+        self._versions: dict[str, int] = {}
+        self._subscribers: list[Callable[[str, frozenset[str]], None]] = []
+        # 中文配置文本缓存 {gid: (version, text)}
+        self._export_cache: dict[str, tuple[int, str]] = {}
+
+        # 多进程同步：轮询 PRAGMA data_version，按 changes 表增量重载
+        self.sync_interval: int = config["db_sync_interval"]
+        self._data_version = 0
+        self._last_seq = 0
+        self._own_seqs: set[int] = set()
+        self._sync_task: asyncio.Task | None = None
 
     # ============================== 初始化 ==============================
 
@@ -60,6 +167,9 @@ class QQAdminDB:
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             self._conn = await aiosqlite.connect(str(self.db_path))
             self._conn.row_factory = aiosqlite.Row
+            # WAL 允许多进程并发读写
+            await self._conn.execute("PRAGMA journal_mode=WAL;")
+            await self._conn.execute("PRAGMA busy_timeout=5000;")
 
             await self._conn.execute("""
                 CREATE TABLE IF NOT EXISTS groups (
@@ -67,110 +177,389 @@ class QQAdminDB:
                     data TEXT NOT NULL
                 );
             """)
+            # 变更日志：每次写入记一行，供其他进程增量重载
+            await self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    group_id TEXT NOT NULL,
+                    ts REAL NOT NULL
+                );
+            """)
             await self._conn.commit()
 
-            # 加载缓存
+            async with self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM changes;"
+            ) as cur:
+                self._last_seq = (await cur.fetchone())[0]
+            self._data_version = await self._get_data_version()
+
+            # 加载缓存（缺失字段由默认原型补齐）
             async with self._conn.execute("SELECT group_id, data FROM groups;") as cur:
                 async for row in cur:
                     try:
-                        self._cache[row["group_id"]] = json.loads(row["data"])
+                        self._cache[row["group_id"]] = self._load(row["data"])
                     except Exception:
                         logger.exception("解析 group 数据失败: %s", row["group_id"])
 
             self._initialized = True
             logger.info("QQAdminDB initialized (%d groups)", len(self._cache))
 
-    async def _save_to_db(self, gid: str, data):
+            if self.sync_interval > 0:
+                self._sync_task = asyncio.create_task(self._sync_loop())
+
+    def _load(self, raw: str) -> GroupConfig:
+        cfg = self._default.copy()
+        cfg.update(json.loads(raw))
+        return cfg
+
+    async def _save_to_db(
+        self, gid: str, cfg: GroupConfig, changed: frozenset[str] | None = None
+    ):
+        await self._save_many([(gid, cfg, changed)])
+
+    async def _save_many(
+        self, items: list[tuple[str, GroupConfig, frozenset[str] | None]]
+    ):
+        """
+        多个群配置在同一事务内写入，提交成功后再逐群通知
+        - changed 不为 None 时只合并这些字段：事务内重读库中的行，
+          其他进程尚未同步过来的改动不会被本进程的旧缓存覆盖
+        - changed 为 None 时整行覆盖（重置）
+        """
         if not self._conn:
             raise RuntimeError("请先 init()")
+        if not items:
+            return
+
+        async with self._write_lock:
+            try:
+                # 立即取得写锁，重读与写入之间不会插入其他进程的提交
+                await self._conn.execute("BEGIN IMMEDIATE;")
+                merged = await self._merge_stored(items)
+                await self._conn.executemany(
+                    """
+                    INSERT INTO groups(group_id, data)
+                    VALUES (?, ?)
+                    ON CONFLICT(group_id) DO UPDATE SET data=excluded.data;
+                    """,
+                    [
+                        (gid, json.dumps(cfg.to_dict(), ensure_ascii=False))
+                        for gid, cfg, _ in merged
+                    ],
+                )
+                seqs = await self._log_changes([gid for gid, _, _ in merged])
+                await self._conn.commit()
+            except Exception:
+                await self._conn.rollback()
+                raise
+            # 提交成功后才记为自己的写入：回滚时序号会被其他进程复用
+            self._own_seqs.update(seqs)
+
+        for gid, cfg, changed in merged:
+            old = self._cache.get(gid)
+            self._cache[gid] = cfg
+            if old is None:
+                changed = frozenset(cfg.FIELDS)
+            else:
+                # 整行覆盖时按前后差异通知；合并时顺带带进来的其他进程改动也要通知
+                changed = (changed or frozenset()) | self._diff(
+                    old.to_dict(), cfg.to_dict()
+                )
+            if changed:
+                self._notify(gid, changed)
+
+    async def _merge_stored(
+        self, items: list[tuple[str, GroupConfig, frozenset[str] | None]]
+    ) -> list[tuple[str, GroupConfig, frozenset[str] | None]]:
+        """把各群改动的字段合并到库中当前的行上（须在写事务内调用）"""
+        assert self._conn
+        gids = [gid for gid, _, changed in items if changed is not None]
+        if not gids:
+            return items
+        rows: dict[str, str] = {}
+        placeholders = ",".join("?" * len(gids))
+        async with self._conn.execute(
+            f"SELECT group_id, data FROM groups WHERE group_id IN ({placeholders});",
+            gids,
+        ) as cur:
+            async for row in cur:
+                rows[row["group_id"]] = row["data"]
+
+        merged = []
+        for gid, cfg, changed in items:
+            if changed is not None and gid in rows:
+                base = self._load(rows[gid])
+                for field in changed:
+                    base.set(field, cfg.get(field))
+                cfg = base
+            merged.append((gid, cfg, changed))
+        return merged
+
+    # ============================== 多进程同步 ==============================
+
+    async def _log_changes(self, gids: list[str]) -> range:
+        """在当前事务内写变更日志，返回写入的序号（事务持有写锁，序号连续）"""
+        assert self._conn
+        now = time.time()
+        await self._conn.executemany(
+            "INSERT INTO changes(group_id, ts) VALUES (?, ?);",
+            [(gid, now) for gid in gids],
+        )
+        async with self._conn.execute("SELECT last_insert_rowid();") as cur:
+            last = (await cur.fetchone())[0]
+        return range(last - len(gids) + 1, last + 1)
+
+    async def _get_data_version(self) -> int:
+        assert self._conn
+        async with self._conn.execute("PRAGMA data_version;") as cur:
+            return (await cur.fetchone())[0]
+
+    async def _sync_loop(self):
+        last_prune = time.time()
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+                # 变更日志只保留一天
+                if time.time() - last_prune > 3600:
+                    last_prune = time.time()
+                    async with self._write_lock:
+                        await self._conn.execute(  # type: ignore
+                            "DELETE FROM changes WHERE ts < ?;", (time.time() - 86400,)
+                        )
+                        await self._conn.commit()  # type: ignore
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("同步其他进程的群配置失败")
+
+    async def sync(self) -> int:
+        """
+        检测其他进程的写入并只重载变动的群，返回重载的群数
+        - data_version 未变：只有一次 PRAGMA 开销
+        - data_version 变了但 changes 表没有新序号，或新序号全是自己写的：
+          再多一次 MAX(seq) 主键查询（本进程的活跃统计、审计走独立连接，
+          其提交同样会改变 data_version，属于这种情况）
+        - 扫描变更日志时持有写锁，不会把本连接未提交的写入当成其他进程的；
+          重载时持有各群写锁，与本进程的写入串行
+        """
+        if not self._conn:
+            return 0
+        async with self._write_lock:
+            gids = await self._scan_changes()
+        if not gids:
+            return 0
+
+        async with self._locked(gids), self._write_lock:
+            rows: dict[str, str] = {}
+            placeholders = ",".join("?" * len(gids))
+            async with self._conn.execute(
+                f"SELECT group_id, data FROM groups WHERE group_id IN ({placeholders});",
+                tuple(gids),
+            ) as cur:
+                async for row in cur:
+                    rows[row["group_id"]] = row["data"]
+
+            for gid in gids:
+                old = self._cache.get(gid)
+                before = old.to_dict() if old else {}
+                if gid in rows:
+                    try:
+                        cfg = self._load(rows[gid])
+                    except Exception:
+                        logger.exception("解析 group 数据失败: %s", gid)
+                        continue
+                    self._cache[gid] = cfg
+                    self._notify(gid, self._diff(before, cfg.to_dict()))
+                elif old is not None:
+                    del self._cache[gid]
+                    self._notify(gid, frozenset(before))
+
+        logger.debug(f"已从其他进程同步{len(gids)}个群的群管配置")
+        return len(gids)
+
+    async def _scan_changes(self) -> set[str]:
+        """读取上次同步后其他进程写过的群（须持有写锁）"""
+        assert self._conn
+        version = await self._get_data_version()
+        if version == self._data_version:
+            return set()
+        self._data_version = version
+
+        async with self._conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM changes;"
+        ) as cur:
+            max_seq = (await cur.fetchone())[0]
+        if max_seq == self._last_seq:
+            return set()
+        new_seqs = range(self._last_seq + 1, max_seq + 1)
+        if all(seq in self._own_seqs for seq in new_seqs):
+            self._own_seqs.difference_update(new_seqs)
+            self._last_seq = max_seq
+            return set()
+
+        gids: set[str] = set()
+        async with self._conn.execute(
+            "SELECT seq, group_id FROM changes WHERE seq > ? ORDER BY seq;",
+            (self._last_seq,),
+        ) as cur:
+            async for row in cur:
+                self._last_seq = row["seq"]
+                if row["seq"] in self._own_seqs:
+                    self._own_seqs.discard(row["seq"])
+                    continue
+                gids.add(row["group_id"])
+        self._own_seqs = {seq for seq in self._own_seqs if seq > self._last_seq}
+        return gids
+
+    # ============================== 变更通知 ==============================
 
-        await self._conn.execute(
-            """
-            INSERT INTO groups(group_id, data)
-            VALUES (?, ?)
-            ON CONFLICT(group_id) DO UPDATE SET data=excluded.data;
-            """,
-            (gid, json.dumps(data, ensure_ascii=False)),
+    def version(self, gid: str) -> int:
+        """群配置版本号，每次提交后 +1；派生缓存比对版本号即可判断是否需要重建"""
+        return self._versions.get(gid, 0)
+
+    def subscribe(
+        self, callback: Callable[[str, frozenset[str]], None]
+    ) -> Callable[[], None]:
+        """
+        订阅配置变更，每次提交后以 (gid, 变动字段) 同步回调
+        回调里只应做轻量操作（如标记失效），返回取消订阅的函数
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _notify(self, gid: str, changed: frozenset[str]):
+        self._versions[gid] = self._versions.get(gid, 0) + 1
+        for callback in list(self._subscribers):
+            try:
+                callback(gid, changed)
+            except Exception:
+                logger.exception("群配置变更回调出错: %s", gid)
+
+    @staticmethod
+    def _diff(before: dict, after: dict) -> frozenset[str]:
+        """比较前后两份配置，返回变动的字段"""
+        return frozenset(
+            k for k in before.keys() | after.keys() if before.get(k) != after.get(k)
         )
-        await self._conn.commit()
 
     # ============================== 基础：确保配置存在 ==============================
 
-    async def ensure_group(self, gid: str):
+    @asynccontextmanager
+    async def _locked(self, gids: Iterable[str]) -> AsyncIterator[None]:
+        """按群号排序依次加锁（多群写入时固定顺序，避免互相等待）"""
+        async with AsyncExitStack() as stack:
+            for gid in sorted(set(gids)):
+                lock = self._group_locks.setdefault(gid, asyncio.Lock())
+                await stack.enter_async_context(lock)
+            yield
+
+    async def ensure_group(self, gid: str) -> GroupConfig:
         """确保存在群配置，若没有则按 default_cfg 初始化"""
-        if gid not in self._cache:
-            self._cache[gid] = json.loads(json.dumps(self.default_cfg))
-            await self._save_to_db(gid, self._cache[gid])
+        cfg = self._cache.get(gid)
+        if cfg is None:
+            cfg = self._cache[gid] = self._default.copy()
+            # 不指定字段：其他进程已建过该群时沿用库中的行，不用默认值覆盖
+            await self._save_to_db(gid, cfg, frozenset())
+            cfg = self._cache[gid]
+        return cfg
 
     # ============================== 🔥 极简 API ==============================
 
-    async def all(self, gid: str) -> dict:
+    async def group(self, gid: str) -> GroupConfig:
         """
-        获取整个配置，并自动补齐 default_cfg 的字段
+        获取群配置对象，热路径直接读属性（如 cfg.word_ban_time、cfg.block_id_set）
+        注意：返回的是缓存对象本身，修改请走 set()
         """
-        await self.ensure_group(gid)
-        data = self._cache[gid]
-
-        changed = False
-        for k, v in self.default_cfg.items():
-            if k not in data:
-                data[k] = json.loads(json.dumps(v))
-                changed = True
+        return await self.ensure_group(gid)
 
-        if changed:
-            await self._save_to_db(gid, data)
-
-        return data
+    async def all(self, gid: str) -> dict:
+        """
+        获取整个配置（已由默认原型补齐 default_cfg 的字段）
+        """
+        cfg = await self.ensure_group(gid)
+        return {k: _detached(v) for k, v in cfg.to_dict().items()}
 
     async def get(self, gid: str, field: str, default=None):
         """
         读字段，不存在则补齐 default
         """
-        await self.ensure_group(gid)
-        data = self._cache[gid]
-
-        if field not in data:
-            data[field] = json.loads(json.dumps(default))
-            await self._save_to_db(gid, data)
-
-        return data[field]
+        value = (await self.ensure_group(gid)).get(field)
+        if value is None:
+            if default is None:
+                return None
+            async with self._locked((gid,)):
+                # 等锁期间可能已被其他写入补齐
+                cfg = await self.ensure_group(gid)
+                value = cfg.get(field)
+                if value is None:
+                    value = json.loads(json.dumps(default))
+                    cfg = cfg.copy()
+                    cfg.set(field, value)
+                    await self._save_to_db(gid, cfg, frozenset((field,)))
+        return _detached(value)
 
     async def set(self, gid: str, field: str, value):
         """
-        写入字段
+        写入字段（写副本，提交成功后才替换缓存，与 _save_many 一致）
         """
-        await self.ensure_group(gid)
-        self._cache[gid][field] = value
-        await self._save_to_db(gid, self._cache[gid])
+        async with self._locked((gid,)):
+            await self._set_unlocked(gid, field, value)
+
+    async def _set_unlocked(self, gid: str, field: str, value):
+        cfg = (await self.ensure_group(gid)).copy()
+        cfg.set(field, value)
+        await self._save_to_db(gid, cfg, frozenset((field,)))
 
     async def add(self, gid: str, field: str, value):
         """
         列表字段追加（自动创建列表）
         """
-        lst = list(await self.get(gid, field, []))
-        if value not in lst:
-            lst.append(value)
-            await self.set(gid, field, lst)
+        async with self._locked((gid,)):
+            lst = list((await self.ensure_group(gid)).get(field, []))
+            if value not in lst:
+                lst.append(value)
+                await self._set_unlocked(gid, field, lst)
 
     async def remove(self, gid: str, field: str, value):
         """
         列表字段删除（自动创建列表）
         """
-        lst = [i for i in await self.get(gid, field, []) if i != value]
-        await self.set(gid, field, lst)
+        async with self._locked((gid,)):
+            lst = (await self.ensure_group(gid)).get(field, [])
+            await self._set_unlocked(gid, field, [i for i in lst if i != value])
 
     # ============================== 删除群配置 ==============================
 
     async def delete_group(self, gid: str):
         """彻底删除群配置"""
-        if self._conn:
-            await self._conn.execute("DELETE FROM groups WHERE group_id = ?", (gid,))
-            await self._conn.commit()
-        self._cache.pop(gid, None)
+        async with self._locked((gid,)):
+            if self._conn:
+                async with self._write_lock:
+                    try:
+                        await self._conn.execute(
+                            "DELETE FROM groups WHERE group_id = ?", (gid,)
+                        )
+                        seqs = await self._log_changes([gid])
+                        await self._conn.commit()
+                    except Exception:
+                        await self._conn.rollback()
+                        raise
+                    self._own_seqs.update(seqs)
+            if cfg := self._cache.pop(gid, None):
+                self._notify(gid, frozenset(cfg.to_dict()))
 
     # ============================== 关闭 ==============================
 
     async def close(self):
+        if self._sync_task:
+            self._sync_task.cancel()
+            self._sync_task = None
         if self._conn:
             await self._conn.close()
             self._conn = None
@@ -186,7 +575,13 @@ class QQAdminDB:
         - 布尔：开 / 关
         - 其它类型按原样输出
         """
-        data = await self.all(gid)
+        cfg = await self.ensure_group(gid)
+        version = self.version(gid)
+        cached = self._export_cache.get(gid)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        data = cfg.to_dict()
         lines = []
 
         for eng_key, value in data.items():
@@ -206,7 +601,9 @@ class QQAdminDB:
 
             lines.append(f"{cn_key}: {val_str}")
 
-        return "\n".join(lines)
+        text = "\n".join(lines)
+        self._export_cache[gid] = (version, text)
+        return text
 
     async def import_cn_lines(self, gid: str, text: str) -> dict:
         """
@@ -216,9 +613,29 @@ class QQAdminDB:
         - 数字：自动转 int
         - 字符串：原样保存
         """
-        await self.ensure_group(gid)
-        data = self._cache[gid]
+        await self.import_cn_lines_bulk([gid], text)
+        return self._cache[gid].to_dict()
 
+    async def import_cn_lines_bulk(self, gids: list[str] | None, text: str) -> int:
+        """
+        把同一份中文配置文本应用到多个群（gids 为 None 表示所有已知群），单事务提交
+        返回写入的群数
+        """
+        targets = list(self._cache) if gids is None else list(dict.fromkeys(gids))
+        async with self._locked(targets):
+            items = []
+            for gid in targets:
+                old = self._cache.get(gid)
+                # 在副本上修改，提交成功后再替换缓存
+                cfg = old.copy() if old else self._default.copy()
+                before = old.to_dict() if old else {}
+                self._apply_cn_lines(cfg, text)
+                items.append((gid, cfg, self._diff(before, cfg.to_dict())))
+            await self._save_many(items)
+        return len(items)
+
+    def _apply_cn_lines(self, cfg: GroupConfig, text: str):
+        """把中文配置文本解析进 cfg"""
         for line in text.splitlines():
             if ":" not in line:
                 continue
@@ -231,13 +648,13 @@ class QQAdminDB:
             if not eng_key:
                 continue
 
-            old_val = data.get(eng_key)
+            old_val = cfg.get(eng_key)
 
             # 如果原字段是 bool，则优先进行布尔解析
             if isinstance(old_val, bool):
                 parsed = parse_bool(raw_v)
                 if parsed is not None:
-                    data[eng_key] = parsed
+                    cfg.set(eng_key, parsed)
                     continue
                 # 若解析失败，退回默认字面处理（防错）
 
@@ -256,17 +673,34 @@ class QQAdminDB:
             else:
                 value = raw_v
 
-            data[eng_key] = value
-
-        await self._save_to_db(gid, data)
-        return data
-
+            cfg.set(eng_key, value)
 
     async def reset_to_default(self, gid: str | None = None):
-        """把指定群（或全部群）配置恢复成 default_cfg"""
+        """把指定群（或全部群）配置恢复成 default_cfg，单事务提交"""
         targets = [gid] if gid else list(self._cache.keys())
-        for g in targets:
-            self._cache[g] = json.loads(json.dumps(self.default_cfg))
-            await self._save_to_db(g, self._cache[g])
+        async with self._locked(targets):
+            # 整行覆盖：其他进程尚未同步过来的字段也一并重置
+            items = [(g, self._default.copy(), None) for g in targets]
+            await self._save_many(items)
 
         logger.info(f"群聊{gid}的群管配置已重置为默认值")
+
+    async def export_all(self, path: Path) -> int:
+        """
+        逐行流式导出所有群配置到 JSONL 文件（每行一个群，按群号排序，便于 diff/备份）
+        返回导出的群数
+        """
+        if not self._conn:
+            raise RuntimeError("请先 init()")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with path.open("w", encoding="utf-8") as f:
+            async with self._conn.execute(
+                "SELECT group_id, data FROM groups ORDER BY group_id;"
+            ) as cur:
+                async for row in cur:
+                    record = {"group_id": row["group_id"], "data": json.loads(row["data"])}
+                    f.write(json.dumps(record, ensure_ascii=False, sort_keys=True))
+                    f.write("\n")
+                    count += 1
+        return count
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiocqhttp.exceptions import NetworkError
+
+from astrbot import logger
+
+# 可重试的瞬时错误；ActionFailed（无权限、对象不存在等）重试无意义
+TRANSIENT_ERRORS = (NetworkError, asyncio.TimeoutError, ConnectionError)
+
+
+class GroupRateLimiter:
+    """按群限速：同一群内相邻两次调用至少间隔 1/rate 秒，多个批任务共享"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next: dict[str, float] = {}
+
+    async def wait(self, group_id: str):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        at = max(now, self._next.get(group_id, 0.0))
+        self._next[group_id] = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+@dataclass
+class BatchResult:
+    """批量执行结果，取消时保留已完成部分"""
+
+    total: int
+    succeeded: list[Any] = field(default_factory=list)
+    failed: list[tuple[Any, str]] = field(default_factory=list)
+    cancelled: bool = False
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def finished(self) -> int:
+        return len(self.succeeded) + len(self.failed)
+
+    def progress(self, action: str) -> str:
+        return f"{action}进度：{self.finished}/{self.total}（失败{len(self.failed)}）"
+
+    def summary(self, action: str, name: Callable[[Any], str] = str) -> str:
+        elapsed = time.monotonic() - self.started
+        head = "已取消" if self.cancelled else "已完成"
+        lines = [
+            f"{action}{head}：成功{len(self.succeeded)}，失败{len(self.failed)}，"
+            f"未执行{self.total - self.finished}，耗时{elapsed:.1f}秒"
+        ]
+        lines += [f"❌ {name(item)}：{reason}" for item, reason in self.failed]
+        return "\n".join(lines)
+
+
+class BatchExecutor:
+    """
+    有界并发的批量执行器（批量踢人等）
+    - 并发上限 + 按群限速
+    - 瞬时错误指数退避重试
+    - 定期回调进度；被取消时返回已完成的部分结果
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        rate: float = 3.0,
+        retries: int = 2,
+        backoff: float = 1.0,
+        progress_interval: float = 15.0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        # 不大于 0 时不汇报进度
+        self.progress_interval = progress_interval
+        # 同一执行器上的多个批任务共享按群限速
+        self.limiter = GroupRateLimiter(rate)
+
+    async def _attempt(self, group_id: str, action: Callable[[Any], Awaitable], item):
+        for attempt in range(self.retries + 1):
+            await self.limiter.wait(group_id)
+            try:
+                return await action(item)
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2**attempt
+                logger.warning(f"群{group_id}批量操作 {item} 失败（{e}），{delay}秒后重试")
+                await asyncio.sleep(delay)
+
+    async def run(
+        self,
+        group_id: str | int,
+        items: Iterable[Any],
+        action: Callable[[Any], Awaitable],
+        on_progress: Callable[[BatchResult], Awaitable] | None = None,
+    ) -> BatchResult:
+        """对 items 逐个执行 action，返回结果汇总"""
+        gid = str(group_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+        result = BatchResult(total=queue.qsize())
+
+        async def worker():
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await self._attempt(gid, action, item)
+                    result.succeeded.append(item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    result.failed.append((item, str(e) or type(e).__name__))
+
+        async def reporter():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                try:
+                    await on_progress(result)
+                except Exception as e:
+                    logger.warning(f"进度回报失败：{e}")
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.concurrency, result.total))
+        ]
+        report_task = (
+            asyncio.create_task(reporter())
+            if on_progress and self.progress_interval > 0
+            else None
+        )
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            result.cancelled = True
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            if report_task:
+                report_task.cancel()
+        return result
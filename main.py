@@ -1,6 +1,7 @@
 import asyncio
 import random
 import re
+from datetime import datetime
 from pathlib import Path
 
 from astrbot import logger
@@ -12,23 +13,35 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 )
 from astrbot.core.star.filter.event_message_type import EventMessageType
 
+from .activity import ActivityTracker
+from .audit import AuditLog
+from .breaker import CircuitBreaker
+from .client import ReadCoalescer, get_client, on_write
 from .core import (
+    AuditHandle,
+    BackupHandle,
     BanproHandle,
     CurfewHandle,
     FileHandle,
     JoinHandle,
     LLMHandle,
     MemberHandle,
+    MuteHandle,
     NormalHandle,
     NoticeHandle,
 )
 from .data import QQAdminDB
+from .msg_ring import MessageRingStore
+from .mute_registry import MuteRegistry
 from .permission import (
     PermissionManager,
     PermLevel,
     perm_required,
 )
-from .utils import ADMIN_HELP, print_logo
+from .render_cache import RenderCache
+from .roster import RosterStore
+from .scheduler import ActionScheduler
+from .utils import ADMIN_HELP, nickname_cache, print_logo
 
 
 class QQAdminPlugin(Star):
@@ -50,6 +63,15 @@ class QQAdminPlugin(Star):
         # 数据库
         self.db = QQAdminDB(self.conf, self.db_path)
         await self.db.init()
+        self.activity = ActivityTracker(self.db_path)
+        await self.activity.init()
+        # 审计：插件发出的写接口与命令触发的配置变更
+        self.audit = AuditLog(self.db_path)
+        await self.audit.init()
+        self._audit_unsubs = [
+            on_write(self.audit.on_write),
+            self.db.subscribe(self.audit.on_config_change),
+        ]
         if not self.divided_manage:
             await self.db.reset_to_default()
         # 实例化各个处理类
@@ -58,10 +80,32 @@ class QQAdminPlugin(Star):
         self.banpro = BanproHandle(self.conf, self.db, self.ban_lexicon_path)
         self.join = JoinHandle(self.conf, self.db, self.admins_id)
         self.member = MemberHandle(self)
+        self.mute = MuteHandle(self.conf)
+        self.audit_handle = AuditHandle(self)
         self.file = FileHandle(self.plugin_data_dir)
         self.curfew = CurfewHandle(self.context, self.plugin_data_dir)
         self.llm = LLMHandle(self.context, self.conf)
+        self.backup = BackupHandle(self.conf, self.plugin_data_dir, self.db_path)
+        self.render_cache = RenderCache(
+            self.plugin_data_dir / "render_cache",
+            self.conf["render_cache_mb"] * 1024 * 1024,
+        )
+        # 帮助图内容固定，启动时预渲染（持有引用，卸载时取消）
+        self._warm_task = asyncio.create_task(
+            self.render_cache.warm(ADMIN_HELP, self._render, self._t2i_template())
+        )
         asyncio.create_task(self.curfew.initialize())
+        self.backup.start()
+
+        # 出站动作调度器
+        ActionScheduler.get_instance().configure(self.conf["scheduler"])
+        # 写接口熔断：按名单缓存里 bot 的角色预判
+        CircuitBreaker.get_instance().configure(RosterStore.get_instance().member)
+
+        # 禁言登记表：恢复未到期的禁言并启动到期定时器
+        mute_registry = MuteRegistry.get_instance()
+        mute_registry.load(self.plugin_data_dir)
+        mute_registry.start()
 
         # 初始化权限管理器
         PermissionManager.get_instance(
@@ -73,6 +117,16 @@ class QQAdminPlugin(Star):
         if random.random() < 0.01:
             print_logo()
 
+    def _t2i_template(self) -> str:
+        return str(self.context.get_config().get("t2i_active_template", ""))
+
+    async def _render(self, text: str) -> str:
+        return await self.text_to_image(text, return_url=False)
+
+    async def render(self, text: str) -> str:
+        """文本转图片，内容与模板不变时直接复用渲染缓存"""
+        return await self.render_cache.render(text, self._render, self._t2i_template())
+
     @filter.on_platform_loaded()
     async def on_platform_loaded(self):
         """平台加载完成时"""
@@ -96,6 +150,16 @@ class QQAdminPlugin(Star):
     async def cancel_group_ban(self, event: AiocqhttpMessageEvent):
         await self.normal.cancel_group_ban(event)
 
+    @filter.command("禁言列表", desc="查看本群禁言中的群友")
+    @perm_required(PermLevel.ADMIN)
+    async def mute_list(self, event: AiocqhttpMessageEvent):
+        await self.mute.mute_list(event)
+
+    @filter.command("全部解禁", desc="解除本群所有禁言")
+    @perm_required(PermLevel.ADMIN)
+    async def unmute_all(self, event: AiocqhttpMessageEvent):
+        await self.mute.unmute_all(event)
+
     @filter.command("开启全禁", alias={"全员禁言", "开启全员禁言"})
     @perm_required(PermLevel.ADMIN, perm_key="whole_ban")
     async def set_group_whole_ban(self, event: AiocqhttpMessageEvent):
@@ -145,6 +209,26 @@ class QQAdminPlugin(Star):
     async def set_group_block(self, event: AiocqhttpMessageEvent):
         await self.normal.set_group_block(event)
 
+    @filter.command("批量禁言", desc="批量禁言 <秒数> <QQ列表 | /正则/>")
+    @perm_required(PermLevel.ADMIN)
+    async def bulk_ban(self, event: AiocqhttpMessageEvent):
+        await self.member.bulk_moderate(event, "ban")
+
+    @filter.command("批量解禁", desc="批量解禁 <QQ列表 | /正则/>")
+    @perm_required(PermLevel.ADMIN)
+    async def bulk_unban(self, event: AiocqhttpMessageEvent):
+        await self.member.bulk_moderate(event, "unban")
+
+    @filter.command("批量踢", desc="批量踢 <QQ列表 | /正则/>")
+    @perm_required(PermLevel.ADMIN)
+    async def bulk_kick(self, event: AiocqhttpMessageEvent):
+        await self.member.bulk_moderate(event, "kick")
+
+    @filter.command("批量拉黑", desc="批量拉黑 <QQ列表 | /正则/>")
+    @perm_required(PermLevel.ADMIN)
+    async def bulk_block(self, event: AiocqhttpMessageEvent):
+        await self.member.bulk_moderate(event, "block")
+
     @filter.command("上管", alias={"设置管理员"}, desc="上管@群友")
     @perm_required(PermLevel.OWNER, perm_key="admin", check_at=False)
     async def set_group_admin(self, event: AiocqhttpMessageEvent):
@@ -165,10 +249,10 @@ class QQAdminPlugin(Star):
     async def delete_essence_msg(self, event: AiocqhttpMessageEvent):
         await self.normal.delete_essence_msg(event)
 
-    @filter.command("查看群精华", alias={"群精华"})
+    @filter.command("查看群精华", alias={"群精华"}, desc="查看群精华 <页码>")
     @perm_required(PermLevel.ADMIN)
-    async def get_essence_msg_list(self, event: AiocqhttpMessageEvent):
-        await self.normal.get_essence_msg_list(event)
+    async def get_essence_msg_list(self, event: AiocqhttpMessageEvent, page: int = 1):
+        await self.normal.get_essence_msg_list(event, page)
 
     @filter.command("设置群头像", desc="(引用图片)设置群头像")
     @perm_required(PermLevel.ADMIN)
@@ -370,10 +454,44 @@ class QQAdminPlugin(Star):
         """监听进群/退群事件"""
         await self.join.event_monitoring(event)
 
-    @filter.command("群友信息", desc="查看群友信息")
+    @filter.platform_adapter_type(filter.PlatformAdapterType.AIOCQHTTP)
+    @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
+    async def on_group_notice(self, event: AiocqhttpMessageEvent):
+        """监听群通知，刷新各类缓存"""
+        raw = getattr(event.message_obj, "raw_message", None)
+        if not isinstance(raw, dict) or raw.get("post_type") != "notice":
+            return
+        # 先修补名单，权限缓存失效后的重新查询才能读到新角色
+        RosterStore.get_instance().on_notice(raw)
+        MessageRingStore.get_instance().on_notice(raw)
+        PermissionManager.get_instance().on_notice(raw)
+        nickname_cache.on_notice(raw)
+        CircuitBreaker.get_instance().on_notice(raw)
+        MuteRegistry.get_instance().on_notice(raw)
+        self.normal.on_notice(raw)
+
+    @filter.platform_adapter_type(filter.PlatformAdapterType.AIOCQHTTP)
+    @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
+    async def on_group_message(self, event: AiocqhttpMessageEvent):
+        """被动记录群消息发送者的群昵称、角色、发言时间和活跃统计"""
+        nickname_cache.update_from_event(event)
+        RosterStore.get_instance().update_from_event(event)
+        mute_registry = MuteRegistry.get_instance()
+        if mute_registry.client is None:
+            # 重启后恢复的长禁言需要一个连接来续禁
+            mute_registry.client = get_client(event)
+        raw = getattr(event.message_obj, "raw_message", None)
+        if isinstance(raw, dict) and raw.get("post_type") in ("message", "message_sent"):
+            MessageRingStore.get_instance().record(event)
+        if isinstance(raw, dict) and raw.get("post_type") == "message":
+            sender_id = event.get_sender_id()
+            if sender_id != event.get_self_id():
+                self.activity.record(event.get_group_id(), int(sender_id), raw.get("time"))
+
+    @filter.command("群友信息", desc="群友信息 <页码>")
     @perm_required(PermLevel.MEMBER)
-    async def get_group_member_list(self, event: AiocqhttpMessageEvent):
-        await self.member.get_group_member_list(event)
+    async def get_group_member_list(self, event: AiocqhttpMessageEvent, page: int = 1):
+        await self.member.get_group_member_list(event, page)
 
     @filter.command("清理群友")
     @perm_required(PermLevel.MEMBER)
@@ -382,9 +500,38 @@ class QQAdminPlugin(Star):
         event: AiocqhttpMessageEvent,
         inactive_days: int = 30,
         under_level: int = 10,
+        max_msgs: int | None = None,
     ):
-        "清理群友 <未发言天数> <群等级>"
-        await self.member.clear_group_member(event, inactive_days, under_level)
+        "清理群友 <未发言天数> <群等级> <消息数>"
+        await self.member.clear_group_member(
+            event, inactive_days, under_level, max_msgs
+        )
+
+    @filter.command("查群友", desc="查群友 <QQ>")
+    async def find_user_groups(self, event: AiocqhttpMessageEvent, user_id: int):
+        """查询某QQ在bot所在各群的身份（bot管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("跨群查询仅限bot管理员使用")
+            return
+        await self.member.find_user_groups(event, user_id)
+
+    @filter.command("全群踢", desc="全群踢 <QQ>")
+    async def kick_everywhere(self, event: AiocqhttpMessageEvent, user_id: int):
+        """把某QQ踢出bot有权限的所有群（bot管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("跨群踢人仅限bot管理员使用")
+            return
+        await self.member.punish_everywhere(event, user_id, None)
+
+    @filter.command("全群禁言", desc="全群禁言 <QQ> <秒数>")
+    async def ban_everywhere(
+        self, event: AiocqhttpMessageEvent, user_id: int, ban_time: int = 600
+    ):
+        """在bot有权限的所有群禁言某QQ（bot管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("跨群禁言仅限bot管理员使用")
+            return
+        await self.member.punish_everywhere(event, user_id, ban_time)
 
     @filter.command("上传群文件", desc="上传群文件 <文件夹名/文件名 | 文件名>")
     @perm_required(PermLevel.ADMIN)
@@ -441,7 +588,7 @@ class QQAdminPlugin(Star):
             duration(number): 禁言持续时间（秒），范围为0~86400, 0表示取消禁言
         """
         try:
-            await event.bot.set_group_ban(
+            await get_client(event).set_group_ban(
                 group_id=int(event.get_group_id()),
                 user_id=int(user_id),
                 duration=duration,
@@ -494,14 +641,103 @@ class QQAdminPlugin(Star):
             await self.db.reset_to_default(str(gid))
             yield event.plain_result("已重置本群的群管配置")
 
+    @filter.command("群管批量配置", alias={"群管批量设置"})
+    @perm_required(PermLevel.MEMBER, perm_key="set_config", check_at=False)
+    async def bulk_set_config(self, event: AiocqhttpMessageEvent):
+        """群管批量配置 <群号,群号 | all> <配置串>"""
+        if not event.is_admin():
+            yield event.plain_result("批量配置仅限bot管理员使用")
+            return
+        raw: str = event.message_str.partition(" ")[2].strip()
+        # 正则：^(all|群号列表)\s+(.+)  群号之间用逗号分隔
+        m = re.match(r"(all|[\d,，]+)\s+(.+)", raw, re.S)
+        if not m:
+            yield event.plain_result("格式：群管批量配置 <群号,群号 | all> <配置串>")
+            return
+        target, arg = m.group(1), m.group(2)
+        gids = None if target == "all" else [g for g in re.split(r"[,，]", target) if g]
+        count = await self.db.import_cn_lines_bulk(gids, arg)
+        yield event.plain_result(f"已批量更新{count}个群的群管配置")
+
+    @filter.command("群管导出")
+    @perm_required(PermLevel.MEMBER, perm_key="set_config", check_at=False)
+    async def export_config(self, event: AiocqhttpMessageEvent):
+        """导出所有群的群管配置到数据目录（JSONL）"""
+        if not event.is_admin():
+            yield event.plain_result("导出配置仅限bot管理员使用")
+            return
+        path = (
+            self.plugin_data_dir
+            / f"qqadmin_config_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        )
+        count = await self.db.export_all(path)
+        yield event.plain_result(f"已导出{count}个群的群管配置：{path}")
+
+    @filter.command("审计记录", desc="审计记录 [操作者] <@群友|QQ> <条数>")
+    @perm_required(PermLevel.ADMIN, check_at=False)
+    async def audit_query(self, event: AiocqhttpMessageEvent):
+        await self.audit_handle.query(event)
+
+    @filter.command("跨群审计", desc="跨群审计 [操作者] <@群友|QQ> <条数>")
+    async def audit_query_user(self, event: AiocqhttpMessageEvent):
+        """查询某人在所有群的审计记录（bot管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("跨群审计仅限bot管理员使用")
+            return
+        await self.audit_handle.query_user(event)
+
+    @filter.command("审计导出", desc="审计导出 <全部>")
+    @perm_required(PermLevel.MEMBER, check_at=False)
+    async def audit_export(self, event: AiocqhttpMessageEvent, scope: str = ""):
+        """导出审计记录到数据目录（JSONL，bot管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("导出审计记录仅限bot管理员使用")
+            return
+        await self.audit_handle.export(event, scope)
+
+    @filter.command("群管备份")
+    @perm_required(PermLevel.MEMBER, check_at=False)
+    async def backup_data(self, event: AiocqhttpMessageEvent):
+        """在线备份群管数据（bot管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("备份仅限bot管理员使用")
+            return
+        await self.backup.backup_data(event)
+
+    @filter.command("群管状态")
+    async def show_status(self, event: AiocqhttpMessageEvent):
+        """查看群管运行状态（bot管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("状态查看仅限bot管理员使用")
+            return
+        yield event.plain_result(
+            "\n".join(
+                [
+                    ReadCoalescer.get_instance().format_stats(),
+                    ActionScheduler.get_instance().format_stats(),
+                    self.render_cache.format_stats(),
+                    CircuitBreaker.get_instance().format_stats(),
+                ]
+            )
+        )
+
     @filter.command("群管帮助")
     async def qq_admin_help(self, event: AiocqhttpMessageEvent):
         """查看群管帮助"""
-        url = await self.text_to_image(ADMIN_HELP)
-        yield event.image_result(url)
+        path = await self.render(ADMIN_HELP)
+        yield event.image_result(path)
 
     async def terminate(self):
         """可选择实现异步的插件销毁方法，当插件被卸载/停用时会调用。"""
         await self.curfew.stop_all_tasks()
+        self._warm_task.cancel()
+        await self.member.stop()
+        await MuteRegistry.get_instance().stop()
+        await self.backup.stop()
+        await self.activity.close()
+        for unsubscribe in self._audit_unsubs:
+            unsubscribe()
+        await self.audit.close()
+        await ActionScheduler.get_instance().stop()
         await self.db.close()
         logger.info("插件 astrbot_plugin_QQAdmin 已优雅关闭")
@@ -0,0 +1,163 @@
+import re
+import time
+from array import array
+from collections.abc import Iterator
+from typing import NamedTuple, Optional
+
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+_SPACES = re.compile(r"\s+")
+
+
+class RingMessage(NamedTuple):
+    message_id: int
+    sender_id: int
+    timestamp: int
+    text: str
+    message_seq: int
+
+
+class MessageRing:
+    """
+    定长环形缓冲：按到达顺序保存最近 capacity 条群消息
+    message_id / message_seq / sender / 时间戳各存一列 array，文本存定长 list，内存上限固定
+    已撤回的消息在 recalled 列置 1，message_id 保留以便翻历史时跳过
+    """
+
+    __slots__ = (
+        "capacity",
+        "ids",
+        "seqs",
+        "senders",
+        "times",
+        "texts",
+        "recalled",
+        "head",
+        "size",
+    )
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ids = array("q", bytes(8 * capacity))
+        self.seqs = array("q", bytes(8 * capacity))
+        self.senders = array("q", bytes(8 * capacity))
+        self.times = array("q", bytes(8 * capacity))
+        self.texts: list[str] = [""] * capacity
+        self.recalled = bytearray(capacity)
+        self.head = 0  # 下一条写入位置
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(
+        self,
+        message_id: int,
+        sender_id: int,
+        timestamp: int,
+        text: str,
+        message_seq: int = 0,
+    ):
+        """message_seq 为翻历史用的序号，协议端未提供时与 message_id 相同"""
+        i = self.head
+        self.ids[i] = message_id
+        self.seqs[i] = message_seq or message_id
+        self.senders[i] = sender_id
+        self.times[i] = timestamp
+        self.texts[i] = text
+        self.recalled[i] = 0
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _indexes(self) -> Iterator[int]:
+        """从新到旧的槽位"""
+        for k in range(1, self.size + 1):
+            yield (self.head - k) % self.capacity
+
+    def latest(
+        self, limit: int | None = None, senders: set[int] | None = None
+    ) -> Iterator[RingMessage]:
+        """从新到旧遍历最近 limit 条（按到达计数，含他人消息）中未撤回的消息"""
+        for n, i in enumerate(self._indexes()):
+            if limit is not None and n >= limit:
+                return
+            if self.recalled[i]:
+                continue
+            if senders is None or self.senders[i] in senders:
+                yield RingMessage(
+                    self.ids[i], self.senders[i], self.times[i], self.texts[i], self.seqs[i]
+                )
+
+    def recalled_ids(self) -> Iterator[int]:
+        """缓冲中已撤回消息的 message_id"""
+        for i in self._indexes():
+            if self.recalled[i]:
+                yield self.ids[i]
+
+    def forget(self, message_id: int):
+        """标记已撤回"""
+        for i in self._indexes():
+            if self.ids[i] == message_id:
+                self.recalled[i] = 1
+                return
+
+
+class MessageRingStore:
+    """各群最近消息的环形缓冲，由群消息事件填充、撤回通知修正"""
+
+    _instance: Optional["MessageRingStore"] = None
+
+    # 每群保存的消息条数
+    CAPACITY = 500
+
+    def __init__(self):
+        self._rings: dict[str, MessageRing] = {}
+
+    @classmethod
+    def get_instance(cls) -> "MessageRingStore":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def get(self, group_id: str | int) -> MessageRing | None:
+        return self._rings.get(str(group_id))
+
+    def record(self, event: AiocqhttpMessageEvent):
+        """记录一条群消息（含 bot 自己发出的 message_sent）"""
+        raw = getattr(event.message_obj, "raw_message", None)
+        if not isinstance(raw, dict):
+            return
+        try:
+            message_id = int(raw["message_id"])
+            sender_id = int(raw.get("user_id") or raw["sender"]["user_id"])
+        except (KeyError, TypeError, ValueError):
+            return
+        gid = str(raw.get("group_id") or event.get_group_id())
+        ring = self._rings.get(gid)
+        if ring is None:
+            ring = self._rings[gid] = MessageRing(self.CAPACITY)
+        text = _SPACES.sub(" ", event.message_str or "").strip()
+        try:
+            message_seq = int(raw.get("message_seq") or 0)
+        except (TypeError, ValueError):
+            message_seq = 0
+        ring.append(
+            message_id, sender_id, int(raw.get("time") or time.time()), text, message_seq
+        )
+
+    def forget(self, group_id: str | int, message_id: int):
+        if ring := self._rings.get(str(group_id)):
+            ring.forget(int(message_id))
+
+    def on_notice(self, raw: dict):
+        """撤回通知：标记消息已撤回；bot 离群：丢弃缓冲"""
+        gid = str(raw.get("group_id") or "")
+        match raw.get("notice_type"):
+            case "group_recall":
+                if raw.get("message_id"):
+                    self.forget(gid, raw["message_id"])
+            case "group_decrease":
+                if raw.get("sub_type") == "kick_me":
+                    self._rings.pop(gid, None)
@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+from astrbot import logger
+
+from .client import BotClient, on_write
+
+# OneBot 单次禁言上限（30天，秒）；更长的禁言由 MuteRegistry 到期续禁
+MAX_BAN_TIME = 2592000
+
+
+class MuteRegistry:
+    """
+    当前禁言登记表 {(group_id, user_id): [本次禁言到期时间, 最终到期时间]}
+    - 由插件自己的 set_group_ban 调用和 group_ban 通知更新
+    - 所有到期时间放进一个最小堆，由单个定时任务处理
+    - 超过单次上限（30天）的长禁言，到期时自动续禁直到最终到期
+    """
+
+    _instance: Optional["MuteRegistry"] = None
+
+    # 续禁时没有可用连接则稍后重试（秒）
+    RETRY_DELAY = 60
+    # 落盘防抖（秒）
+    SAVE_DELAY = 1.0
+    # 本次到期时间相差在此范围内的登记视为同一次禁言（通知与调用重复登记）
+    SAME_BAN_SLACK = 60
+
+    def __init__(self):
+        self._mutes: dict[tuple[str, int], list[float]] = {}
+        # (到期时间, group_id, user_id)，惰性删除：出堆时与登记表核对
+        self._heap: list[tuple[float, str, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._save_handle: asyncio.TimerHandle | None = None
+        self.path: Path | None = None
+        # 最近一次可用的连接，续禁时使用
+        self.client: BotClient | None = None
+        self._unsubscribe = on_write(self._on_write)
+
+    @classmethod
+    def get_instance(cls) -> "MuteRegistry":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    # ---------------------------- 持久化 ----------------------------
+
+    def load(self, data_dir: Path):
+        self.path = data_dir / "mute_data.json"
+        if not self.path.exists():
+            return
+        try:
+            data: dict[str, dict[str, list[float]]] = json.loads(
+                self.path.read_text(encoding="utf-8")
+            )
+        except Exception as e:
+            logger.error(f"加载禁言登记失败: {e}", exc_info=True)
+            return
+        now = time.time()
+        for gid, users in data.items():
+            for uid, (until, final) in users.items():
+                if final > now:
+                    self._put(gid, int(uid), until, final)
+
+    def _save_now(self):
+        self._save_handle = None
+        if not self.path:
+            return
+        data: dict[str, dict[str, list[float]]] = {}
+        for (gid, uid), entry in self._mutes.items():
+            data.setdefault(gid, {})[str(uid)] = entry
+        try:
+            self.path.write_text(
+                json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
+            )
+        except Exception as e:
+            logger.error(f"保存禁言登记失败: {e}", exc_info=True)
+
+    def _save(self):
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                self.SAVE_DELAY, self._save_now
+            )
+
+    # ---------------------------- 登记 ----------------------------
+
+    def _put(self, gid: str, uid: int, until: float, final: float):
+        self._mutes[(gid, uid)] = [until, max(final, until)]
+        heapq.heappush(self._heap, (until, gid, uid))
+        self._wakeup.set()
+
+    def on_ban(
+        self,
+        group_id: str | int,
+        user_id: str | int,
+        duration: int,
+        final_until: float | None = None,
+    ):
+        """登记一次禁言；duration 为 0 视为解禁。final_until 用于超过单次上限的长禁言"""
+        gid, uid = str(group_id), int(user_id)
+        if not uid:
+            return
+        if duration <= 0:
+            self.on_lift(gid, uid)
+            return
+        until = time.time() + duration
+        old = self._mutes.get((gid, uid))
+        if final_until:
+            final = final_until
+        elif old and old[1] > until and abs(until - old[0]) <= self.SAME_BAN_SLACK:
+            # 同一次禁言（如自己调用后收到的 group_ban 通知）：保留已有的最终到期时间
+            final = old[1]
+        else:
+            # 新的一次禁言取代旧的，哪怕更短
+            final = until
+        self._put(gid, uid, until, final)
+        self._save()
+
+    async def ban(
+        self,
+        client: BotClient,
+        group_id: str | int,
+        user_id: str | int,
+        duration: int,
+    ):
+        """禁言入口：超过单次上限的先禁满上限，剩余部分登记为到期续禁"""
+        final_until = time.time() + duration
+        duration = min(duration, MAX_BAN_TIME)
+        await client.set_group_ban(
+            group_id=int(group_id), user_id=int(user_id), duration=duration
+        )
+        # 显式给出最终到期时间，覆盖写接口回调按旧登记推断的结果
+        self.on_ban(group_id, user_id, duration, final_until)
+
+    def on_lift(self, group_id: str | int, user_id: str | int):
+        if self._mutes.pop((str(group_id), int(user_id)), None):
+            self._save()
+
+    def muted(self, group_id: str | int) -> list[tuple[int, float, float]]:
+        """本群当前禁言 [(user_id, 本次到期, 最终到期)]，按最终到期排序"""
+        gid, now = str(group_id), time.time()
+        items = [
+            (uid, until, final)
+            for (g, uid), (until, final) in self._mutes.items()
+            if g == gid and final > now
+        ]
+        return sorted(items, key=lambda x: x[2])
+
+    def _on_write(self, client: BotClient, action: str, params: dict):
+        """插件自己的禁言调用"""
+        self.client = client
+        if action == "set_group_ban":
+            self.on_ban(params["group_id"], params["user_id"], int(params["duration"]))
+
+    def on_notice(self, raw: dict):
+        """group_ban 通知（管理员手动禁言/解禁）"""
+        if raw.get("notice_type") != "group_ban" or not raw.get("user_id"):
+            return
+        gid, uid = raw.get("group_id"), raw["user_id"]
+        if raw.get("sub_type") == "lift_ban":
+            self.on_lift(gid, uid)
+        else:
+            self.on_ban(gid, uid, int(raw.get("duration") or 0))
+
+    # ---------------------------- 到期 ----------------------------
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._timer_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._save_handle:
+            self._save_handle.cancel()
+            self._save_now()
+
+    async def _timer_loop(self):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                until, gid, uid = heapq.heappop(self._heap)
+                entry = self._mutes.get((gid, uid))
+                if entry and entry[0] == until:
+                    await self._expire(gid, uid, entry)
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire(self, gid: str, uid: int, entry: list[float]):
+        remaining = entry[1] - time.time()
+        if remaining < 1:
+            self.on_lift(gid, uid)
+            return
+        # 长禁言：续禁
+        if self.client is None:
+            self._put(gid, uid, time.time() + self.RETRY_DELAY, entry[1])
+            return
+        duration = int(min(remaining, MAX_BAN_TIME))
+        try:
+            await self.client.set_group_ban(
+                group_id=int(gid), user_id=uid, duration=duration
+            )
+        except Exception as e:
+            logger.warning(f"群{gid}续禁{uid}失败：{e}")
+            self._put(gid, uid, time.time() + self.RETRY_DELAY, entry[1])
+            return
+        self._put(gid, uid, time.time() + duration, entry[1])
+        self._save()
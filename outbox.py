@@ -0,0 +1,69 @@
+from astrbot.core.message.components import (
+    BaseMessageComponent,
+    Node,
+    Nodes,
+    Plain,
+)
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+
+class Outbox:
+    """
+    单条指令内的回复合并器：多目标指令（改名、头衔、踢人等）逐个目标产生的回复
+    先收集，指令结束时合并成一条消息发出；条目过多时改为合并转发
+    用法：
+        async with Outbox(event) as out:
+            for tid in tids:
+                ...
+                out.add(f"已处理{tid}")
+    """
+
+    # 超过此条数改用合并转发
+    FORWARD_THRESHOLD = 10
+    # 合并转发时每个节点容纳的条数
+    NODE_SIZE = 20
+
+    def __init__(self, event: AiocqhttpMessageEvent, name: str = "群管"):
+        self.event = event
+        self.name = name
+        self._items: list[list[BaseMessageComponent]] = []
+
+    def add(self, text: str):
+        """追加一条纯文本回复"""
+        self._items.append([Plain(text=text)])
+
+    def add_chain(self, chain: list[BaseMessageComponent]):
+        """追加一条消息链回复（如 At + 文本）"""
+        self._items.append(list(chain))
+
+    def _merged(self, items: list[list[BaseMessageComponent]]) -> list:
+        chain: list[BaseMessageComponent] = []
+        for i, item in enumerate(items):
+            if i:
+                chain.append(Plain(text="\n"))
+            chain.extend(item)
+        return chain
+
+    async def flush(self):
+        """立即发出已收集的回复"""
+        items, self._items = self._items, []
+        if not items:
+            return
+        if len(items) <= self.FORWARD_THRESHOLD:
+            await self.event.send(self.event.chain_result(self._merged(items)))
+            return
+        uin = int(self.event.get_self_id())
+        nodes = [
+            Node(uin=uin, name=self.name, content=self._merged(items[i : i + self.NODE_SIZE]))
+            for i in range(0, len(items), self.NODE_SIZE)
+        ]
+        await self.event.send(self.event.chain_result([Nodes(nodes=nodes)]))
+
+    async def __aenter__(self) -> "Outbox":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # 出错时也把已产生的结果发出去
+        await self.flush()
@@ -1,5 +1,8 @@
 
+import asyncio
 import inspect
+import time
+from collections import OrderedDict
 from collections.abc import AsyncGenerator, Awaitable, Callable
 from enum import IntEnum
 from functools import wraps
@@ -10,6 +13,9 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .audit import audit_context
+from .client import get_client
+from .roster import RosterStore
 from .utils import get_ats
 
 
@@ -53,6 +59,14 @@ class PermLevel(IntEnum):
 class PermissionManager:
     _instance: Optional["PermissionManager"] = None
 
+    # 成员权限缓存有效期（秒），查询失败的结果只缓存更短时间
+    LEVEL_TTL = 60.0
+    NEGATIVE_TTL = 10.0
+    # 缓存条目上限：超过时先清理过期项，仍超出则按最近最少使用淘汰
+    CACHE_PRUNE_SIZE = 10000
+    # 群主转让通知（非标准 OneBot，各协议端命名不一）
+    OWNER_CHANGE_NOTICES = {"group_owner_change", "owner_change"}
+
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -74,6 +88,12 @@ class PermissionManager:
             k: PermLevel.from_str(v) for k, v in perms.items()
         }
         self.level_threshold = level_threshold
+        # {(group_id, user_id): (过期时间, 权限等级)}，按最近使用排序
+        self._level_cache: OrderedDict[tuple[str, str], tuple[float, PermLevel]] = (
+            OrderedDict()
+        )
+        # 进行中的查询，相同 key 的并发查询共用一个请求
+        self._inflight: dict[tuple[str, str], asyncio.Task[PermLevel]] = {}
         self._initialized = True
 
     @classmethod
@@ -99,12 +119,46 @@ class PermissionManager:
             return PermLevel.UNKNOWN
         if str(user_id) in self.superusers:
             return PermLevel.SUPERUSER
+
+        key = (str(group_id), str(user_id))
+        cached = self._level_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._level_cache.move_to_end(key)
+            return cached[1]
+        # 名单已加载时直接取角色/等级，角色由群通知实时修补
+        if member := RosterStore.get_instance().member(group_id, user_id):
+            return self._parse_level(member)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_level(event, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._drop_inflight(key, t))
+        # shield：某个等待方被取消时不影响其他共用者
+        return await asyncio.shield(task)
+
+    def _drop_inflight(self, key: tuple[str, str], task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _fetch_level(
+        self, event: AiocqhttpMessageEvent, key: tuple[str, str]
+    ) -> PermLevel:
+        group_id, user_id = key
+        now = time.monotonic()
         try:
-            info = await event.bot.get_group_member_info(
+            info = await get_client(event).get_group_member_info(
                 group_id=int(group_id), user_id=int(user_id), no_cache=True
             )
+            perm_level, ttl = self._parse_level(info), self.LEVEL_TTL
         except Exception:
-            return PermLevel.UNKNOWN
+            perm_level, ttl = PermLevel.UNKNOWN, self.NEGATIVE_TTL
+        # 查询期间被 invalidate 过则不写缓存，避免旧结果覆盖
+        if self._inflight.get(key) is asyncio.current_task():
+            self._cache_level(key, perm_level, now + ttl)
+        return perm_level
+
+    def _parse_level(self, info: dict) -> PermLevel:
         role = info.get("role", "unknown")
         level = int(info.get("level", 0))
         match role:
@@ -121,6 +175,45 @@ class PermissionManager:
             case _:
                 return PermLevel.UNKNOWN
 
+    def _cache_level(self, key: tuple[str, str], level: PermLevel, expire: float):
+        self._level_cache[key] = (expire, level)
+        self._level_cache.move_to_end(key)
+        if len(self._level_cache) <= self.CACHE_PRUNE_SIZE:
+            return
+        now = time.monotonic()
+        for k in [k for k, v in self._level_cache.items() if v[0] <= now]:
+            del self._level_cache[k]
+        while len(self._level_cache) > self.CACHE_PRUNE_SIZE:
+            self._level_cache.popitem(last=False)
+
+    def invalidate(self, group_id: str | int, user_id: str | int | None = None):
+        """失效权限缓存，不传 user_id 则失效整个群"""
+        gid = str(group_id)
+        if user_id is not None:
+            self._level_cache.pop((gid, str(user_id)), None)
+            self._inflight.pop((gid, str(user_id)), None)
+            return
+        for key in [k for k in self._level_cache if k[0] == gid]:
+            del self._level_cache[key]
+        for key in [k for k in self._inflight if k[0] == gid]:
+            del self._inflight[key]
+
+    def on_notice(self, raw: dict):
+        """根据群通知立即失效相关缓存：管理员变动、成员减少/增加、群主转让"""
+        notice_type = raw.get("notice_type")
+        sub_type = raw.get("sub_type")
+        gid = raw.get("group_id")
+        if not gid:
+            return
+        if (
+            notice_type in self.OWNER_CHANGE_NOTICES
+            or sub_type in self.OWNER_CHANGE_NOTICES
+            or sub_type == "kick_me"
+        ):
+            self.invalidate(gid)
+        elif notice_type in ("group_admin", "group_decrease", "group_increase"):
+            self.invalidate(gid, raw.get("user_id"))
+
     async def perm_block(
         self,
         event: AiocqhttpMessageEvent,
@@ -128,23 +221,27 @@ class PermissionManager:
         perm_key: str,
         check_at: bool = True,
     ) -> str | None:
-        user_level = await self.get_perm_level(event, user_id=event.get_sender_id())
-
         # 未指定权限，则默认至少需要管理员权限
         required_level = self.perms.get(perm_key) or PermLevel.ADMIN
 
+        # 先查发送者（通常命中缓存），无权限时不再为 bot、被@者发请求
+        user_level = await self.get_perm_level(event, user_id=event.get_sender_id())
         if user_level > required_level:
             return f"你没{required_level}权限"
 
-        bot_level = await self.get_perm_level(event, user_id=event.get_self_id())
+        # bot、被@者的权限并发查询，判定顺序与逐个查询时一致
+        at_ids = get_ats(event) if check_at else []
+        bot_level, *at_levels = await asyncio.gather(
+            self.get_perm_level(event, user_id=event.get_self_id()),
+            *(self.get_perm_level(event, user_id=at_id) for at_id in at_ids),
+        )
+
         if bot_level > bot_perm:
             return f"我没{bot_perm}权限"
 
-        if check_at:
-            for at_id in get_ats(event):
-                at_level = await self.get_perm_level(event, user_id=at_id)
-                if bot_level >= at_level:
-                    return f"我动不了{at_level}"
+        for at_level in at_levels:
+            if bot_level >= at_level:
+                return f"我动不了{at_level}"
 
         return None
 
@@ -198,14 +295,15 @@ def perm_required(
                 event.stop_event()
                 return
 
-            # 执行原始方法
-            if inspect.isasyncgenfunction(func):
-                async for item in func(plugin_instance, event, *args, **kwargs):
-                    yield item
-            else:
-                await cast(
-                    Awaitable[Any], func(plugin_instance, event, *args, **kwargs)
-                )
+            # 执行原始方法（其间的写接口调用记为发送者所为）
+            with audit_context(event.get_group_id(), event.get_sender_id()):
+                if inspect.isasyncgenfunction(func):
+                    async for item in func(plugin_instance, event, *args, **kwargs):
+                        yield item
+                else:
+                    await cast(
+                        Awaitable[Any], func(plugin_instance, event, *args, **kwargs)
+                    )
 
         return wrapper
 
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from urllib.parse import urlparse
+
+from astrbot import logger
+
+from .utils import download_file
+
+
+class RenderCache:
+    """
+    文本转图片的渲染缓存，按 (模板, 文本) 的哈希寻址
+    - 渲染结果落盘，重启后仍可复用
+    - 超过容量上限时按最近使用时间淘汰（命中时刷新文件 mtime）
+    - 同一内容的并发渲染只进行一次
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.dir = cache_dir
+        self.max_bytes = max_bytes
+        # key -> (文件路径, 字节数)，按最近使用排序
+        self._entries: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self._size = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        self._scan()
+
+    def _scan(self):
+        """载入磁盘上已有的渲染结果"""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        files = [p for p in self.dir.iterdir() if p.is_file()]
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = path.stat().st_size
+            self._entries[path.stem] = (path, size)
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def key(text: str, template: str = "") -> str:
+        return hashlib.sha256(f"{template}\0{text}".encode()).hexdigest()
+
+    async def render(
+        self,
+        text: str,
+        renderer: Callable[[str], Awaitable[str]],
+        template: str = "",
+    ) -> str:
+        """返回渲染图片的本地路径；renderer 返回本地路径或 URL"""
+        key = self.key(text, template)
+        if entry := self._entries.get(key):
+            path = entry[0]
+            if path.exists():
+                self.stats["hits"] += 1
+                self._entries.move_to_end(key)
+                os.utime(path)
+                return str(path)
+            self._drop(key)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render(key, text, renderer))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _render(
+        self, key: str, text: str, renderer: Callable[[str], Awaitable[str]]
+    ) -> str:
+        self.stats["misses"] += 1
+        src = await renderer(text)
+        suffix = Path(urlparse(src).path).suffix or ".jpg"
+        dst = self.dir / f"{key}{suffix}"
+        if src.startswith("http"):
+            if not await download_file(src, str(dst)):
+                return src
+        else:
+            await asyncio.to_thread(shutil.copyfile, src, dst)
+        size = dst.stat().st_size
+        self._entries[key] = (dst, size)
+        self._size += size
+        self._evict()
+        return str(dst)
+
+    def _drop(self, key: str):
+        path, size = self._entries.pop(key)
+        self._size -= size
+        path.unlink(missing_ok=True)
+
+    def _evict(self):
+        # 至少保留最新的一张，避免刚渲染的图被立即删掉
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
+
+    async def warm(self, text: str, renderer: Callable[[str], Awaitable[str]], template: str = ""):
+        """预渲染（如帮助图），失败只记日志"""
+        try:
+            await self.render(text, renderer, template)
+        except Exception as e:
+            logger.warning(f"预渲染失败：{e}")
+
+    def format_stats(self) -> str:
+        return (
+            f"渲染缓存：{len(self._entries)}张，{self._size / 1048576:.1f}MB，"
+            f"命中{self.stats['hits']}，渲染{self.stats['misses']}"
+        )
@@ -0,0 +1,398 @@
+import asyncio
+import time
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable
+from itertools import compress, repeat
+from operator import and_, lt
+from typing import Optional
+
+from astrbot import logger
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from .client import BotClient, get_client
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class RosterColumns:
+    """
+    群成员列视图：user_id、level、join_time、last_sent_time 各存一列 array
+    筛选、排序都在列上进行（map/compress 在 C 层遍历），只在最终输出时回查成员资料
+    """
+
+    __slots__ = (
+        "members",
+        "user_id",
+        "level",
+        "join_time",
+        "last_sent_time",
+        "extra",
+        "_rows",
+        "_orders",
+    )
+
+    def __init__(self, members: list[dict]):
+        self.members = members
+        self.user_id = array("q", (_to_int(m.get("user_id")) for m in members))
+        self.level = array("l", (_to_int(m.get("level")) for m in members))
+        self.join_time = array("q", (_to_int(m.get("join_time")) for m in members))
+        self.last_sent_time = array(
+            "q", (_to_int(m.get("last_sent_time")) for m in members)
+        )
+        self.extra: dict[str, array] = {}
+        self._rows = {uid: i for i, uid in enumerate(self.user_id)}
+        # 全表排序结果 {列名: 行号}，join_time 等不可变列排一次即可复用
+        self._orders: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+    def touch(self, user_id: int, sent_time: int):
+        """原地更新某成员的最后发言时间"""
+        if (i := self._rows.get(user_id)) is not None:
+            self.last_sent_time[i] = sent_time
+            self._orders.pop("last_sent_time", None)
+
+    def column(self, name: str) -> array:
+        if name in self.extra:
+            return self.extra[name]
+        return getattr(self, name)
+
+    def attach(self, name: str, values: array):
+        """挂一列外部数据（须与 user_id 等长、同序），如本地活跃统计"""
+        self.extra[name] = values
+        self._orders.pop(name, None)
+
+    def where_below(self, **thresholds: int | None) -> list[int]:
+        """筛选各列均小于对应阈值的行（阈值为 None 的条件忽略），返回行号"""
+        masks = [
+            map(lt, self.column(name), repeat(value))
+            for name, value in thresholds.items()
+            if value is not None
+        ]
+        rows = range(len(self))
+        if not masks:
+            return list(rows)
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = map(and_, mask, other)
+        return list(compress(rows, mask))
+
+    def order_by(
+        self, rows: Iterable[int], column: str, reverse: bool = False
+    ) -> list[int]:
+        """按某列对行号排序"""
+        return sorted(rows, key=self.column(column).__getitem__, reverse=reverse)
+
+    def sorted_rows(self, column: str) -> list[int]:
+        """全表按某列排序的行号（缓存）"""
+        if column not in self._orders:
+            self._orders[column] = self.order_by(range(len(self)), column)
+        return self._orders[column]
+
+    def row(self, i: int) -> dict:
+        return self.members[i]
+
+    def view(self) -> "RosterColumns":
+        """共享各列的浅拷贝：在副本上 attach/排序，不影响名单缓存里的列视图"""
+        new = RosterColumns.__new__(RosterColumns)
+        for name in self.__slots__:
+            setattr(new, name, getattr(self, name))
+        new.extra = dict(self.extra)
+        new._orders = dict(self._orders)
+        return new
+
+
+class RosterStore:
+    """
+    群成员名单 {group_id: {user_id: 成员资料}}
+    - 首次使用时全量拉取一次，之后由群通知、群消息 sender 增量修补
+    - 超过 FULL_SYNC_INTERVAL 或检测到人数漂移时才重新全量同步
+    - 成员资料为 get_group_member_list 返回的原始 dict，调用方只读不改
+    - 该 dict 可能与 ReadCoalescer 的合并结果共享，修补时替换为新 dict，不原地修改
+    """
+
+    _instance: Optional["RosterStore"] = None
+
+    # 全量重同步间隔（秒）
+    FULL_SYNC_INTERVAL = 6 * 3600
+    # 与 get_group_info 的人数比对间隔（秒）
+    DRIFT_CHECK_INTERVAL = 600
+    # 这些通知意味着群主变动，整群重新同步
+    OWNER_CHANGE_NOTICES = ("group_owner_change", "owner_change", "group_transfer")
+
+    def __init__(self):
+        self._rosters: dict[str, dict[int, dict]] = {}
+        self._synced_at: dict[str, float] = {}
+        self._checked_at: dict[str, float] = {}
+        # 进群通知只带 user_id，资料待下次读取时补齐
+        self._pending: dict[str, set[int]] = defaultdict(set)
+        self._stale: set[str] = set()
+        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._versions: dict[str, int] = defaultdict(int)
+        # 跨群索引 {user_id: {group_id, ...}}，随名单同步维护
+        self._user_groups: dict[int, set[str]] = defaultdict(set)
+        # {group_id: (名单版本, 列视图)}
+        self._columns: dict[str, tuple[int, RosterColumns]] = {}
+
+    @classmethod
+    def get_instance(cls) -> "RosterStore":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    # ---------------------------- 读取 ----------------------------
+
+    def version(self, group_id: str | int) -> int:
+        """名单每次变动自增，供派生视图判断是否需要重建"""
+        return self._versions[str(group_id)]
+
+    def member(self, group_id: str | int, user_id: str | int) -> dict | None:
+        """只查已加载的名单，不触发请求；未补齐资料或待全量同步时返回 None"""
+        gid = str(group_id)
+        roster = self._rosters.get(gid)
+        # 群主转让等通知后角色整体失效，调用方应回退到接口查询
+        if (
+            roster is None
+            or gid in self._stale
+            or int(user_id) in self._pending.get(gid, ())
+        ):
+            return None
+        return roster.get(int(user_id))
+
+    async def members(
+        self, event: AiocqhttpMessageEvent, group_id: str | int | None = None
+    ) -> list[dict]:
+        """获取群成员列表，必要时全量同步或补齐增量"""
+        gid = str(group_id or event.get_group_id())
+        client = get_client(event)
+        async with self._locks[gid]:
+            now = time.monotonic()
+            if (
+                gid not in self._rosters
+                or gid in self._stale
+                or now - self._synced_at[gid] > self.FULL_SYNC_INTERVAL
+            ):
+                await self._full_sync(client, gid)
+            else:
+                if self._pending.get(gid):
+                    await self._fill_pending(client, gid)
+                if now - self._checked_at[gid] > self.DRIFT_CHECK_INTERVAL:
+                    await self._check_drift(client, gid)
+            return list(self._rosters[gid].values())
+
+    async def columns(
+        self, event: AiocqhttpMessageEvent, group_id: str | int | None = None
+    ) -> "RosterColumns":
+        """获取群成员列视图，名单版本不变时复用"""
+        gid = str(group_id or event.get_group_id())
+        members = await self.members(event, gid)
+        version = self._versions[gid]
+        cached = self._columns.get(gid)
+        if cached is None or cached[0] != version:
+            cached = self._columns[gid] = (version, RosterColumns(members))
+        return cached[1]
+
+    # ---------------------------- 跨群 ----------------------------
+
+    def groups_of(self, user_id: str | int) -> list[tuple[str, dict]]:
+        """某用户所在的已加载群及其成员资料 [(group_id, member)]"""
+        uid = int(user_id)
+        return [
+            (gid, self._rosters[gid][uid])
+            for gid in sorted(self._user_groups.get(uid, ()))
+            if uid in self._rosters.get(gid, {})
+        ]
+
+    async def load_all(self, event: AiocqhttpMessageEvent, concurrency: int = 4) -> int:
+        """加载 bot 所在全部群的名单（已加载的跳过），返回群数"""
+        groups = await get_client(event).get_group_list()
+        gids = [str(g["group_id"]) for g in groups or []]
+        for gid in self._rosters.keys() - set(gids):
+            self._drop_group(gid)
+        sem = asyncio.Semaphore(concurrency)
+
+        async def load(gid: str):
+            async with sem:
+                try:
+                    await self.members(event, gid)
+                except Exception as e:
+                    logger.warning(f"加载群{gid}成员名单失败：{e}")
+
+        await asyncio.gather(*(load(gid) for gid in gids if gid not in self._rosters))
+        return len(gids)
+
+    # ---------------------------- 同步 ----------------------------
+
+    async def _full_sync(self, client: BotClient, gid: str):
+        data = await client.get_group_member_list(group_id=int(gid))
+        roster = {int(m["user_id"]): m for m in data or []}
+        old = self._rosters.get(gid, {})
+        for uid in old.keys() - roster.keys():
+            self._unindex(gid, uid)
+        for uid in roster.keys() - old.keys():
+            self._user_groups[uid].add(gid)
+        self._rosters[gid] = roster
+        self._pending.pop(gid, None)
+        self._stale.discard(gid)
+        self._synced_at[gid] = self._checked_at[gid] = time.monotonic()
+        self._versions[gid] += 1
+        logger.debug(f"群{gid}成员名单全量同步：{len(self._rosters[gid])}人")
+
+    async def _fill_pending(self, client: BotClient, gid: str):
+        """逐个补齐新成员资料，失败的留待下次"""
+        uids = list(self._pending[gid])
+        results = await asyncio.gather(
+            *(
+                client.get_group_member_info(
+                    group_id=int(gid), user_id=uid, no_cache=True
+                )
+                for uid in uids
+            ),
+            return_exceptions=True,
+        )
+        roster = self._rosters[gid]
+        for uid, info in zip(uids, results):
+            if isinstance(info, dict) and info:
+                roster[uid] = info
+                self._pending[gid].discard(uid)
+        self._versions[gid] += 1
+
+    async def _check_drift(self, client: BotClient, gid: str):
+        """人数与群资料不一致说明漏了通知，重新全量同步"""
+        self._checked_at[gid] = time.monotonic()
+        try:
+            info = await client.get_group_info(group_id=int(gid), no_cache=True)
+        except Exception:
+            return
+        count = (info or {}).get("member_count")
+        if isinstance(count, int) and count != len(self._rosters[gid]):
+            logger.info(
+                f"群{gid}成员名单漂移（本地{len(self._rosters[gid])}人，实际{count}人），重新同步"
+            )
+            await self._full_sync(client, gid)
+
+    def _unindex(self, gid: str, uid: int):
+        if groups := self._user_groups.get(uid):
+            groups.discard(gid)
+            if not groups:
+                del self._user_groups[uid]
+
+    def _drop_group(self, gid: str):
+        """bot 已不在该群，丢弃名单及其索引"""
+        for uid in self._rosters.pop(gid, {}):
+            self._unindex(gid, uid)
+        self._pending.pop(gid, None)
+        self._columns.pop(gid, None)
+
+    def mark_stale(self, group_id: str | int):
+        """标记下次读取时全量同步"""
+        self._stale.add(str(group_id))
+
+    def discard(self, group_id: str | int, user_id: str | int):
+        """主动移出成员（如踢人成功后），不等退群通知"""
+        gid = str(group_id)
+        if (roster := self._rosters.get(gid)) and roster.pop(int(user_id), None):
+            self._unindex(gid, int(user_id))
+            self._pending[gid].discard(int(user_id))
+            self._versions[gid] += 1
+
+    # ---------------------------- 增量 ----------------------------
+
+    @staticmethod
+    def _stub(gid: str, uid: int, join_time: int) -> dict:
+        """资料补齐前的占位成员，字段与成员列表一致"""
+        return {
+            "group_id": int(gid),
+            "user_id": uid,
+            "nickname": "",
+            "card": "",
+            "role": "member",
+            "level": "0",
+            "join_time": join_time,
+            "last_sent_time": join_time,
+        }
+
+    def on_notice(self, raw: dict):
+        """根据群通知修补名单：进群、退群、管理员变动、群名片变动"""
+        gid = str(raw.get("group_id") or "")
+        roster = self._rosters.get(gid)
+        if roster is None:
+            return
+        notice_type = raw.get("notice_type")
+        sub_type = raw.get("sub_type")
+        if (
+            notice_type in self.OWNER_CHANGE_NOTICES
+            or sub_type in self.OWNER_CHANGE_NOTICES
+        ):
+            self.mark_stale(gid)
+            return
+        uid = int(raw.get("user_id") or 0)
+        if not uid:
+            return
+
+        match notice_type:
+            case "group_increase":
+                now = int(raw.get("time") or time.time())
+                roster[uid] = self._stub(gid, uid, now)
+                self._user_groups[uid].add(gid)
+                self._pending[gid].add(uid)
+            case "group_decrease":
+                if sub_type == "kick_me" or uid == int(raw.get("self_id") or 0):
+                    # bot 自己离开了，整群丢弃
+                    self._drop_group(gid)
+                else:
+                    roster.pop(uid, None)
+                    self._unindex(gid, uid)
+                    self._pending[gid].discard(uid)
+            case "group_admin":
+                if member := roster.get(uid):
+                    role = "admin" if sub_type == "set" else "member"
+                    roster[uid] = {**member, "role": role}
+            case "group_card":
+                if member := roster.get(uid):
+                    roster[uid] = {**member, "card": raw.get("card_new") or ""}
+            case _:
+                return
+        self._versions[gid] += 1
+
+    def update_from_event(self, event: AiocqhttpMessageEvent):
+        """从群消息的 sender 字段修补名片、角色和最后发言时间"""
+        raw = getattr(event.message_obj, "raw_message", None)
+        if not isinstance(raw, dict):
+            return
+        sender = raw.get("sender")
+        gid = str(raw.get("group_id") or "")
+        roster = self._rosters.get(gid)
+        if roster is None or not isinstance(sender, dict):
+            return
+        uid = int(sender.get("user_id") or raw.get("user_id") or 0)
+        if not uid:
+            return
+        old = roster.get(uid)
+        changed = old is None
+        if old is None:
+            # 名单里没有却在发言，说明漏了进群通知
+            self._pending[gid].add(uid)
+            old = self._stub(gid, uid, 0)
+            self._user_groups[uid].add(gid)
+        member = dict(old)
+        for key in ("nickname", "card", "role"):
+            if key in sender and member.get(key) != sender[key]:
+                member[key] = sender[key]
+                changed = True
+        sent = member["last_sent_time"] = int(raw.get("time") or time.time())
+        roster[uid] = member
+        if changed:
+            self._versions[gid] += 1
+        elif cached := self._columns.get(gid):
+            # 只是发言时间变化，原地修补列视图，不必重建
+            cached[1].touch(uid, sent)
@@ -0,0 +1,261 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Optional
+
+from aiocqhttp import CQHttp
+
+from astrbot import logger
+
+
+class Priority(IntEnum):
+    """出站动作优先级，数字越小越先发"""
+
+    URGENT = 0  # 撤回、禁言、踢人等止损动作
+    NORMAL = 1  # 其他管理写操作
+    LOW = 2  # 查询、公告、改名片等可延后的动作
+
+    def __str__(self):
+        return {0: "紧急", 1: "普通", 2: "低"}[self.value]
+
+
+# 未列出的写接口按 NORMAL，读接口（get_ 开头）按 LOW
+# send_group_msg 仅指经 BotClient 主动发送的消息，event.send 的回复不经过调度器
+ACTION_PRIORITY: dict[str, Priority] = {
+    "delete_msg": Priority.URGENT,
+    "set_group_ban": Priority.URGENT,
+    "set_group_whole_ban": Priority.URGENT,
+    "set_group_kick": Priority.URGENT,
+    "set_group_add_request": Priority.NORMAL,
+    "_send_group_notice": Priority.LOW,
+    "send_group_msg": Priority.LOW,
+    "send_private_msg": Priority.LOW,
+    "set_group_card": Priority.LOW,
+    "set_group_special_title": Priority.LOW,
+}
+
+
+def priority_of(action: str) -> Priority:
+    if action in ACTION_PRIORITY:
+        return ACTION_PRIORITY[action]
+    if action.startswith(("get_", "_get_")):
+        return Priority.LOW
+    return Priority.NORMAL
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个，最多攒 burst 个"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """还需等待多久才有一个令牌（0 表示现在就有）"""
+        self._refill(now)
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+@dataclass
+class _Job:
+    bot: CQHttp
+    action: str
+    params: dict
+    group_id: str
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class ActionScheduler:
+    """
+    OneBot 出站动作调度器
+    - 全局 + 按群令牌桶限速，避免突发请求触发风控
+    - 按优先级分道，撤回/禁言/踢人先于公告、查询
+    - 每道队列有上限，满了调用方等待（背压）
+    - 只管经 BotClient 发出的动作；命令回复、进度与汇总等 event.send 走 AstrBot
+      自己的发送流程，不排队也不限速（插件主动发的群消息如宵禁提醒走 send_group_msg）
+    """
+
+    _instance: Optional["ActionScheduler"] = None
+
+    # 空闲群的令牌桶超过此数量时清理
+    BUCKET_PRUNE_SIZE = 2000
+
+    def __init__(self):
+        self.configure({})
+        self._lanes: list[deque[_Job]] = [deque() for _ in Priority]
+        self._slots: list[asyncio.Semaphore] = []
+        self._group_buckets: dict[str, TokenBucket] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        # 统计：每道已发数、累计/最大排队等待时长
+        self.sent = [0 for _ in Priority]
+        self.wait_total = [0.0 for _ in Priority]
+        self.wait_max = [0.0 for _ in Priority]
+
+    @classmethod
+    def get_instance(cls) -> "ActionScheduler":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def configure(self, conf: dict):
+        self.global_rate = conf.get("global_rate", 20.0)
+        self.global_burst = conf.get("global_burst", 20.0)
+        self.group_rate = conf.get("group_rate", 5.0)
+        self.group_burst = conf.get("group_burst", 5.0)
+        self.queue_size = conf.get("queue_size", 500)
+        self._global_bucket = TokenBucket(self.global_rate, self.global_burst)
+        self._slots = []
+
+    # ----------------------------------------------------------------
+
+    async def submit(
+        self,
+        bot: CQHttp,
+        action: str,
+        params: dict,
+        group_id: str | int | None = None,
+    ) -> Any:
+        """
+        排队执行一个动作，返回接口结果
+        group_id 为按群限速用的群号，不发给协议端；缺省取 params 中的 group_id
+        （delete_msg 等接口参数里没有群号，由调用方补上）
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch_loop())
+        if not self._slots:
+            self._slots = [asyncio.Semaphore(self.queue_size) for _ in Priority]
+        prio = priority_of(action)
+        slot = self._slots[prio]
+        await slot.acquire()
+        job = _Job(
+            bot=bot,
+            action=action,
+            params=params,
+            group_id=str(group_id or params.get("group_id", "")),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._lanes[prio].append(job)
+        self._wakeup.set()
+        try:
+            return await job.future
+        finally:
+            slot.release()
+
+    def _group_bucket(self, group_id: str) -> TokenBucket:
+        bucket = self._group_buckets.get(group_id)
+        if bucket is None:
+            if len(self._group_buckets) > self.BUCKET_PRUNE_SIZE:
+                now = time.monotonic()
+                self._group_buckets = {
+                    k: b
+                    for k, b in self._group_buckets.items()
+                    if b.wait_time(now) > 0 or b.tokens < b.burst
+                }
+            bucket = self._group_buckets[group_id] = TokenBucket(
+                self.group_rate, self.group_burst
+            )
+        return bucket
+
+    def _pick(self, now: float) -> tuple[_Job | None, float]:
+        """按优先级取第一个群令牌可用的任务；都不可用时返回最短等待时间"""
+        soonest = float("inf")
+        for prio, lane in enumerate(self._lanes):
+            for i, job in enumerate(lane):
+                if job.future.done():
+                    # 调用方已取消
+                    del lane[i]
+                    return None, 0.0
+                if not job.group_id:
+                    del lane[i]
+                    return job, 0.0
+                wait = self._group_bucket(job.group_id).wait_time(now)
+                if wait == 0:
+                    del lane[i]
+                    return job, 0.0
+                soonest = min(soonest, wait)
+        return None, soonest
+
+    async def _dispatch_loop(self):
+        while True:
+            if not any(self._lanes):
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            if wait := self._global_bucket.wait_time(now):
+                await asyncio.sleep(wait)
+                continue
+            job, wait = self._pick(now)
+            if job is None:
+                if wait:
+                    # 等令牌，或有新任务入队（可能属于别的群）
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                continue
+            self._global_bucket.take()
+            if job.group_id:
+                self._group_bucket(job.group_id).take()
+            prio = priority_of(job.action)
+            waited = now - job.enqueued
+            self.sent[prio] += 1
+            self.wait_total[prio] += waited
+            self.wait_max[prio] = max(self.wait_max[prio], waited)
+            task = asyncio.create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _run(job: _Job):
+        try:
+            result = await job.bot.call_action(job.action, **job.params)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for lane in self._lanes:
+            while lane:
+                job = lane.popleft()
+                if not job.future.done():
+                    job.future.cancel()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        logger.debug("出站动作调度器已停止")
+
+    def format_stats(self) -> str:
+        lines = ["出站调度："]
+        for prio in Priority:
+            sent = self.sent[prio]
+            avg = self.wait_total[prio] / sent * 1000 if sent else 0.0
+            lines.append(
+                f"{prio}优先级：排队{len(self._lanes[prio])}，已发{sent}，"
+                f"平均等待{avg:.0f}ms，最长等待{self.wait_max[prio] * 1000:.0f}ms"
+            )
+        return "\n".join(lines)
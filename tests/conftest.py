@@ -0,0 +1,96 @@
+import logging
+import sys
+import types
+from pathlib import Path
+
+# 插件目录本身是一个包（由 AstrBot 按目录名加载），测试时以固定名 qqadmin 注册，
+# 使模块内的相对导入（from .client import ...）照常工作
+ROOT = Path(__file__).resolve().parents[1]
+if "qqadmin" not in sys.modules:
+    package = types.ModuleType("qqadmin")
+    package.__path__ = [str(ROOT)]
+    sys.modules["qqadmin"] = package
+
+
+class _Component:
+    """消息组件占位：只保存构造参数"""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _Placeholder:
+    """仅用于类型注解或 isinstance 判断的类占位"""
+
+
+def _session_waiter(timeout: int = 30, record_history_chains: bool = False):
+    def decorator(func):
+        return func
+
+    return decorator
+
+
+def _stub_astrbot() -> None:
+    """未安装 AstrBot 时注册插件用到的少量接口，使纯逻辑模块可以导入"""
+    try:
+        import astrbot  # noqa: F401
+
+        return
+    except ImportError:
+        pass
+
+    logger = logging.getLogger("astrbot")
+    components = {
+        name: type(name, (_Component,), {})
+        for name in ("At", "File", "Image", "Node", "Nodes", "Plain", "Reply", "Video")
+    }
+    components["BaseMessageComponent"] = _Component
+    placeholders = {
+        name: type(name, (_Placeholder,), {})
+        for name in (
+            "AiocqhttpAdapter",
+            "AiocqhttpMessageEvent",
+            "AstrBotConfig",
+            "Context",
+            "SessionController",
+        )
+    }
+    modules = {
+        "astrbot": {"logger": logger},
+        "astrbot.api": {"logger": logger},
+        "astrbot.api.star": {"Context": placeholders["Context"]},
+        "astrbot.core": {"AstrBotConfig": placeholders["AstrBotConfig"]},
+        "astrbot.core.config": {},
+        "astrbot.core.config.astrbot_config": {
+            "AstrBotConfig": placeholders["AstrBotConfig"]
+        },
+        "astrbot.core.message": {},
+        "astrbot.core.message.components": components,
+        "astrbot.core.platform": {},
+        "astrbot.core.platform.sources": {},
+        "astrbot.core.platform.sources.aiocqhttp": {},
+        "astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event": {
+            "AiocqhttpMessageEvent": placeholders["AiocqhttpMessageEvent"]
+        },
+        "astrbot.core.platform.sources.aiocqhttp.aiocqhttp_platform_adapter": {
+            "AiocqhttpAdapter": placeholders["AiocqhttpAdapter"]
+        },
+        "astrbot.core.star": {},
+        "astrbot.core.star.context": {"Context": placeholders["Context"]},
+        "astrbot.core.utils": {},
+        "astrbot.core.utils.session_waiter": {
+            "SessionController": placeholders["SessionController"],
+            "session_waiter": _session_waiter,
+        },
+    }
+    for name, attrs in modules.items():
+        module = types.ModuleType(name)
+        module.__path__ = []
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, module)
+
+
+_stub_astrbot()
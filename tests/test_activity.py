@@ -0,0 +1,24 @@
+import asyncio
+
+from qqadmin.activity import ActivityTracker
+
+
+def test_user_stats_only_returns_requested_users(tmp_path):
+    async def main():
+        tracker = ActivityTracker(tmp_path / "data.db")
+        await tracker.init()
+        try:
+            for uid in range(1, 6):
+                for _ in range(uid):
+                    tracker.record("100", uid)
+            tracker.record("200", 2)
+            return (
+                await tracker.user_stats("100", [2, 4, 9], 30),
+                await tracker.group_stats("100", 30),
+            )
+        finally:
+            await tracker.close()
+
+    page, whole = asyncio.run(main())
+    assert {uid: s[1:] for uid, s in page.items()} == {2: (2, 2), 4: (4, 4)}
+    assert {uid: whole[uid] for uid in page} == page
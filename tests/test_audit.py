@@ -0,0 +1,171 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from qqadmin.audit import AuditLog, audit_context
+from qqadmin.core import audit_handle, banpro_handel, member_handle
+from qqadmin.executor import BatchExecutor
+
+
+class FakeClient:
+    """写接口成功后像 BotClient 一样通知审计"""
+
+    def __init__(self, audit: AuditLog):
+        self.audit = audit
+
+    async def call_action(self, action: str, **params):
+        self.audit.on_write(self, action, params)
+
+    async def set_group_kick(self, **params):
+        await self.call_action("set_group_kick", **params)
+
+    async def set_group_ban(self, **params):
+        await self.call_action("set_group_ban", **params)
+
+    async def delete_msg(self, **params):
+        await self.call_action("delete_msg", **params)
+
+
+class FakeEvent:
+    def __init__(self, text: str = ""):
+        self.message_str = text
+        self.message_obj = SimpleNamespace(message_id=555)
+        self.sent: list[str] = []
+
+    def get_group_id(self) -> str:
+        return "100"
+
+    def get_sender_id(self) -> str:
+        return "42"
+
+    def get_self_id(self) -> str:
+        return "1"
+
+    def get_messages(self) -> list:
+        return []
+
+    def plain_result(self, text: str) -> str:
+        return text
+
+    def chain_result(self, chain: list) -> str:
+        return "".join(seg.text for seg in chain)
+
+    async def send(self, text: str):
+        self.sent.append(text)
+
+
+@pytest.fixture
+def audit(tmp_path):
+    return AuditLog(tmp_path / "audit.db")
+
+
+def test_context_attributes_actor(audit):
+    client = FakeClient(audit)
+
+    async def main():
+        with audit_context("100", 42):
+            await client.set_group_ban(group_id=100, user_id=7, duration=60)
+            # 在范围内创建的任务继承上下文
+            await asyncio.create_task(client.delete_msg(message_id=1))
+
+    asyncio.run(main())
+    assert [(e.group_id, e.actor_id, e.target_id, e.action) for e in audit._pending] == [
+        ("100", 42, 7, "set_group_ban"),
+        ("100", 42, 0, "delete_msg"),
+    ]
+
+
+def test_delete_without_context_is_skipped(audit):
+    asyncio.run(FakeClient(audit).delete_msg(message_id=1))
+    assert audit._pending == []
+
+
+def test_config_change_needs_context(audit):
+    audit.on_config_change("100", frozenset({"word_ban_time"}))
+    assert audit._pending == []
+    with audit_context("100", 42):
+        audit.on_config_change("100", frozenset({"word_ban_time"}))
+    assert audit._pending[0].actor_id == 42
+
+
+def test_background_batch_keeps_confirmer(audit):
+    client = FakeClient(audit)
+    handle = member_handle.MemberHandle.__new__(member_handle.MemberHandle)
+    handle.executor = BatchExecutor(rate=0)
+    event = FakeEvent()
+
+    async def kick(user_id: int):
+        await client.set_group_kick(group_id=100, user_id=user_id)
+
+    async def main():
+        # 模拟在会话回调中 _spawn：任务创建时没有审计上下文
+        await asyncio.create_task(handle._run_batch(event, "清理群友", [7, 8], {}, kick))
+
+    asyncio.run(main())
+    assert sorted((e.actor_id, e.target_id) for e in audit._pending) == [(42, 7), (42, 8)]
+
+
+def test_ban_word_delete_is_recorded_as_bot(audit, monkeypatch):
+    client = FakeClient(audit)
+    monkeypatch.setattr(banpro_handel, "get_client", lambda event: client)
+    handle = banpro_handel.BanproHandle.__new__(banpro_handel.BanproHandle)
+    hit = asyncio.run(handle.check_ban_words(FakeEvent("含有 BAD 词"), ("bad",), 60))
+    assert hit
+    assert [(e.group_id, e.actor_id, e.target_id, e.action) for e in audit._pending] == [
+        ("100", 0, 42, "delete_msg"),
+        ("100", 0, 42, "set_group_ban"),
+    ]
+
+
+def test_flush_and_query(audit):
+    async def main():
+        await audit.init()
+        try:
+            audit.record("100", "set_group_ban", 42, 7)
+            audit.record("100", "set_group_kick", 42, 8)
+            audit.record("200", "set_group_kick", 43, 7)
+            return (
+                await audit.recent("100"),
+                await audit.recent(target_id=7),
+                await audit.recent(actor_id=43),
+            )
+        finally:
+            await audit.close()
+
+    by_group, by_target, by_actor = asyncio.run(main())
+    assert [e.target_id for e in by_group] == [8, 7]
+    assert {e.group_id for e in by_target} == {"100", "200"}
+    assert [e.group_id for e in by_actor] == ["200"]
+
+
+def test_query_by_actor_and_across_groups(audit):
+    handle = audit_handle.AuditHandle(SimpleNamespace(audit=audit))
+
+    async def main():
+        await audit.init()
+        try:
+            audit.record("100", "set_group_ban", 12345, 7)
+            audit.record("200", "set_group_kick", 12345, 8)
+            audit.record("200", "set_group_ban", 43, 12345)
+            by_actor, across, across_actor = (
+                FakeEvent("审计记录 操作者 12345"),
+                FakeEvent("跨群审计 12345"),
+                FakeEvent("跨群审计 操作者 12345 5"),
+            )
+            await handle.query(by_actor)
+            await handle.query_user(across)
+            await handle.query_user(across_actor)
+            return by_actor.sent, across.sent, across_actor.sent
+        finally:
+            await audit.close()
+
+    by_actor, across, across_actor = asyncio.run(main())
+    # 本群内按操作者查：只有群 100 里 12345 执行的那条
+    assert len(by_actor[0].splitlines()) == 1 and " 7" in by_actor[0]
+    # 跨群按目标查：群 200 里针对 12345 的那条
+    assert "[群200]" in across[0] and len(across[0].splitlines()) == 1
+    # 跨群按操作者查：两个群各一条，新的在前
+    lines = across_actor[0].splitlines()
+    assert len(lines) == 2
+    assert "[群200]" in lines[0] and "[群100]" in lines[1]
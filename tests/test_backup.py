@@ -0,0 +1,25 @@
+import asyncio
+import sqlite3
+
+from qqadmin.core.backup_handle import BackupHandle
+
+
+def test_backups_in_same_second_get_distinct_dirs(tmp_path):
+    db_path = tmp_path / "qqadmin.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    conn.close()
+    conf = {"backup": {"interval_hours": 0, "keep": 5, "vacuum": True}}
+    handle = BackupHandle(conf, tmp_path, db_path)
+
+    async def main():
+        return [(await handle.backup())[0] for _ in range(3)]
+
+    targets = asyncio.run(main())
+    assert len(set(targets)) == 3
+    for target in targets:
+        conn = sqlite3.connect(target / db_path.name)
+        assert conn.execute("SELECT x FROM t").fetchall() == [(1,)]
+        conn.close()
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from qqadmin.breaker import CircuitBreaker, CircuitOpenError
+
+
+class Failed(Exception):
+    """模拟协议端返回的失败（与 ActionFailed 一样带 result）"""
+
+    def __init__(self, wording: str):
+        super().__init__(wording)
+        self.result = {"status": "failed", "retcode": 100, "wording": wording}
+
+
+ROLES = {("1", 10): "admin", ("1", 20): "owner", ("1", 30): "member", ("1", 99): "admin"}
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(CircuitBreaker, "_instance", None)
+    breaker = CircuitBreaker.get_instance()
+    breaker.configure(
+        lambda gid, uid: {"role": ROLES[(gid, uid)]} if (gid, uid) in ROLES else None
+    )
+    return breaker
+
+
+def fail(breaker, error, user_id=30, times=CircuitBreaker.FAILURE_THRESHOLD):
+    params = {"group_id": 1, "user_id": user_id, "duration": 60}
+    for _ in range(times):
+        breaker.before(99, "set_group_ban", params)
+        breaker.on_failure("set_group_ban", params, error)
+    return params
+
+
+def test_permission_failures_open(breaker):
+    params = fail(breaker, Failed("bot不是管理员，权限不足"))
+    with pytest.raises(CircuitOpenError):
+        breaker.before(99, "set_group_ban", params)
+
+
+def test_admin_target_does_not_count(breaker):
+    # 即使报错措辞像权限问题，目标本身是管理员/群主时也不计入
+    fail(breaker, Failed("权限不足"), user_id=10, times=5)
+    fail(breaker, Failed("权限不足"), user_id=20, times=5)
+    breaker.before(99, "set_group_ban", {"group_id": 1, "user_id": 30})
+
+
+def test_left_member_does_not_count(breaker):
+    fail(breaker, Failed("群成员不存在"), user_id=40, times=5)
+    fail(breaker, Failed("user not in group"), user_id=41, times=5)
+    breaker.before(99, "set_group_ban", {"group_id": 1, "user_id": 30})
+
+
+def test_transport_errors_do_not_count(breaker):
+    # 网络抖动与群无关，交给调用方重试
+    fail(breaker, asyncio.TimeoutError(), times=5)
+    breaker.before(99, "set_group_ban", {"group_id": 1, "user_id": 30})
+
+
+def test_unknown_failures_do_not_count(breaker):
+    fail(breaker, Failed("操作频繁"), times=5)
+    breaker.before(99, "set_group_ban", {"group_id": 1, "user_id": 30})
+
+
+def test_target_failure_keeps_permission_count(breaker):
+    # 目标类失败夹在权限失败之间，既不清零也不累加
+    fail(breaker, Failed("权限不足"), times=CircuitBreaker.FAILURE_THRESHOLD - 1)
+    fail(breaker, Failed("群成员不存在"), times=1)
+    params = fail(breaker, Failed("权限不足"), times=1)
+    with pytest.raises(CircuitOpenError):
+        breaker.before(99, "set_group_ban", params)
+
+
+def test_role_precheck_and_probe(breaker, monkeypatch):
+    # bot 缓存角色是群员：不调接口直接熔断
+    with pytest.raises(CircuitOpenError):
+        breaker.before(30, "set_group_kick", {"group_id": 1, "user_id": 40})
+    # 到期放行一次探测，探测成功后不再凭缓存拦截
+    circuit = breaker._circuits[("1", "set_group_kick")]
+    circuit.open_until = 1.0
+    breaker.before(30, "set_group_kick", {"group_id": 1, "user_id": 40})
+    breaker.on_success("set_group_kick", {"group_id": 1})
+    breaker.before(30, "set_group_kick", {"group_id": 1, "user_id": 40})
+
+
+def test_unclassified_probe_failure_ends_probe(breaker):
+    params = fail(breaker, Failed("权限不足"))
+    breaker._circuits[("1", "set_group_ban")].open_until = 1.0
+    # 探测放行后，其余调用在探测返回前仍被拦截
+    breaker.before(99, "set_group_ban", params)
+    with pytest.raises(CircuitOpenError):
+        breaker.before(99, "set_group_ban", params)
+    # 探测得到目标类失败：结束探测，不再拦截
+    breaker.on_failure("set_group_ban", params, Failed("群成员不存在"))
+    breaker.before(99, "set_group_ban", params)
+
+
+def test_transport_probe_failure_ends_probe(breaker):
+    params = fail(breaker, Failed("权限不足"))
+    breaker._circuits[("1", "set_group_ban")].open_until = 1.0
+    breaker.before(99, "set_group_ban", params)
+    breaker.on_failure("set_group_ban", params, asyncio.TimeoutError())
+    breaker.before(99, "set_group_ban", params)
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from qqadmin.data import QQAdminDB
+
+CONF = {
+    "default": {"word_ban_time": 60, "join_switch": False},
+    "db_sync_interval": 0,
+}
+
+
+async def _open(path) -> QQAdminDB:
+    db = QQAdminDB(CONF, path)
+    await db.init()
+    return db
+
+
+def test_sync_picks_up_other_connection(tmp_path):
+    async def main():
+        path = tmp_path / "data.db"
+        a, b = await _open(path), await _open(path)
+        changed: list[str] = []
+        a.subscribe(lambda gid, fields: changed.append(gid))
+        try:
+            await b.set("123", "word_ban_time", 99)
+            assert await a.sync() == 1
+            assert (await a.group("123")).word_ban_time == 99
+            assert changed == ["123"]
+            # 已同步后没有新写入
+            assert await a.sync() == 0
+        finally:
+            await a.close()
+            await b.close()
+
+    asyncio.run(main())
+
+
+def test_sync_skips_own_and_unrelated_writes(tmp_path):
+    async def main():
+        path = tmp_path / "data.db"
+        a = await _open(path)
+        other = await _open(path)
+        async def touch_other_table():
+            # 其他连接写别的表（如活跃统计、审计）：data_version 变化，changes 表不动
+            await other._conn.execute("CREATE TABLE IF NOT EXISTS t (x INTEGER);")
+            await other._conn.execute("INSERT INTO t VALUES (1);")
+            await other._conn.commit()
+
+        try:
+            await a.set("1", "word_ban_time", 5)
+            await touch_other_table()
+            # 新序号全是自己写的：不重载，直接前移
+            assert await a.sync() == 0
+            assert a._own_seqs == set()
+            seq = a._last_seq
+            assert seq > 0
+            await touch_other_table()
+            assert await a.sync() == 0
+            assert a._last_seq == seq
+        finally:
+            await a.close()
+            await other.close()
+
+    asyncio.run(main())
+
+
+def test_set_keeps_cache_when_commit_fails(tmp_path):
+    async def main():
+        db = await _open(tmp_path / "data.db")
+        try:
+            await db.set("1", "word_ban_time", 5)
+
+            async def fail(gids):
+                raise RuntimeError("boom")
+
+            db._log_changes = fail
+            with pytest.raises(RuntimeError):
+                await db.set("1", "word_ban_time", 99)
+            assert (await db.group("1")).word_ban_time == 5
+        finally:
+            await db.close()
+
+    asyncio.run(main())
+
+
+def test_concurrent_writes_are_not_lost(tmp_path):
+    async def main():
+        db = await _open(tmp_path / "data.db")
+        try:
+            await asyncio.gather(
+                *(db.add("1", "block_ids", str(i)) for i in range(5)),
+                db.set("1", "word_ban_time", 7),
+                db.remove("1", "join_accept_words", "x"),
+            )
+            cfg = await db.group("1")
+            assert sorted(cfg.block_ids) == ["0", "1", "2", "3", "4"]
+            assert cfg.word_ban_time == 7
+        finally:
+            await db.close()
+        # 落库内容与缓存一致
+        db = await _open(tmp_path / "data.db")
+        try:
+            assert sorted(await db.get("1", "block_ids")) == ["0", "1", "2", "3", "4"]
+        finally:
+            await db.close()
+
+    asyncio.run(main())
+
+
+def test_write_keeps_unsynced_change_from_other_process(tmp_path):
+    async def main():
+        path = tmp_path / "data.db"
+        a, b = await _open(path), await _open(path)
+        try:
+            await b.group("1")
+            await a.set("1", "word_ban_time", 99)
+            # b 尚未同步就写另一个字段：只合并该字段，不用旧缓存覆盖 a 的改动
+            await b.set("1", "spamming_ban_time", 5)
+            assert (await b.group("1")).word_ban_time == 99
+            await a.sync()
+            cfg = await a.group("1")
+            assert (cfg.word_ban_time, cfg.spamming_ban_time) == (99, 5)
+        finally:
+            await a.close()
+            await b.close()
+
+    asyncio.run(main())
+
+
+def test_failed_commit_does_not_claim_seqs(tmp_path):
+    async def main():
+        db = await _open(tmp_path / "data.db")
+        try:
+            await db.set("1", "word_ban_time", 5)
+            await db.sync()
+            own = set(db._own_seqs)
+            conn = db._conn
+            commit = conn.commit
+
+            async def fail():
+                conn.commit = commit
+                raise RuntimeError("boom")
+
+            conn.commit = fail
+            with pytest.raises(RuntimeError):
+                await db.set("1", "word_ban_time", 99)
+            # 回滚后的序号可能被其他进程复用，不能记为自己的
+            assert db._own_seqs == own
+        finally:
+            await db.close()
+
+    asyncio.run(main())
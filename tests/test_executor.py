@@ -0,0 +1,18 @@
+import asyncio
+
+from qqadmin.executor import BatchExecutor
+
+
+def test_non_positive_interval_disables_progress():
+    reports = []
+
+    async def act(item):
+        await asyncio.sleep(0.01)
+
+    async def report(result):
+        reports.append(result.finished)
+
+    executor = BatchExecutor(concurrency=1, rate=0, progress_interval=0)
+    result = asyncio.run(executor.run("1", range(5), act, report))
+    assert len(result.succeeded) == 5
+    assert reports == []
@@ -0,0 +1,28 @@
+import asyncio
+
+from qqadmin.data import QQAdminDB
+
+CONF = {
+    "default": {"block_ids": ["1"], "join_accept_words": []},
+    "db_sync_interval": 0,
+}
+
+
+def test_returned_lists_are_not_shared(tmp_path):
+    async def main():
+        db = QQAdminDB(CONF, tmp_path / "data.db")
+        await db.init()
+        try:
+            (await db.get("100", "block_ids")).append("2")
+            (await db.all("100"))["block_ids"].append("3")
+            (await db.get("100", "join_reject_words", [])).append("x")
+            # 原地修改既不影响本群缓存，也不影响默认原型与其他群
+            assert await db.get("100", "block_ids") == ["1"]
+            assert await db.get("100", "join_reject_words") == []
+            assert await db.get("200", "block_ids") == ["1"]
+            assert db._default.block_ids == ["1"]
+            assert (await db.group("100")).block_id_set == frozenset({1})
+        finally:
+            await db.close()
+
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from qqadmin.core import llm_handle
+from qqadmin.msg_ring import MessageRing, MessageRingStore
+
+
+class FakeClient:
+    def __init__(self, history: list[dict]):
+        # 从旧到新
+        self.history = history
+        self.seqs: list[int] = []
+
+    async def call_action(self, action: str, **params):
+        seq = params["message_seq"]
+        self.seqs.append(seq)
+        older = [m for m in self.history if not seq or m["message_seq"] <= seq]
+        return {"messages": older[-params["count"] :]}
+
+
+class FakeEvent:
+    def get_group_id(self) -> str:
+        return "100"
+
+
+def _message(i: int) -> dict:
+    return {
+        "message_id": i,
+        "message_seq": i,
+        "sender": {"user_id": 7},
+        "message": [{"type": "text", "data": {"text": f"msg{i}"}}],
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(MessageRingStore, "_instance", None)
+    monkeypatch.setattr(llm_handle.LLMHandle, "HISTORY_PAGE_SIZE", 10)
+    ring = MessageRingStore.get_instance()._rings["100"] = MessageRing(50)
+    # 缓冲里是第 21~50 条，更早的只在历史里
+    for i in range(21, 51):
+        ring.append(i, 7, 0, f"msg{i}")
+    client = FakeClient([_message(i) for i in range(1, 51)])
+    monkeypatch.setattr(llm_handle, "get_client", lambda event: client)
+    return client
+
+
+def _contexts(rounds: int) -> list[str]:
+    handle = llm_handle.LLMHandle(None, {})
+    text = asyncio.run(handle.get_msg_contexts(FakeEvent(), "7", rounds))
+    return text.splitlines()
+
+
+def test_ring_covers_requested_window(client):
+    assert _contexts(2) == [f"msg{i}" for i in range(31, 51)]
+    assert client.seqs == []
+
+
+def test_pages_history_beyond_ring(client):
+    # 从缓冲最旧一条开始向前翻（历史页含起点那条，已在缓冲里的去重）
+    assert _contexts(4) == [f"msg{i}" for i in range(12, 51)]
+    assert client.seqs == [21]
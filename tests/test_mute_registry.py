@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from qqadmin import client as client_module
+from qqadmin.mute_registry import MAX_BAN_TIME, MuteRegistry
+
+
+class FakeClient:
+    """成功后像 BotClient 一样通知写接口监听器"""
+
+    def __init__(self):
+        self.bans: list[dict] = []
+
+    async def set_group_ban(self, **params):
+        self.bans.append(params)
+        for listener in client_module._write_listeners:
+            listener(self, "set_group_ban", params)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(MuteRegistry, "_instance", None)
+    registry = MuteRegistry.get_instance()
+    yield registry
+    registry._unsubscribe()
+
+
+def test_long_ban_is_capped_and_registered(registry):
+    client = FakeClient()
+
+    async def main():
+        await registry.ban(client, 1, 2, MAX_BAN_TIME * 2)
+
+    asyncio.run(main())
+    assert client.bans == [{"group_id": 1, "user_id": 2, "duration": MAX_BAN_TIME}]
+    [(uid, until, final)] = registry.muted(1)
+    assert uid == 2
+    assert final - until == pytest.approx(MAX_BAN_TIME, abs=5)
+
+
+def test_short_ban_is_not_extended(registry):
+    client = FakeClient()
+
+    async def main():
+        await registry.ban(client, 1, 2, 600)
+
+    asyncio.run(main())
+    assert client.bans[0]["duration"] == 600
+    # 短禁言也会登记，但最终到期即本次到期，不会续禁
+    [(_, until, final)] = registry.muted(1)
+    assert final == until
+
+
+def test_short_ban_replaces_long_ban(registry):
+    client = FakeClient()
+
+    async def main():
+        await registry.ban(client, 1, 2, MAX_BAN_TIME * 2)
+        await registry.ban(client, 1, 2, 60)
+        # 随后到达的 group_ban 通知也不应恢复旧的最终到期时间
+        registry.on_notice(
+            {"notice_type": "group_ban", "group_id": 1, "user_id": 2, "duration": 60}
+        )
+
+    asyncio.run(main())
+    [(_, until, final)] = registry.muted(1)
+    assert final == until
+    assert until - time.time() == pytest.approx(60, abs=5)
+
+
+def test_manual_short_ban_replaces_long_ban(registry):
+    async def main():
+        registry.on_ban(1, 2, MAX_BAN_TIME, time.time() + MAX_BAN_TIME * 2)
+        # 管理员在 QQ 里改成短禁言，只收到通知
+        registry.on_notice(
+            {"notice_type": "group_ban", "group_id": 1, "user_id": 2, "duration": 60}
+        )
+
+    asyncio.run(main())
+    [(_, until, final)] = registry.muted(1)
+    assert final == until
+
+
+def test_notice_keeps_final_expiry(registry):
+    async def main():
+        registry.on_ban(1, 2, MAX_BAN_TIME, time.time() + MAX_BAN_TIME * 3)
+        # 自己的禁言产生的 group_ban 通知不应覆盖最终到期时间
+        ban = {"notice_type": "group_ban", "group_id": 1, "user_id": 2}
+        registry.on_notice({**ban, "duration": MAX_BAN_TIME})
+        registry.on_notice({**ban, "sub_type": "lift_ban", "user_id": 3})
+
+    asyncio.run(main())
+    [(_, until, final)] = registry.muted(1)
+    assert final - until == pytest.approx(MAX_BAN_TIME * 2, abs=5)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from qqadmin.core import normal_handle
+
+
+class FailingClient:
+    async def set_group_card(self, **params):
+        raise RuntimeError("熔断")
+
+
+class FakeEvent:
+    def __init__(self):
+        self.sent: list = []
+
+    def get_group_id(self) -> str:
+        return "100"
+
+    def get_sender_id(self) -> str:
+        return "42"
+
+    def get_self_id(self) -> str:
+        return "1"
+
+    def chain_result(self, chain: list) -> str:
+        return "".join(seg.text for seg in chain)
+
+    async def send(self, result):
+        self.sent.append(result)
+
+
+def test_failed_call_sends_no_success_reply(monkeypatch):
+    monkeypatch.setattr(normal_handle, "get_client", lambda event: FailingClient())
+    monkeypatch.setattr(normal_handle, "get_ats", lambda event: ["7"])
+
+    async def get_nickname(event, user_id):
+        return "群友"
+
+    monkeypatch.setattr(normal_handle, "get_nickname", get_nickname)
+    event = FakeEvent()
+    with pytest.raises(RuntimeError):
+        asyncio.run(normal_handle.NormalHandle({}).set_group_card(event, "新名片"))
+    assert event.sent == []
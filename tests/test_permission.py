@@ -0,0 +1,37 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from qqadmin import permission
+from qqadmin.permission import PermissionManager, PermLevel
+
+
+def test_level_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(PermissionManager, "_instance", None)
+    monkeypatch.setattr(PermissionManager, "CACHE_PRUNE_SIZE", 3)
+    manager = PermissionManager(perms={})
+    expire = time.monotonic() + 60
+    for uid in "123":
+        manager._cache_level(("1", uid), PermLevel.MEMBER, expire)
+    manager._level_cache.move_to_end(("1", "1"))
+    manager._cache_level(("1", "4"), PermLevel.MEMBER, expire)
+    # 全部未过期：淘汰最久未用的 "2"，容量不超过上限
+    assert list(manager._level_cache) == [("1", "3"), ("1", "1"), ("1", "4")]
+
+
+def test_denied_sender_skips_other_lookups(monkeypatch):
+    monkeypatch.setattr(PermissionManager, "_instance", None)
+    manager = PermissionManager(perms={})
+    looked_up: list[str] = []
+
+    async def get_perm_level(event, user_id):
+        looked_up.append(str(user_id))
+        return PermLevel.MEMBER
+
+    monkeypatch.setattr(manager, "get_perm_level", get_perm_level)
+    monkeypatch.setattr(permission, "get_ats", lambda event: [str(i) for i in range(20)])
+    event = SimpleNamespace(get_sender_id=lambda: "42", get_self_id=lambda: "1")
+    result = asyncio.run(manager.perm_block(event, PermLevel.ADMIN, "set_group_ban"))
+    assert result == "你没管理员权限"
+    # 发送者无权限：不再为 bot 和 20 个被@者查询
+    assert looked_up == ["42"]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from qqadmin import client as client_module
+from qqadmin.client import ReadCoalescer
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.calls = 0
+
+    async def submit(self, bot, action: str, params: dict):
+        self.calls += 1
+        return {"user_id": params.get("user_id")}
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(
+        client_module.ActionScheduler, "get_instance", classmethod(lambda cls: scheduler)
+    )
+    return scheduler
+
+
+def test_expired_entries_are_dropped(scheduler, monkeypatch):
+    coalescer = ReadCoalescer()
+    monkeypatch.setattr(ReadCoalescer, "CACHE_PRUNE_SIZE", 3)
+    bot = object()
+
+    async def main():
+        for uid in range(5):
+            await coalescer.call(bot, "get_stranger_info", {"user_id": uid})
+        # 全部过期：超过上限时插入前清理，读到过期项时直接删除
+        for key, (_, value) in list(coalescer._cache.items()):
+            coalescer._cache[key] = (0.0, value)
+        await coalescer.call(bot, "get_stranger_info", {"user_id": 9})
+        assert len(coalescer._cache) == 1
+        coalescer._cache[next(iter(coalescer._cache))] = (0.0, {})
+        await coalescer.call(bot, "get_stranger_info", {"user_id": 9})
+
+    asyncio.run(main())
+    assert scheduler.calls == 7
+    assert len(coalescer._cache) == 1
+
+
+def test_read_started_before_write_is_not_cached(scheduler):
+    coalescer = ReadCoalescer()
+    bot = object()
+    params = {"group_id": 1, "user_id": 2}
+
+    async def main():
+        read = asyncio.create_task(
+            coalescer.call(bot, "get_group_member_info", dict(params))
+        )
+        await asyncio.sleep(0)
+        # 读请求在途时写入成功：旧请求的结果不缓存，新请求不与它合并
+        coalescer.invalidate(bot, 1)
+        again = asyncio.create_task(
+            coalescer.call(bot, "get_group_member_info", dict(params))
+        )
+        await asyncio.gather(read, again)
+        assert scheduler.calls == 2
+        await coalescer.call(bot, "get_group_member_info", dict(params))
+
+    asyncio.run(main())
+    # 失效后发出的请求结果照常缓存，第三次读命中
+    assert scheduler.calls == 2
+
+
+def test_no_cache_merges_with_inflight_read(scheduler):
+    coalescer = ReadCoalescer()
+    bot = object()
+
+    async def main():
+        await asyncio.gather(
+            coalescer.call(bot, "get_group_info", {"group_id": 1}),
+            coalescer.call(bot, "get_group_info", {"group_id": 1, "no_cache": True}),
+        )
+
+    asyncio.run(main())
+    assert scheduler.calls == 1
+    assert coalescer.stats["merged"] == 1
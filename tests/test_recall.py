@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from qqadmin.core import normal_handle
+from qqadmin.msg_ring import MessageRing, MessageRingStore
+
+
+class FakeClient:
+    def __init__(self, history: list[dict] | None = None):
+        self.calls: list[str] = []
+        # 从旧到新，按 message_seq 翻页（message_seq 与 message_id 不同）
+        self.history = history or []
+        self.seqs: list[int] = []
+        self.deleted: list[int] = []
+
+    async def call_action(self, action: str, **params):
+        self.calls.append(action)
+        seq = params["message_seq"]
+        self.seqs.append(seq)
+        older = [m for m in self.history if not seq or m["message_seq"] <= seq]
+        return {"messages": older[-params["count"] :]}
+
+    async def delete_msg(self, message_id: int):
+        self.calls.append("delete_msg")
+        self.deleted.append(message_id)
+
+
+class FakeEvent:
+    def get_group_id(self) -> str:
+        return "100"
+
+
+@pytest.fixture
+def ring_store(monkeypatch):
+    monkeypatch.setattr(MessageRingStore, "_instance", None)
+    store = MessageRingStore.get_instance()
+    ring = store._rings["100"] = MessageRing(50)
+    for i in range(1, 31):
+        # 奇数条是目标用户 7 的消息
+        ring.append(i, 7 if i % 2 else 8, 0, f"msg{i}")
+    return store
+
+
+def _run(monkeypatch, client: FakeClient, count: int):
+    monkeypatch.setattr(normal_handle, "get_client", lambda event: client)
+    handle = normal_handle.NormalHandle({})
+    return asyncio.run(handle._delete_user_msgs(FakeEvent(), {7}, count))
+
+
+def test_recall_from_ring_without_history(monkeypatch, ring_store):
+    client = FakeClient()
+    deleted, _ = _run(monkeypatch, client, 5)
+    assert deleted == 5
+    assert client.calls == ["delete_msg"] * 5
+    # 撤回的消息在缓冲里标记为已撤回
+    remaining = [m.message_id for m in ring_store.get("100").latest(senders={7})]
+    assert remaining == list(range(19, 0, -2))
+
+
+def test_recall_pages_history_when_ring_short(monkeypatch, ring_store):
+    client = FakeClient()
+    deleted, _ = _run(monkeypatch, client, 20)
+    assert deleted == 15
+    assert client.calls.count("get_group_msg_history") == 1
+
+
+def _history(ids: range, sender: int, seq_offset: int = 0) -> list[dict]:
+    return [
+        {"message_id": i, "message_seq": seq_offset + i, "sender": {"user_id": sender}}
+        for i in ids
+    ]
+
+
+def test_recalled_ring_messages_are_not_retried(monkeypatch, ring_store):
+    # 缓冲最旧的几条已撤回，翻页起点之前的历史里仍能看到它们
+    ring_store.forget("100", 1)
+    ring_store.forget("100", 3)
+    client = FakeClient(_history(range(1, 31), 7))
+    deleted, _ = _run(monkeypatch, client, 20)
+    assert 1 not in client.deleted and 3 not in client.deleted
+    assert deleted == 13
+    # 从缓冲里最旧一条未撤回消息的 message_seq 开始翻页
+    assert client.seqs[0] == 2
+
+
+def test_history_pages_by_message_seq(monkeypatch):
+    monkeypatch.setattr(MessageRingStore, "_instance", None)
+    monkeypatch.setattr(normal_handle.NormalHandle, "RECALL_PAGE_SIZE", 10)
+    client = FakeClient(_history(range(1, 41), 7, seq_offset=1000))
+    deleted, _ = _run(monkeypatch, client, 25)
+    assert deleted == 25
+    assert client.seqs[:3] == [0, 1031, 1022]
+
+
+def test_failed_deletes_fall_back_to_later_candidates(monkeypatch):
+    monkeypatch.setattr(MessageRingStore, "_instance", None)
+
+    class FlakyClient(FakeClient):
+        async def delete_msg(self, message_id: int):
+            await super().delete_msg(message_id)
+            attempt = len(self.deleted)
+            await asyncio.sleep(0.01)
+            # 前两次撤回失败（如消息已过期）
+            if attempt <= 2:
+                raise RuntimeError("撤回失败")
+
+    client = FlakyClient(_history(range(1, 41), 7))
+    deleted, _ = _run(monkeypatch, client, 2)
+    assert deleted == 2
+    assert len(client.deleted) == 4
+
+
+def test_ring_surplus_covers_failed_deletes(monkeypatch, ring_store):
+    class FailingClient(FakeClient):
+        async def delete_msg(self, message_id: int):
+            await super().delete_msg(message_id)
+            if message_id > 20:
+                raise RuntimeError("撤回失败")
+
+    # 缓冲里有 15 条目标消息，其中较新的 5 条撤回失败，由更早的补上
+    deleted, _ = _run(monkeypatch, FailingClient(), 10)
+    assert deleted == 10
@@ -0,0 +1,67 @@
+from array import array
+from types import SimpleNamespace
+
+from qqadmin.roster import RosterColumns, RosterStore
+
+
+def _columns() -> RosterColumns:
+    return RosterColumns(
+        [
+            {"user_id": 1, "level": 5, "join_time": 30, "last_sent_time": 100},
+            {"user_id": 2, "level": 20, "join_time": 10, "last_sent_time": 300},
+            {"user_id": 3, "level": 1, "join_time": 20, "last_sent_time": 200},
+        ]
+    )
+
+
+def test_where_below_and_order():
+    cols = _columns()
+    rows = cols.where_below(level=10, last_sent_time=250)
+    assert [cols.user_id[i] for i in cols.order_by(rows, "last_sent_time")] == [1, 3]
+    assert [cols.user_id[i] for i in cols.sorted_rows("join_time")] == [2, 3, 1]
+
+
+def test_view_attach_does_not_touch_shared_columns():
+    cols = _columns()
+    view = cols.view()
+    view.attach("recent_msgs", array("q", [0, 9, 1]))
+    assert [view.user_id[i] for i in view.where_below(recent_msgs=2)] == [1, 3]
+    assert "recent_msgs" not in cols.extra
+    # 基础列共享，名单修补对副本可见
+    cols.touch(1, 999)
+    assert view.last_sent_time[0] == 999
+
+
+def test_member_hidden_after_owner_change(monkeypatch):
+    monkeypatch.setattr(RosterStore, "_instance", None)
+    store = RosterStore.get_instance()
+    store._rosters["100"] = {1: {"user_id": 1, "role": "owner"}}
+    assert store.member("100", 1)["role"] == "owner"
+    store.on_notice(
+        {"notice_type": "group_owner_change", "group_id": 100, "user_id": 2}
+    )
+    # 同步前不再返回转让前的角色
+    assert store.member("100", 1) is None
+
+
+def test_patches_do_not_touch_fetched_dicts(monkeypatch):
+    monkeypatch.setattr(RosterStore, "_instance", None)
+    store = RosterStore.get_instance()
+    # 与读接口合并层共享的原始结果
+    fetched = {"user_id": 1, "role": "member", "card": "a", "last_sent_time": 0}
+    store._rosters["100"] = {1: fetched}
+    store.on_notice(
+        {"notice_type": "group_admin", "sub_type": "set", "group_id": 100, "user_id": 1}
+    )
+    store.on_notice(
+        {"notice_type": "group_card", "group_id": 100, "user_id": 1, "card_new": "b"}
+    )
+    raw = {"group_id": 100, "time": 50, "sender": {"user_id": 1, "card": "c"}}
+    store.update_from_event(SimpleNamespace(message_obj=SimpleNamespace(raw_message=raw)))
+    assert fetched == {"user_id": 1, "role": "member", "card": "a", "last_sent_time": 0}
+    assert store.member("100", 1) == {
+        "user_id": 1,
+        "role": "admin",
+        "card": "c",
+        "last_sent_time": 50,
+    }
@@ -0,0 +1,31 @@
+import asyncio
+
+from qqadmin import client as client_module
+from qqadmin.audit import audit_context
+from qqadmin.scheduler import ActionScheduler
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+
+    async def call_action(self, action: str, **params):
+        self.calls.append((action, params))
+
+
+def test_delete_msg_uses_command_group_bucket(monkeypatch):
+    monkeypatch.setattr(ActionScheduler, "_instance", None)
+    scheduler = ActionScheduler.get_instance()
+    scheduler.configure({"global_rate": 1000, "global_burst": 1000, "group_burst": 2})
+    bot = FakeBot()
+    client = client_module.BotClient(bot)
+
+    async def main():
+        with audit_context("100", 42):
+            await asyncio.gather(*(client.delete_msg(message_id=i) for i in range(2)))
+        await scheduler.stop()
+
+    asyncio.run(main())
+    # 群号只用于限速，不发给协议端
+    assert bot.calls == [("delete_msg", {"message_id": 0}), ("delete_msg", {"message_id": 1})]
+    assert scheduler._group_buckets["100"].tokens < 1
@@ -1,4 +1,5 @@
 import os
+from collections import OrderedDict
 from datetime import datetime
 
 from aiohttp import ClientSession
@@ -9,6 +10,9 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .client import get_client
+from .roster import RosterStore
+
 BAN_ME_QUOTES: list[str] = [
     "还真有人有这种奇怪的要求",
     "满足你",
@@ -26,18 +30,21 @@ ADMIN_HELP = (
     "- 禁言 <秒数> @用户：对指定成员禁言\n"
     "- 禁我 <秒数>：对自己禁言\n"
     "- 解禁 @用户：解除指定成员的禁言\n"
+    "- 禁言列表：查看本群禁言中的成员及剩余时间\n"
+    "- 全部解禁：解除本群所有禁言\n"
     "- 开启全禁 / 关闭全禁：控制全群是否可发言\n"
     "- 改名 <新昵称> @用户 / 改我 <新昵称>：修改群名片\n"
     "- 头衔 <头衔> @用户 / 申请头衔 <头衔>：设置群头衔（需群主权限）\n"
     "- 踢了 @用户：将指定成员移出群聊\n"
     "- 拉黑 @用户：踢出并拉黑指定成员\n"
+    "- 批量禁言 <秒数> / 批量解禁 / 批量踢 / 批量拉黑 <QQ列表 | /正则/>：按QQ列表或群名片正则批量处置，预览确认后执行\n"
     "- 上管 @用户：设置管理员（需群主权限）\n"
     "- 下管 @用户：取消管理员（需群主权限）\n"
-    "- 撤回 (引用消息) / 撤回 @用户 数量：撤回消息，默认10条\n"
+    "- 撤回 (引用消息) / 撤回 @用户 数量：撤回消息，@用户时向前翻找直到撤回该用户N条，默认10条\n"
     "- 设置群头像 (引用图片)：修改群头像\n"
     "- 设置群名 <新群名>：修改群名称\n"
     "- 设精 (引用消息) / 移精 (引用消息)：管理精华消息\n"
-    "- 查看精华：查看精华消息列表\n\n"
+    "- 查看群精华 <页码>：分页查看精华消息列表\n\n"
     "## NoticeHandle 公告管理\n"
     "- 发布群公告 <内容> (可引用图片)：发布群公告\n"
     "- 查看群公告：查看群公告\n\n"
@@ -67,8 +74,11 @@ ADMIN_HELP = (
     "- 批准 / 驳回 <理由>：审批进群申请\n"
     "- （自动）监听进群/退群事件：记录群员变动\n\n"
     "## MemberHandle 群成员工具\n"
-    "- 群友信息：查看群成员活跃情况\n"
-    "- 清理群友 <未发言天数> <群等级>：移除不活跃或低等级成员\n\n"
+    "- 群友信息 <页码>：分页查看群成员活跃情况\n"
+    "- 清理群友 <未发言天数> <群等级> <消息数>：移除不活跃或低等级成员，指定消息数时按近N天发言少于该数筛选\n"
+    "- 查群友 <QQ>：查询某QQ在bot所在各群的身份（bot管理员）\n"
+    "- 全群踢 <QQ>：把某QQ踢出bot有权限的所有群（bot管理员）\n"
+    "- 全群禁言 <QQ> <秒数>：在bot有权限的所有群禁言某QQ（bot管理员）\n\n"
     "## FileHandle 群文件管理\n"
     "- 上传群文件 <文件夹名/文件名>：引用文件并上传\n"
     "- 删除群文件 <文件夹名或序号> <文件名或序号>：删除群文件或文件夹\n"
@@ -77,7 +87,13 @@ ADMIN_HELP = (
     "- 取名 @用户 <抽取消息轮数>：根据聊天记录取个群昵称\n"
     "## 配置管理\n"
     "- 群管配置：修改/查看本群群管配置（直接跟配置文本）\n"
-    "- 群管重置 <群号 | all>：重置本群或全部群的群管配置\n\n"
+    "- 群管重置 <群号 | all>：重置本群或全部群的群管配置\n"
+    "- 群管批量配置 <群号,群号 | all> <配置串>：一次性应用到多个群（bot管理员）\n"
+    "- 群管导出：导出所有群的群管配置到数据目录（bot管理员）\n"
+    "- 审计记录 <@用户|QQ> <条数>：查看本群最近的群管操作，可只看针对某人的\n"
+    "- 审计导出 <全部>：导出本群（或所有群）的审计记录到数据目录（bot管理员）\n"
+    "- 群管备份：在线备份群管数据，按配置轮转保留（bot管理员）\n"
+    "- 群管状态：查看接口调用统计、熔断状态等运行状态（bot管理员）\n\n"
 )
 
 
@@ -99,12 +115,80 @@ def print_logo():
     print("\033[94m欢迎使用群管插件！\033[0m")  # 蓝色文字
 
 
+class NicknameCache:
+    """
+    群昵称 LRU 缓存 {(group_id, user_id): 名称}
+    由群消息的 sender 字段、成员列表、群名片变动通知被动填充，get_nickname 未命中才调接口
+    """
+
+    def __init__(self, maxsize: int = 20000):
+        self.maxsize = maxsize
+        self._data: OrderedDict[tuple[str, str], str] = OrderedDict()
+
+    def get(self, group_id: str | int, user_id: str | int) -> str | None:
+        key = (str(group_id), str(user_id))
+        name = self._data.get(key)
+        if name is not None:
+            self._data.move_to_end(key)
+        return name
+
+    def put(self, group_id: str | int, user_id: str | int, name: str | None):
+        if not name:
+            return
+        key = (str(group_id), str(user_id))
+        self._data[key] = name
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def put_member(self, group_id: str | int, member: dict):
+        """从成员资料（成员列表/sender）写入：群名片优先，其次 QQ 昵称"""
+        self.put(
+            group_id,
+            member.get("user_id", ""),
+            member.get("card") or member.get("nickname") or member.get("nick"),
+        )
+
+    def discard(self, group_id: str | int, user_id: str | int):
+        self._data.pop((str(group_id), str(user_id)), None)
+
+    def update_from_event(self, event: AiocqhttpMessageEvent):
+        """从群消息事件的 sender 字段被动更新"""
+        raw = getattr(event.message_obj, "raw_message", None)
+        if not isinstance(raw, dict):
+            return
+        sender = raw.get("sender")
+        if isinstance(sender, dict) and raw.get("group_id"):
+            self.put_member(raw["group_id"], sender)
+
+    def on_notice(self, raw: dict):
+        """群名片变动时更新，成员离开时移除"""
+        gid, uid = raw.get("group_id"), raw.get("user_id")
+        if not gid or not uid:
+            return
+        match raw.get("notice_type"):
+            case "group_card":
+                if card := raw.get("card_new"):
+                    self.put(gid, uid, card)
+                else:
+                    self.discard(gid, uid)
+            case "group_decrease":
+                self.discard(gid, uid)
+
+
+nickname_cache = NicknameCache()
+
 
 async def get_nickname(event: AiocqhttpMessageEvent, user_id: int | str) -> str:
-    """获取指定群友的群昵称或 Q 名，群接口失败/空结果自动降级到陌生人资料"""
+    """获取指定群友的群昵称或 Q 名，优先读缓存，群接口失败/空结果自动降级到陌生人资料"""
     user_id = int(user_id)
-    client = event.bot
+    client = get_client(event)
     group_id = event.get_group_id()
+    if name := nickname_cache.get(group_id, user_id):
+        return name
+    if member := RosterStore.get_instance().member(group_id, user_id):
+        if name := member.get("card") or member.get("nickname"):
+            return name
     info = {}
 
     # 在群里就先试群资料，任何异常或空结果都跳过
@@ -127,7 +211,10 @@ async def get_nickname(event: AiocqhttpMessageEvent, user_id: int | str) -> str:
             pass
 
     # 依次取群名片、QQ 昵称、通用 nick，兜底数字 UID
-    return info.get("card") or info.get("nickname") or info.get("nick") or str(user_id)
+    name = info.get("card") or info.get("nickname") or info.get("nick")
+    if name and group_id.isdigit():
+        nickname_cache.put(group_id, user_id, name)
+    return name or str(user_id)
 
 
 def get_ats(event: AiocqhttpMessageEvent) -> list[str]: